@@ -1,63 +1,200 @@
-from crewai import Agent, LLM, Tool
-from typing import List, Optional
-from langchain.tools import BaseTool
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 import os
+import threading
 from dotenv import load_dotenv
 
-# Import tools
-from tools import ContractParsingTool, ComplianceDatabaseTool, RiskEvaluationTool
+# CrewAI, LangChain and the tools are imported on first use so that importing this
+# module is fast and does not require LLM credentials
+if TYPE_CHECKING:
+    from crewai import Agent, LLM, Tool
+    from langchain.tools import BaseTool
 
-# Load environment variables
-load_dotenv()
+_llm = None
+_json_llm = None
+_llm_lock = threading.Lock()
 
-# Create LLM configuration
-if os.getenv("AZURE_OPENAI_API_KEY"):
-    # Using the direct configuration approach for Azure OpenAI
-    try:
-        azure_model_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4")
+# Model prefixes of backends that accept response_format={"type": "json_object"}
+JSON_MODE_MODELS = ("openai/", "azure/", "gpt-")
+
+def _use_mock_llm() -> bool:
+    """Whether the local mock LLM is selected with LLM_PROVIDER=mock."""
+    return os.getenv("LLM_PROVIDER", "").lower() == "mock"
+
+def _create_llm() -> "LLM":
+    """
+    Create the LLM configuration from environment variables.
+    
+    Set LLM_PROVIDER=mock to use the local mock LLM (utils/mock_llm.py) instead
+    of a real deployment.
+    
+    Returns:
+        LLM: Mock LLM if selected, Azure OpenAI LLM if configured, standard OpenAI otherwise
+        
+    Raises:
+        ValueError: If neither Azure OpenAI nor standard OpenAI credentials are set
+    """
+    from crewai import LLM
+    
+    # Load environment variables
+    load_dotenv()
+    
+    if _use_mock_llm():
+        from utils.mock_llm import MOCK_MODEL, get_mock_llm_url
+        
         llm = LLM(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            base_url=os.getenv("AZURE_OPENAI_ENDPOINT"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
-            model=f"azure/{azure_model_name}",
+            api_key="mock",
+            base_url=get_mock_llm_url(),
+            model=f"openai/{MOCK_MODEL}",
             temperature=0.1
         )
-        print(f"Using Azure OpenAI deployment '{azure_model_name}' for agents")
-    except Exception as e:
-        print(f"Error configuring Azure OpenAI: {str(e)}")
-        if os.getenv("OPENAI_API_KEY"):
-            # Fallback to standard OpenAI
+        print(f"Using mock LLM at {llm.base_url} for agents")
+        return llm
+    
+    if os.getenv("AZURE_OPENAI_API_KEY"):
+        # Using the direct configuration approach for Azure OpenAI
+        try:
+            azure_model_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4")
             llm = LLM(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                model="gpt-4o-mini",
+                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                base_url=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+                model=f"azure/{azure_model_name}",
                 temperature=0.1
             )
-            print("Falling back to standard OpenAI for agents")
-        else:
+            print(f"Using Azure OpenAI deployment '{azure_model_name}' for agents")
+            return llm
+        except Exception as e:
+            print(f"Error configuring Azure OpenAI: {str(e)}")
+            if os.getenv("OPENAI_API_KEY"):
+                # Fallback to standard OpenAI
+                llm = LLM(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    model="gpt-4o-mini",
+                    temperature=0.1
+                )
+                print("Falling back to standard OpenAI for agents")
+                return llm
             raise ValueError("No valid LLM configuration found. Please set up Azure OpenAI or standard OpenAI API keys.")
-# Fallback to standard OpenAI
-elif os.getenv("OPENAI_API_KEY"):
-    llm = LLM(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        model="gpt-4o-mini",
-        temperature=0.1
-    )
-    print("Using standard OpenAI for agents")
-else:
+    # Fallback to standard OpenAI
+    elif os.getenv("OPENAI_API_KEY"):
+        llm = LLM(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model="gpt-4o-mini",
+            temperature=0.1
+        )
+        print("Using standard OpenAI for agents")
+        return llm
     raise ValueError("No valid LLM configuration found. Please set up Azure OpenAI or standard OpenAI API keys.")
 
+def get_llm() -> "LLM":
+    """
+    Return the process-wide LLM, creating it on first use.
+    
+    Returns:
+        LLM: The configured CrewAI LLM
+        
+    Raises:
+        ValueError: If no LLM credentials are configured
+    """
+    global _llm
+    
+    with _llm_lock:
+        if _llm is None:
+            _llm = _create_llm()
+        return _llm
+
+def supports_json_mode() -> bool:
+    """
+    Check whether the configured backend has a native JSON mode.
+    
+    Set LLM_JSON_MODE=off to disable JSON-mode calls, e.g. for an
+    OpenAI-compatible server without response_format support.
+    
+    Returns:
+        bool: True if JSON-mode calls are enabled and the model supports them
+    """
+    if os.getenv("LLM_JSON_MODE", "auto").lower() in ("off", "false", "0", "no"):
+        return False
+    return str(getattr(get_llm(), "model", "") or "").startswith(JSON_MODE_MODELS)
+
+def get_json_llm() -> Optional["LLM"]:
+    """
+    Return the process-wide LLM in JSON mode, creating it on first use.
+    
+    It has the configuration of get_llm() with response_format set to
+    json_object and temperature 0, so its answers are always a single JSON
+    object. Agents keep using the plain LLM: their ReAct tool calls are text.
+    
+    Returns:
+        LLM: The JSON-mode CrewAI LLM, or None if the backend has no JSON mode
+    """
+    global _json_llm
+    
+    if not supports_json_mode():
+        return None
+    llm = get_llm()
+    with _llm_lock:
+        if _json_llm is None:
+            from crewai import LLM
+            
+            settings = {key: getattr(llm, key, None) for key in ("api_key", "base_url", "api_version", "model")}
+            _json_llm = LLM(
+                **{key: value for key, value in settings.items() if value is not None},
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+        return _json_llm
+
+def get_llm_config() -> dict:
+    """
+    Describe the configured LLM without exposing credentials.
+    
+    Returns:
+        dict: Model settings that influence analysis results
+    """
+    llm = get_llm()
+    return {
+        "model": getattr(llm, "model", None),
+        # The mock server's port changes between runs; its answers depend on the mode
+        "base_url": f"mock:{os.getenv('MOCK_LLM_MODE', 'synthetic')}" if _use_mock_llm() else getattr(llm, "base_url", None),
+        "api_version": getattr(llm, "api_version", None),
+        "temperature": getattr(llm, "temperature", None)
+    }
+
 # Convert LangChain tools to CrewAI tools
 def convert_to_crewai_tool(tool_instance):
     """
     Convert a LangChain BaseTool instance to a CrewAI Tool
     """
+    from crewai import Tool
+    
     return Tool(
         name=tool_instance.name,
         description=tool_instance.description,
         func=tool_instance._run
     )
 
-def create_document_parsing_agent(tools: Optional[List[BaseTool]] = None) -> Agent:
+_tool_pool = {}
+_tool_pool_lock = threading.Lock()
+
+def get_crewai_tool(tool_class: type) -> "Tool":
+    """
+    Return the process-wide CrewAI wrapper of a tool, creating it on first use.
+    
+    The tools are stateless, so one instance serves every agent and analysis.
+    
+    Args:
+        tool_class: Tool class of tools.py or a LangChain BaseTool subclass
+        
+    Returns:
+        Tool: Shared CrewAI tool
+    """
+    with _tool_pool_lock:
+        if tool_class not in _tool_pool:
+            _tool_pool[tool_class] = convert_to_crewai_tool(tool_class())
+        return _tool_pool[tool_class]
+
+def create_document_parsing_agent(tools: Optional[List["BaseTool"]] = None) -> "Agent":
     """
     Create an agent specialized in document parsing and information extraction.
     
@@ -67,11 +204,13 @@ def create_document_parsing_agent(tools: Optional[List[BaseTool]] = None) -> Age
     Returns:
         Agent: CrewAI agent for document parsing
     """
+    from crewai import Agent
+    from tools import ContractParsingTool
+    
     # Initialize default tools if none provided
     if tools is None:
-        # Create the default tool and convert it to a CrewAI tool
-        parsing_tool = ContractParsingTool()
-        crewai_tools = [convert_to_crewai_tool(parsing_tool)]
+        # Reuse the shared CrewAI wrapper of the default tool
+        crewai_tools = [get_crewai_tool(ContractParsingTool)]
     else:
         # Convert the provided tools to CrewAI tools
         crewai_tools = [convert_to_crewai_tool(tool) for tool in tools]
@@ -87,10 +226,10 @@ def create_document_parsing_agent(tools: Optional[List[BaseTool]] = None) -> Age
         """,
         tools=crewai_tools,
         verbose=True,
-        llm=llm
+        llm=get_llm()
     )
 
-def create_legal_compliance_agent(tools: Optional[List[BaseTool]] = None) -> Agent:
+def create_legal_compliance_agent(tools: Optional[List["BaseTool"]] = None) -> "Agent":
     """
     Create an agent specialized in legal compliance analysis.
     
@@ -100,11 +239,13 @@ def create_legal_compliance_agent(tools: Optional[List[BaseTool]] = None) -> Age
     Returns:
         Agent: CrewAI agent for legal compliance analysis
     """
+    from crewai import Agent
+    from tools import ComplianceDatabaseTool
+    
     # Initialize default tools if none provided
     if tools is None:
-        # Create the default tool and convert it to a CrewAI tool
-        compliance_tool = ComplianceDatabaseTool()
-        crewai_tools = [convert_to_crewai_tool(compliance_tool)]
+        # Reuse the shared CrewAI wrapper of the default tool
+        crewai_tools = [get_crewai_tool(ComplianceDatabaseTool)]
     else:
         # Convert the provided tools to CrewAI tools
         crewai_tools = [convert_to_crewai_tool(tool) for tool in tools]
@@ -121,10 +262,10 @@ def create_legal_compliance_agent(tools: Optional[List[BaseTool]] = None) -> Age
         """,
         tools=crewai_tools,
         verbose=True,
-        llm=llm
+        llm=get_llm()
     )
 
-def create_risk_analysis_agent(tools: Optional[List[BaseTool]] = None) -> Agent:
+def create_risk_analysis_agent(tools: Optional[List["BaseTool"]] = None) -> "Agent":
     """
     Create an agent specialized in risk analysis and assessment.
     
@@ -134,11 +275,13 @@ def create_risk_analysis_agent(tools: Optional[List[BaseTool]] = None) -> Agent:
     Returns:
         Agent: CrewAI agent for risk analysis
     """
+    from crewai import Agent
+    from tools import RiskEvaluationTool
+    
     # Initialize default tools if none provided
     if tools is None:
-        # Create the default tool and convert it to a CrewAI tool
-        risk_tool = RiskEvaluationTool()
-        crewai_tools = [convert_to_crewai_tool(risk_tool)]
+        # Reuse the shared CrewAI wrapper of the default tool
+        crewai_tools = [get_crewai_tool(RiskEvaluationTool)]
     else:
         # Convert the provided tools to CrewAI tools
         crewai_tools = [convert_to_crewai_tool(tool) for tool in tools]
@@ -156,5 +299,94 @@ def create_risk_analysis_agent(tools: Optional[List[BaseTool]] = None) -> Agent:
         """,
         tools=crewai_tools,
         verbose=True,
-        llm=llm
-    ) 
\ No newline at end of file
+        llm=get_llm()
+    )
+
+class AgentPool:
+    """
+    Thread-safe pool of reusable agents, keyed by agent kind.
+    
+    CrewAI binds an agent to the crew that executes it, so an agent is checked
+    out by one task at a time and returned once its crew has finished. Idle
+    agents are reused by later tasks and analyses; a new agent is only built
+    when every agent of the kind is busy.
+    """
+    
+    def __init__(self, factories: Dict[str, Callable[[], "Agent"]]):
+        """
+        Args:
+            factories: Mapping of agent kind to a function building a new agent of that kind
+        """
+        self._factories = factories
+        self._idle = {kind: [] for kind in factories}
+        # Checked-out agents by id(), with their kind; the agent is kept so its id stays unique
+        self._checked_out = {}
+        self._created = {kind: 0 for kind in factories}
+        self._lock = threading.Lock()
+    
+    def acquire(self, kind: str) -> "Agent":
+        """
+        Check out an agent, building one if none is idle.
+        
+        Args:
+            kind: One of the pool's agent kinds
+            
+        Returns:
+            Agent: An agent reserved for the caller until release() is called
+        """
+        with self._lock:
+            if self._idle[kind]:
+                agent = self._idle[kind].pop()
+                self._checked_out[id(agent)] = (kind, agent)
+                return agent
+            self._created[kind] += 1
+        
+        # Build outside the lock so concurrent analyses do not wait on each other
+        agent = self._factories[kind]()
+        with self._lock:
+            self._checked_out[id(agent)] = (kind, agent)
+        return agent
+    
+    def create(self, kind: str) -> "Agent":
+        """
+        Build a new agent that is not part of the pool, for crews that keep their agents.
+        
+        Args:
+            kind: One of the pool's agent kinds
+            
+        Returns:
+            Agent: A new agent
+        """
+        return self._factories[kind]()
+    
+    def release(self, agent: "Agent"):
+        """
+        Return a checked-out agent to the pool.
+        
+        Agents that are not checked out, such as agents from create(), agents
+        built elsewhere or agents that were already released, are ignored.
+        
+        Args:
+            agent: Agent obtained from acquire()
+        """
+        with self._lock:
+            kind, _ = self._checked_out.pop(id(agent), (None, None))
+            if kind is not None:
+                self._idle[kind].append(agent)
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Report how many agents of each kind were built and are idle.
+        
+        Returns:
+            Dictionary of {"created", "idle"} counts keyed by agent kind
+        """
+        with self._lock:
+            return {kind: {"created": self._created[kind], "idle": len(self._idle[kind])} for kind in self._factories}
+
+# Process-wide agent pool shared by all analyses
+agent_pool = AgentPool({
+    "document_parsing": create_document_parsing_agent,
+    "legal_compliance": create_legal_compliance_agent,
+    "risk_analysis": create_risk_analysis_agent
+})
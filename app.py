@@ -10,9 +10,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from utils.document_parser import parse_document
-from crew import ContractAnalysisCrew
+from utils.analysis_cache import get_analysis_cache, get_clause_cache
+from utils.job_queue import FAILED, FINISHED_STATES, QUEUED, RUNNING, SUCCEEDED, get_job_queue
 
-# Check if Azure OpenAI or OpenAI is configured
+# Check if the mock LLM, Azure OpenAI or OpenAI is configured
+USING_MOCK_LLM = os.getenv("LLM_PROVIDER", "").lower() == "mock"
 USING_AZURE = os.getenv("AZURE_OPENAI_API_KEY") is not None and \
               os.getenv("AZURE_OPENAI_ENDPOINT") is not None and \
               os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME") is not None
@@ -72,9 +74,144 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Seconds between status checks of a running analysis job
+JOB_POLL_SECONDS = float(os.getenv("JOB_UI_POLL_SECONDS", "1.5"))
+
+# Result sections, in the order they are shown
+SECTION_TITLES = {
+    "contract_details": "📋 Contract Information",
+    "compliance_analysis": "⚖️ Compliance Analysis",
+    "risk_assessment": "🚨 Risk Assessment"
+}
+
+# Progress messages for the analysis stages
+STAGE_LABELS = {
+    "pre_extraction": "Rule-based pre-extraction",
+    "risk_prepass": "Keyword risk pre-assessment",
+    "contract_details": "Contract information extraction",
+    "compliance_analysis": "Compliance analysis",
+    "risk_assessment": "Risk assessment"
+}
+
+def render_section(placeholder, title, result, caption=None):
+    """Render an analysis section into a placeholder, replacing what it showed before"""
+    with placeholder.container():
+        with st.expander(title, expanded=True):
+            if caption:
+                st.caption(caption)
+            if isinstance(result, (dict, list)):
+                st.json(result)
+            else:
+                # Only left when neither the task retries nor the JSON-mode call produced valid JSON
+                st.warning("This section could not be structured; showing the agent's raw answer.")
+                st.markdown(str(result))
+
+def stage_detail(event):
+    """Describe the duration and token usage of a finished stage"""
+    if event.get("cached"):
+        return "loaded from cache"
+    return f"{event['seconds']:.1f}s, {event['tokens']['total_tokens']:,} tokens"
+
+def show_job(job_queue, job_id):
+    """Render the progress and results of an analysis job and return whether it is still pending"""
+    job = job_queue.get(job_id)
+    if job is None:
+        st.warning("The requested analysis job no longer exists.")
+        return False
+    
+    st.markdown("## Analysis Results")
+    if job["document_name"]:
+        st.caption(f"Document: {job['document_name']} (job {job_id[:8]})")
+    
+    events = {event["stage"]: event for event in job["stages"]}
+    last_event = job["stages"][-1] if job["stages"] else None
+    
+    # Progress
+    if job["status"] == QUEUED:
+        st.progress(0)
+        st.text("Waiting for a free analysis worker...")
+    elif job["status"] == RUNNING:
+        st.progress(int(100 * last_event["completed"] / last_event["total"]) if last_event else 0)
+        if last_event:
+            st.text(f"{STAGE_LABELS.get(last_event['stage'], last_event['stage'])} done "
+                    f"({last_event['completed']}/{last_event['total']}, {stage_detail(last_event)})")
+        else:
+            st.text("Extracting contract information...")
+    elif job["status"] == SUCCEEDED:
+        st.progress(100)
+        if job["result"].get("cache", {}).get("hit"):
+            st.text("Analysis complete! (loaded from cache, no tokens spent)")
+        else:
+            st.text("Analysis complete!")
+        
+        execution = job["result"].get("execution")
+        if execution:
+            caption = f"Completed in {execution['wall_clock_seconds']:.1f}s"
+            if "latency_saved_seconds" in execution:
+                caption += f" ({execution['latency_saved_seconds']:.1f}s saved by running stages concurrently)"
+            caption += f", {execution['total_tokens']['total_tokens']:,} tokens"
+            st.caption(caption)
+    
+    # Sections of the finished stages; the final result replaces the streamed ones
+    results = job["result"] if job["status"] == SUCCEEDED else {stage: event["result"] for stage, event in events.items()}
+    for stage, title in SECTION_TITLES.items():
+        if stage in results:
+            render_section(st.empty(), title, results[stage],
+                           stage_detail(events[stage]) if stage in events else None)
+        elif stage == "contract_details" and "pre_extraction" in events and events["pre_extraction"]["result"]["fields"]:
+            # Show the rule-based fields while the extraction agent is still running
+            render_section(st.empty(), f"{title} (pre-extracted, extraction running...)",
+                           events["pre_extraction"]["result"]["fields"], stage_detail(events["pre_extraction"]))
+    
+    if job["status"] == FAILED:
+        st.error(f"Error during analysis: {job['error'].splitlines()[0] if job['error'] else 'unknown error'}")
+        with st.expander("Detailed Error Information"):
+            st.write(job["error"])
+    elif job["status"] == SUCCEEDED:
+        # Summary
+        st.markdown("## Summary")
+        st.info("Analysis completed successfully. Review the detailed findings in each section above.")
+        stored = job["result"].get("store")
+        if stored:
+            st.caption(f"Saved to the contract portfolio as '{stored['contract_id']}' (version {stored['version']}). "
+                       "Open the Portfolio page to compare it with your other contracts.")
+        
+        # Where the time went: queueing, then every traced parse, task and tool call
+        timings = {
+            "queued_seconds": round(job["started_at"] - job["created_at"], 3) if job["started_at"] else None,
+            "analysis_seconds": round(job["finished_at"] - job["started_at"], 3) if job["started_at"] else None,
+            "attempts": job["attempts"],
+            "spans": job["result"].get("execution", {}).get("timings", [])
+        }
+        if timings["spans"]:
+            with st.expander("Timings"):
+                st.caption(f"Queued for {timings['queued_seconds']:.1f}s, analyzed in {timings['analysis_seconds']:.1f}s")
+                st.table(timings["spans"])
+        
+        # Add download option for the full analysis
+        combined_analysis = {
+            "document_name": job["document_name"],
+            "analysis_date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["finished_at"])),
+            "analysis_results": job["result"],
+            "timings": timings
+        }
+        
+        # Convert to JSON for download
+        analysis_json = json.dumps(combined_analysis, indent=2)
+        st.download_button(
+            label="Download Full Analysis Report",
+            data=analysis_json,
+            file_name=f"analysis-{(job['document_name'] or job_id).split('.')[0]}.json",
+            mime="application/json"
+        )
+    
+    return job["status"] not in FINISHED_STATES
+
 def validate_config():
     """Validate the LLM configuration and return status"""
-    if USING_AZURE:
+    if USING_MOCK_LLM:
+        return True, "Mock LLM configuration is valid."
+    elif USING_AZURE:
         # Azure OpenAI validation
         required_vars = [
             "AZURE_OPENAI_API_KEY",
@@ -112,7 +249,9 @@ def main():
     st.title("📄 Automated IT Contract Analysis")
     
     # Show banner for OpenAI vs Azure OpenAI
-    if USING_AZURE:
+    if USING_MOCK_LLM:
+        st.info(f"Using the local mock LLM ({os.getenv('MOCK_LLM_MODE', 'synthetic')} mode) for analysis")
+    elif USING_AZURE:
         st.success("Using Azure OpenAI for analysis")
     else:
         st.warning("Using standard OpenAI API for analysis")
@@ -190,109 +329,65 @@ def main():
             
             st.json(file_details)
         
+        execution_mode = st.selectbox(
+            "Execution mode",
+            options=["sequential", "parallel", "fast"],
+            help="'parallel' runs independent analysis steps concurrently; 'fast' also assesses risk without waiting for the compliance analysis."
+        )
+        
+        # Uploads are only grouped with earlier analyses when asked to; otherwise the
+        # contract store derives the contract ID from the text
+        contract_id = None
+        if st.checkbox("Store as a new version of an existing contract"):
+            contract_id = st.text_input(
+                "Contract ID",
+                value=os.path.splitext(uploaded_file.name)[0],
+                help="Analyses with the same contract ID are shown as versions of one contract on the Portfolio page."
+            ).strip() or None
+        
         # Process document button
         if st.button("Analyze Contract"):
             # Parse the document
             with st.spinner("Parsing document..."):
                 document_info = parse_document(uploaded_file, uploaded_file.name)
                 
-                if not document_info["success"]:
-                    st.error(f"Failed to parse document: {document_info['error']}")
-                else:
-                    st.success("Document parsed successfully!")
-                    
-                    # Display a short preview of the extracted text
-                    with st.expander("Document Text Preview", expanded=False):
-                        preview_text = document_info["text"][:500] + "..." if len(document_info["text"]) > 500 else document_info["text"]
-                        st.text_area("Extracted Text", preview_text, height=150)
-                    
-                    # Run the analysis
-                    with st.spinner("Analyzing contract... This may take a few minutes..."):
-                        progress_bar = st.progress(0)
-                        
-                        # Create progress updates
-                        progress_steps = [
-                            "Extracting contract information...",
-                            "Identifying parties and key terms...",
-                            "Analyzing compliance requirements...",
-                            "Assessing risks and obligations...",
-                            "Generating final report..."
-                        ]
-                        
-                        # Show progress text
-                        progress_text = st.empty()
-                        
-                        # Create initial progress
-                        progress_text.text(progress_steps[0])
-                        progress_bar.progress(20)
-                        
-                        try:
-                            # Run the analysis with our CrewAI crew
-                            analysis_results = ContractAnalysisCrew.analyze_contract(document_info["text"])
-                            
-                            # Update progress to completion
-                            progress_bar.progress(100)
-                            progress_text.text("Analysis complete!")
-                            
-                            # Display results
-                            st.markdown("## Analysis Results")
-                            
-                            # Contract Data
-                            if "contract_details" in analysis_results:
-                                with st.expander("📋 Contract Information", expanded=True):
-                                    try:
-                                        if isinstance(analysis_results["contract_details"], dict):
-                                            st.json(analysis_results["contract_details"])
-                                        else:
-                                            st.text_area("Contract Data", str(analysis_results["contract_details"]), height=300)
-                                    except Exception:
-                                        st.text_area("Contract Data", str(analysis_results["contract_details"]), height=300)
-                            
-                            # Compliance Analysis
-                            if "compliance_analysis" in analysis_results:
-                                with st.expander("⚖️ Compliance Analysis", expanded=True):
-                                    try:
-                                        if isinstance(analysis_results["compliance_analysis"], dict):
-                                            st.json(analysis_results["compliance_analysis"])
-                                        else:
-                                            st.markdown(str(analysis_results["compliance_analysis"]))
-                                    except Exception:
-                                        st.markdown(str(analysis_results["compliance_analysis"]))
-                            
-                            # Risk Assessment
-                            if "risk_assessment" in analysis_results:
-                                with st.expander("🚨 Risk Assessment", expanded=True):
-                                    try:
-                                        if isinstance(analysis_results["risk_assessment"], dict):
-                                            st.json(analysis_results["risk_assessment"])
-                                        else:
-                                            st.markdown(str(analysis_results["risk_assessment"]))
-                                    except Exception:
-                                        st.markdown(str(analysis_results["risk_assessment"]))
-                            
-                            # Summary
-                            st.markdown("## Summary")
-                            st.info("Analysis completed successfully. Review the detailed findings in each section above.")
-                            
-                            # Add download option for the full analysis
-                            combined_analysis = {
-                                "document_name": uploaded_file.name,
-                                "analysis_date": time.strftime("%Y-%m-%d %H:%M:%S"),
-                                "analysis_results": analysis_results
-                            }
-                            
-                            # Convert to JSON for download
-                            analysis_json = json.dumps(combined_analysis, indent=2)
-                            st.download_button(
-                                label="Download Full Analysis Report",
-                                data=analysis_json,
-                                file_name=f"analysis-{uploaded_file.name.split('.')[0]}.json",
-                                mime="application/json"
-                            )
-                        except Exception as e:
-                            st.error(f"Error during analysis: {str(e)}")
-                            with st.expander("Detailed Error Information"):
-                                st.write(traceback.format_exc())
+            if not document_info["success"]:
+                st.error(f"Failed to parse document: {document_info['error']}")
+            else:
+                st.success("Document parsed successfully!")
+                
+                # Display a short preview of the extracted text
+                with st.expander("Document Text Preview", expanded=False):
+                    preview_text = document_info["text"][:500] + "..." if len(document_info["text"]) > 500 else document_info["text"]
+                    st.text_area("Extracted Text", preview_text, height=150)
+                
+                # Queue the analysis; a worker process runs it independently of this script
+                job_id = get_job_queue().submit(
+                    document_info["text"], document_name=uploaded_file.name, execution_mode=execution_mode,
+                    contract_id=contract_id
+                )
+                st.session_state["job_id"] = job_id
+                st.query_params["job"] = job_id
+    
+    # Show the current analysis job; the ID in the URL keeps it across browser refreshes
+    job_id = st.session_state.get("job_id") or st.query_params.get("job")
+    job_pending = show_job(get_job_queue(), job_id) if job_id else False
+    
+    # Analysis job statistics
+    with st.sidebar.expander("Analysis Jobs", expanded=False):
+        st.json(get_job_queue().stats())
+        for job in get_job_queue().list_jobs(limit=10):
+            st.write(f"{job['document_name'] or job['id'][:8]}: {job['status']}")
+    
+    # Analysis cache statistics
+    analysis_cache = get_analysis_cache()
+    clause_cache = get_clause_cache()
+    if analysis_cache is not None:
+        with st.sidebar.expander("Analysis Cache", expanded=False):
+            st.json({"analyses": analysis_cache.stats(), "clauses": clause_cache.stats()})
+            if st.button("Clear Cache"):
+                analysis_cache.clear()
+                clause_cache.clear()
     
     # Information about the analysis process
     with st.expander("How It Works", expanded=False):
@@ -321,6 +416,11 @@ def main():
         
         This system is built with CrewAI, an orchestration framework for agentic workflows.
         """)
+    
+    # Poll a pending job once the whole page, including the sidebar, has been rendered
+    if job_pending:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
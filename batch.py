@@ -0,0 +1,306 @@
+"""
+Batch analysis of a portfolio of IT contracts.
+
+Contracts are parsed in a process pool and analyzed by LLM crews through a
+bounded-concurrency scheduler that respects per-minute request and token
+budgets. Results are appended to a JSONL file as they complete, so an
+interrupted run resumes where it stopped. Every analysis is also saved to
+the contract store (see utils/contract_store.py) under its contract ID.
+
+Example:
+    python batch.py contracts/ --output results.jsonl --workers 4 --rpm 60 --tpm 90000
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from utils.document_parser import parse_document_path
+from utils.scheduler import BatchScheduler
+from utils.telemetry import get_tracer, start_metrics_server
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+
+# Rough token estimate: ~4 characters per token for the contract itself,
+# plus upstream context and instructions for the three tasks
+CHARS_PER_TOKEN = 4
+TOKEN_OVERHEAD_PER_CONTRACT = 6000
+REQUESTS_PER_CONTRACT = 3
+
+
+def discover_contracts(source: str) -> List[Dict[str, str]]:
+    """
+    List the contracts to analyze from a directory or a manifest file.
+
+    A manifest is a .txt file with one path per line, a .csv file with a
+    "path" column (and optional "id" column) or a .jsonl file with "path"
+    (and optional "id") fields. Relative paths are resolved against the
+    manifest's directory.
+
+    Args:
+        source: Directory to scan recursively, or path to a manifest
+
+    Returns:
+        List of {"id": ..., "path": ...} entries in a stable order
+    """
+    if os.path.isdir(source):
+        contracts = []
+        for root, _, files in os.walk(source):
+            for filename in sorted(files):
+                if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    contracts.append({"id": os.path.relpath(path, source), "path": path})
+        return sorted(contracts, key=lambda contract: contract["id"])
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    entries = []
+    if source.endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            entries = [{"id": row.get("id"), "path": row["path"]} for row in csv.DictReader(f)]
+    elif source.endswith(".jsonl"):
+        with open(source, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(source, encoding="utf-8") as f:
+            entries = [{"path": line.strip()} for line in f if line.strip() and not line.startswith("#")]
+
+    contracts = []
+    for entry in entries:
+        path = entry["path"] if os.path.isabs(entry["path"]) else os.path.join(base_dir, entry["path"])
+        contracts.append({"id": entry.get("id") or entry["path"], "path": path})
+    return contracts
+
+
+def load_completed(output_path: str) -> set:
+    """
+    Read the IDs of contracts that were already analyzed successfully.
+
+    Args:
+        output_path: JSONL results file of a previous run
+
+    Returns:
+        Set of contract IDs with a "success" status
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line behind
+                continue
+            if record.get("status") == "success":
+                completed.add(record["id"])
+    return completed
+
+
+def _parse_contract(path: str) -> dict:
+    """Parse a memory-mapped contract file in a worker process."""
+    document_info = parse_document_path(path)
+    document_info["sha256"] = document_info["metadata"].get("sha256")
+    return document_info
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens a full analysis of the text will consume."""
+    return len(text) // CHARS_PER_TOKEN + TOKEN_OVERHEAD_PER_CONTRACT
+
+
+class _ResultWriter:
+    """Thread-safe, append-only JSONL writer that flushes every record to disk."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # A crash can leave a truncated last line; start the next record on a line of its own
+        truncated = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                truncated = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if truncated:
+            self._file.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        with self._lock:
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def run_batch(source: str, output_path: str, workers: int = 4, parse_processes: Optional[int] = None,
+              requests_per_minute: int = 0, tokens_per_minute: int = 0, max_retries: int = 3,
+              execution_mode: str = "sequential", use_cache: bool = True) -> dict:
+    """
+    Analyze every contract in a directory or manifest.
+
+    Args:
+        source: Directory of contracts or manifest file
+        output_path: JSONL file results are appended to
+        workers: Maximum number of crews running at the same time
+        parse_processes: Number of processes used for document parsing
+        requests_per_minute: LLM request budget per minute (0 for unlimited)
+        tokens_per_minute: LLM token budget per minute (0 for unlimited)
+        max_retries: Number of retries for an analysis that raises, e.g. on rate limits or timeouts
+        execution_mode: Execution mode passed to ContractAnalysisCrew.analyze_contract
+        use_cache: Whether to use the analysis result cache
+
+    Returns:
+        dict: Summary with the number of analyzed, skipped and failed contracts
+    """
+    # Imported here so parser worker processes don't load the LLM stack
+    from crew import ContractAnalysisCrew
+
+    contracts = discover_contracts(source)
+    completed = load_completed(output_path)
+    pending = [contract for contract in contracts if contract["id"] not in completed]
+
+    summary = {"total": len(contracts), "skipped": len(contracts) - len(pending), "succeeded": 0, "failed": 0}
+    print(f"Found {len(contracts)} contracts, {summary['skipped']} already analyzed, {len(pending)} to go")
+    if not pending:
+        return summary
+
+    writer = _ResultWriter(output_path)
+    summary_lock = threading.Lock()
+    start_time = time.time()
+
+    def analyze(contract, document_info):
+        started = time.time()
+        result = ContractAnalysisCrew.analyze_contract(
+            document_info["text"], use_cache=use_cache, execution_mode=execution_mode, contract_id=contract["id"]
+        )
+        if "error" in result:
+            # The LLM answered but its output could not be structured; retrying
+            # would spend the same tokens again, so the contract is recorded as failed
+            return {
+                "id": contract["id"],
+                "path": contract["path"],
+                "sha256": document_info["sha256"],
+                "status": "failed",
+                "duration_seconds": round(time.time() - started, 3),
+                "error": result["error"]
+            }
+        return {
+            "id": contract["id"],
+            "path": contract["path"],
+            "sha256": document_info["sha256"],
+            "status": "success",
+            "duration_seconds": round(time.time() - started, 3),
+            "result": result
+        }
+
+    def write_record(record):
+        writer.write(record)
+        with summary_lock:
+            summary["succeeded" if record["status"] == "success" else "failed"] += 1
+
+    def record_failure(contract, error, sha256=None):
+        write_record({
+            "id": contract["id"],
+            "path": contract["path"],
+            "sha256": sha256,
+            "status": "failed",
+            "error": error
+        })
+
+    def on_analysis_done(future, contract, sha256):
+        # Runs in the scheduler thread that finished the analysis, so every result
+        # reaches the file as soon as it is ready, even while parsing continues
+        try:
+            record = future.result()
+        except Exception as e:
+            record_failure(contract, str(e), sha256)
+            print(f"✗ {contract['id']}: {str(e)}")
+            return
+        write_record(record)
+        if record["status"] == "success":
+            print(f"✓ {contract['id']}")
+        else:
+            print(f"✗ {contract['id']}: {record['error']}")
+
+    try:
+        with ProcessPoolExecutor(max_workers=parse_processes) as parser_pool, \
+                BatchScheduler(max_concurrency=workers, requests_per_minute=requests_per_minute,
+                               tokens_per_minute=tokens_per_minute, max_retries=max_retries) as scheduler:
+            parse_futures = {parser_pool.submit(_parse_contract, contract["path"]): contract for contract in pending}
+
+            # Dispatch each contract to the scheduler as soon as it is parsed
+            for future in as_completed(parse_futures):
+                contract = parse_futures[future]
+                try:
+                    document_info = future.result()
+                except Exception as e:
+                    record_failure(contract, f"Error parsing document: {str(e)}")
+                    continue
+
+                if not document_info["success"]:
+                    record_failure(contract, document_info["error"], document_info.get("sha256"))
+                    continue
+
+                def on_retry(attempt, error, delay, contract_id=contract["id"]):
+                    print(f"Retrying {contract_id} in {delay:.1f}s (attempt {attempt}): {str(error)}")
+                    get_tracer().metrics.increment("retries_total", "analyze_contract")
+
+                analysis_future = scheduler.submit(
+                    lambda contract=contract, document_info=document_info: analyze(contract, document_info),
+                    requests=REQUESTS_PER_CONTRACT,
+                    tokens=estimate_tokens(document_info["text"]),
+                    on_retry=on_retry
+                )
+                analysis_future.add_done_callback(
+                    lambda future, contract=contract, sha256=document_info["sha256"]:
+                        on_analysis_done(future, contract, sha256)
+                )
+            # Leaving the scheduler waits for the remaining analyses and their callbacks
+    finally:
+        writer.close()
+
+    summary["duration_seconds"] = round(time.time() - start_time, 3)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a portfolio of IT contracts in batch.")
+    parser.add_argument("source", help="Directory of contracts or manifest file (.txt, .csv or .jsonl)")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Maximum number of concurrent analyses")
+    parser.add_argument("--parse-processes", type=int, default=None, help="Number of document parsing processes")
+    parser.add_argument("--rpm", type=int, default=0, help="LLM requests per minute budget (0 for unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="LLM tokens per minute budget (0 for unlimited)")
+    parser.add_argument("--max-retries", type=int, default=3, help="Retries per contract on LLM errors such as rate limits")
+    parser.add_argument("--mode", choices=["sequential", "parallel", "fast"], default="sequential",
+                        help="Execution mode for each analysis")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the analysis result cache")
+    args = parser.parse_args(argv)
+
+    # Expose Prometheus metrics while the batch runs if METRICS_PORT is set
+    start_metrics_server()
+    summary = run_batch(
+        args.source, args.output,
+        workers=args.workers,
+        parse_processes=args.parse_processes,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_retries=args.max_retries,
+        execution_mode=args.mode,
+        use_cache=not args.no_cache
+    )
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
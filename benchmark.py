@@ -0,0 +1,519 @@
+"""
+End-to-end benchmarks of the contract analysis pipeline.
+
+Every contract in data/*.txt is benchmarked at its original length and
+synthetically scaled up, rendered as TXT, PDF and DOCX. For each document the
+harness times document parsing, text chunking, the three agent tools and the
+full ContractAnalysisCrew pipeline against the local mock LLM, and reports
+latency percentiles, peak memory, token counts and throughput as JSON.
+
+Example:
+    python benchmark.py --repeat 5 --output benchmark.json
+    python benchmark.py --scales 1 10 --compare benchmark.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from typing import Any, Callable, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Bump when stages or metrics change so results of different versions are not compared
+BENCHMARK_VERSION = "1"
+
+DEFAULT_SCALES = (1, 10, 100)
+FORMATS = ("txt", "pdf", "docx")
+PERCENTILES = (50, 90, 99)
+
+# Queries run against the compliance knowledge base for every document
+COMPLIANCE_QUERIES = (
+    ("personal data breach notification", "EU"),
+    ("consumer right to delete personal information", "California"),
+    ("encryption of cardholder data", None),
+    ("audit of internal controls over financial reporting", "SOX")
+)
+
+# A stage regresses when its median latency grows by more than this fraction...
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+# ...and by more than this many milliseconds, to ignore noise on very fast stages
+MIN_REGRESSION_MS = 1.0
+
+# PDF rendering layout
+PDF_LINE_CHARS = 95
+PDF_LINES_PER_PAGE = 64
+
+
+def load_contracts(data_dir: str = DATA_DIR) -> Dict[str, str]:
+    """
+    Read the bundled sample contracts.
+
+    Args:
+        data_dir: Directory of .txt contracts
+
+    Returns:
+        Mapping of contract name to text, in file name order
+    """
+    contracts = {}
+    for filename in sorted(os.listdir(data_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(data_dir, filename), encoding="utf-8") as f:
+                contracts[os.path.splitext(filename)[0]] = f.read()
+    return contracts
+
+
+def scale_contract(text: str, factor: int) -> str:
+    """Make a contract `factor` times longer by appending numbered copies of it."""
+    if factor <= 1:
+        return text
+    copies = [text] + [f"SCHEDULE {index}\n\n{text}" for index in range(2, factor + 1)]
+    return "\n\n".join(copies)
+
+
+def render_docx(text: str, path: str):
+    """
+    Write text as a minimal DOCX document with one paragraph per line.
+
+    Args:
+        text: Document text
+        path: Destination file path
+    """
+    paragraphs = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>' for line in text.split("\n")
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        docx.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/>'
+            '</Relationships>'
+        ))
+        docx.writestr("word/document.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        ))
+
+
+def render_pdf(text: str, path: str):
+    """
+    Write text as a PDF with a Helvetica text layer, wrapping long lines.
+
+    Args:
+        text: Document text (characters outside Latin-1 are replaced)
+        path: Destination file path
+    """
+    lines = []
+    for line in text.split("\n"):
+        while len(line) > PDF_LINE_CHARS:
+            lines.append(line[:PDF_LINE_CHARS])
+            line = line[PDF_LINE_CHARS:]
+        lines.append(line)
+    pages = [lines[start:start + PDF_LINES_PER_PAGE] for start in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+
+    def pdf_string(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    # Objects 1-3 are the catalog, the page tree and the font; each page adds a page and a content stream
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    page_ids = []
+    for page_lines in pages:
+        stream = "BT /F1 9 Tf 11 TL 40 760 Td " + " ".join(f"({pdf_string(line)}) '" for line in page_lines) + " ET"
+        stream = stream.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+def build_corpus(workdir: str, scales=DEFAULT_SCALES, formats=FORMATS, data_dir: str = DATA_DIR) -> List[Dict[str, Any]]:
+    """
+    Create the scaled contracts and their file renderings.
+
+    Args:
+        workdir: Directory the rendered files are written to
+        scales: Length multipliers
+        formats: File formats to render
+        data_dir: Directory of the original contracts
+
+    Returns:
+        List of documents with "name", "scale", "text" and the rendered file "paths"
+    """
+    corpus = []
+    for name, text in load_contracts(data_dir).items():
+        for scale in scales:
+            scaled = scale_contract(text, scale)
+            paths = {}
+            for file_format in formats:
+                path = os.path.join(workdir, f"{name}-{scale}x.{file_format}")
+                if file_format == "pdf":
+                    render_pdf(scaled, path)
+                elif file_format == "docx":
+                    render_docx(scaled, path)
+                else:
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(scaled)
+                paths[file_format] = path
+            corpus.append({"name": name, "scale": scale, "text": scaled, "paths": paths})
+    return corpus
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of a list of values."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def measure(run: Callable[[], Any], repeat: int, work_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Time a stage and measure its peak Python memory.
+
+    The stage runs once to warm caches, `repeat` times for timing and once more
+    under tracemalloc for the memory peak, so tracing does not skew the timings.
+
+    Args:
+        run: Function executing the stage once
+        repeat: Number of timed runs
+        work_chars: Characters processed per run, to report throughput
+
+    Returns:
+        dict: Latency statistics in milliseconds, peak memory and throughput,
+        plus the "output" of the last run
+    """
+    output = run()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = run()
+        durations.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    metrics = {
+        "runs": repeat,
+        "mean_ms": round(sum(durations) / len(durations), 3),
+        "min_ms": round(min(durations), 3),
+        "max_ms": round(max(durations), 3),
+        **{f"p{pct}_ms": round(percentile(durations, pct), 3) for pct in PERCENTILES},
+        "peak_memory_bytes": peak
+    }
+    median_seconds = metrics["p50_ms"] / 1000
+    if work_chars is not None and median_seconds > 0:
+        metrics["throughput_chars_per_second"] = round(work_chars / median_seconds)
+    metrics["output"] = output
+    return metrics
+
+
+def _skipped(reason: str) -> Dict[str, Any]:
+    return {"skipped": reason}
+
+
+def benchmark_document(document: Dict[str, Any], repeat: int, pipeline_modes=("sequential",),
+                       pipeline_repeat: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark every stage on one document.
+
+    Stages whose dependencies are not installed are reported as skipped.
+
+    Args:
+        document: Entry of build_corpus
+        repeat: Number of timed runs of the parsing and tool stages
+        pipeline_modes: Execution modes of the full pipeline to benchmark
+        pipeline_repeat: Number of timed pipeline runs (defaults to repeat)
+
+    Returns:
+        dict: Metrics keyed by stage name
+    """
+    from utils.document_parser import chunk_text, parse_document_path
+
+    text = document["text"]
+    stages = {}
+
+    for file_format, path in document["paths"].items():
+        size = os.path.getsize(path)
+        try:
+            metrics = measure(lambda: parse_document_path(path, use_cache=False), repeat, len(text))
+        except ImportError as e:
+            stages[f"parse_{file_format}"] = _skipped(str(e))
+            continue
+        parsed = metrics.pop("output")
+        if not parsed["success"]:
+            stages[f"parse_{file_format}"] = _skipped(parsed["error"])
+            continue
+        metrics["file_bytes"] = size
+        stages[f"parse_{file_format}"] = metrics
+
+    metrics = measure(lambda: chunk_text(text), repeat, len(text))
+    metrics["chunks"] = len(metrics.pop("output"))
+    stages["chunk_text"] = metrics
+
+    try:
+        from tools import ComplianceDatabaseTool, ContractParsingTool, RiskEvaluationTool
+    except ImportError as e:
+        for name in ("contract_parsing_tool", "compliance_database_tool", "risk_evaluation_tool"):
+            stages[name] = _skipped(str(e))
+    else:
+        parsing_tool, compliance_tool, risk_tool = ContractParsingTool(), ComplianceDatabaseTool(), RiskEvaluationTool()
+        stages["contract_parsing_tool"] = measure(lambda: parsing_tool._run(text), repeat, len(text))
+        stages["compliance_database_tool"] = measure(
+            lambda: [compliance_tool._run(query, jurisdiction) for query, jurisdiction in COMPLIANCE_QUERIES], repeat
+        )
+        stages["compliance_database_tool"]["queries"] = len(COMPLIANCE_QUERIES)
+        stages["risk_evaluation_tool"] = measure(lambda: risk_tool._run(text), repeat, len(text))
+        for name in ("contract_parsing_tool", "compliance_database_tool", "risk_evaluation_tool"):
+            stages[name].pop("output")
+
+    for mode in pipeline_modes:
+        name = f"pipeline_{mode}"
+        try:
+            from crew import ContractAnalysisCrew
+            metrics = measure(
+                lambda: ContractAnalysisCrew.analyze_contract(text, use_cache=False, execution_mode=mode),
+                pipeline_repeat or repeat, len(text)
+            )
+        except ImportError as e:
+            stages[name] = _skipped(str(e))
+            continue
+        results = metrics.pop("output")
+        execution = results.get("execution", {})
+        metrics["tokens"] = execution.get("total_tokens")
+        metrics["llm_requests"] = (execution.get("total_tokens") or {}).get("successful_requests")
+        metrics["structured"] = "error" not in results
+        stages[name] = metrics
+
+    return stages
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                   capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip() or None
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, formats=FORMATS, repeat: int = 5, pipeline_modes=("sequential",),
+                   pipeline_repeat: Optional[int] = None, llm_latency_ms: float = 0.0,
+                   llm_tokens_per_second: float = 0.0, data_dir: str = DATA_DIR) -> Dict[str, Any]:
+    """
+    Run the benchmark suite.
+
+    The pipeline runs against the in-process mock LLM in synthetic mode, with
+    the given simulated latency (none by default, so only the pipeline's own
+    overhead is measured).
+
+    Args:
+        scales: Length multipliers of the contracts
+        formats: File formats to parse
+        repeat: Number of timed runs per stage
+        pipeline_modes: Execution modes of the full pipeline to benchmark
+        pipeline_repeat: Number of timed pipeline runs (defaults to repeat)
+        llm_latency_ms: Median simulated time to first token of the mock LLM
+        llm_tokens_per_second: Simulated decoding speed of the mock LLM; 0 disables it
+        data_dir: Directory of the original contracts
+
+    Returns:
+        dict: Machine-readable benchmark report
+    """
+    os.environ["LLM_PROVIDER"] = "mock"
+    os.environ["MOCK_LLM_MODE"] = "synthetic"
+    os.environ.pop("MOCK_LLM_URL", None)
+    os.environ["MOCK_LLM_LATENCY_MS"] = str(llm_latency_ms)
+    os.environ["MOCK_LLM_TOKENS_PER_SECOND"] = str(llm_tokens_per_second)
+
+    started = time.perf_counter()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for document in build_corpus(workdir, scales, formats, data_dir):
+            print(f"Benchmarking {document['name']} at {document['scale']}x ({len(document['text']):,} chars)...",
+                  file=sys.stderr)
+            results.append({
+                "document": document["name"],
+                "scale": document["scale"],
+                "chars": len(document["text"]),
+                "stages": benchmark_document(document, repeat, pipeline_modes, pipeline_repeat)
+            })
+
+    return {
+        "benchmark_version": BENCHMARK_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "scales": list(scales),
+            "formats": list(formats),
+            "repeat": repeat,
+            "pipeline_modes": list(pipeline_modes),
+            "pipeline_repeat": pipeline_repeat or repeat,
+            "llm_latency_ms": llm_latency_ms,
+            "llm_tokens_per_second": llm_tokens_per_second
+        },
+        "results": results,
+        "max_rss_bytes": _max_rss_bytes(),
+        "total_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Find stages whose median latency regressed against a baseline report.
+
+    Args:
+        current: Report of this run
+        baseline: Report of a previous run
+        threshold: Allowed relative growth of the median latency
+
+    Returns:
+        List of regressions with the document, scale, stage and both medians
+    """
+    baseline_stages = {
+        (result["document"], result["scale"], stage): metrics
+        for result in baseline.get("results", []) for stage, metrics in result["stages"].items()
+    }
+    regressions = []
+    for result in current["results"]:
+        for stage, metrics in result["stages"].items():
+            previous = baseline_stages.get((result["document"], result["scale"], stage))
+            if not previous or "p50_ms" not in previous or "p50_ms" not in metrics:
+                continue
+            growth = metrics["p50_ms"] - previous["p50_ms"]
+            if growth > MIN_REGRESSION_MS and growth > threshold * previous["p50_ms"]:
+                regressions.append({
+                    "document": result["document"],
+                    "scale": result["scale"],
+                    "stage": stage,
+                    "baseline_p50_ms": previous["p50_ms"],
+                    "p50_ms": metrics["p50_ms"]
+                })
+    return regressions
+
+
+def print_summary(report: Dict[str, Any]):
+    """Print a human-readable table of the report to stderr."""
+    print(f"\n{'document':<40} {'stage':<26} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} "
+          f"{'peak MB':>8} {'chars/s':>12} {'tokens':>8}", file=sys.stderr)
+    for result in report["results"]:
+        label = f"{result['document']} {result['scale']}x"
+        for stage, metrics in result["stages"].items():
+            if "skipped" in metrics:
+                print(f"{label:<40} {stage:<26} skipped: {metrics['skipped']}", file=sys.stderr)
+                continue
+            tokens = (metrics.get("tokens") or {}).get("total_tokens", "")
+            print(f"{label:<40} {stage:<26} {metrics['p50_ms']:>10.2f} {metrics['p90_ms']:>10.2f} "
+                  f"{metrics['p99_ms']:>10.2f} {metrics['peak_memory_bytes'] / 1e6:>8.2f} "
+                  f"{metrics.get('throughput_chars_per_second', ''):>12} {tokens:>8}", file=sys.stderr)
+    if report["max_rss_bytes"]:
+        print(f"\nMax RSS: {report['max_rss_bytes'] / 1e6:.1f} MB, total {report['total_seconds']:.1f}s", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the contract analysis pipeline on the bundled contracts.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="Contract length multipliers")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="File formats to parse")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage")
+    parser.add_argument("--pipeline-modes", nargs="*", default=["sequential"],
+                        choices=["sequential", "parallel", "fast"], help="Pipeline execution modes (none to skip)")
+    parser.add_argument("--pipeline-repeat", type=int, default=None, help="Timed pipeline runs (defaults to --repeat)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated mock LLM time to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0, help="Simulated mock LLM decoding speed")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", default=None, help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Allowed relative growth of a stage's median latency")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        scales=args.scales,
+        formats=args.formats,
+        repeat=args.repeat,
+        pipeline_modes=args.pipeline_modes,
+        pipeline_repeat=args.pipeline_repeat,
+        llm_latency_ms=args.llm_latency_ms,
+        llm_tokens_per_second=args.llm_tokens_per_second
+    )
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("benchmark_version") != BENCHMARK_VERSION:
+            print(f"Baseline was produced by benchmark version {baseline.get('benchmark_version')}; not comparing",
+                  file=sys.stderr)
+        else:
+            report["regressions"] = compare_reports(report, baseline, args.threshold)
+            report["baseline_commit"] = baseline.get("git_commit")
+
+    print_summary(report)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+    for regression in report.get("regressions", []):
+        print(f"REGRESSION {regression['document']} {regression['scale']}x {regression['stage']}: "
+              f"{regression['baseline_p50_ms']:.2f} ms -> {regression['p50_ms']:.2f} ms", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Clause-level search across a portfolio of IT contracts.
+
+Contracts are split into clauses and embedded into a local vector index
+(see utils/clause_index.py), so questions such as "which contracts have
+uncapped liability?" are answered without running the agents. Embeddings
+are cached, so re-indexing unchanged contracts makes no model calls.
+
+Example:
+    python clause_search.py index contracts/
+    python clause_search.py query "uncapped liability" --top-k 10 --by-contract
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from batch import _parse_contract, discover_contracts
+from utils.clause_index import get_clause_index, save_clause_index
+
+
+def index_contracts(source: str, parse_processes: Optional[int] = None, prune: bool = False) -> dict:
+    """
+    Add the contracts of a directory or manifest to the clause index and save it.
+
+    Args:
+        source: Directory of contracts or manifest file, as accepted by batch.py
+        parse_processes: Number of document parsing processes
+        prune: Remove indexed contracts that are no longer part of the source
+
+    Returns:
+        dict: Counts of indexed, unchanged, failed and removed contracts and the index size
+    """
+    started = time.perf_counter()
+    contracts = discover_contracts(source)
+    index = get_clause_index()
+    summary = {"contracts": len(contracts), "indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+
+    with ProcessPoolExecutor(max_workers=parse_processes) as pool:
+        for contract, document_info in zip(contracts, pool.map(_parse_contract, [c["path"] for c in contracts])):
+            if not document_info.get("success"):
+                print(f"Could not parse {contract['path']}: {document_info.get('error')}")
+                summary["failed"] += 1
+            elif index.add_contract(contract["id"], document_info["text"], {"path": contract["path"]}):
+                summary["indexed"] += 1
+            else:
+                summary["unchanged"] += 1
+
+    if prune:
+        current = {contract["id"] for contract in contracts}
+        for contract_id in [contract_id for contract_id in index.contracts if contract_id not in current]:
+            summary["removed"] += index.remove_contract(contract_id)
+
+    save_clause_index()
+    summary.update(clauses=len(index), seconds=round(time.perf_counter() - started, 2))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the clauses of a portfolio of IT contracts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="Add contracts to the clause index")
+    index_parser.add_argument("source", help="Directory of contracts or manifest file (.txt, .csv or .jsonl)")
+    index_parser.add_argument("--parse-processes", type=int, default=None, help="Number of document parsing processes")
+    index_parser.add_argument("--prune", action="store_true", help="Remove contracts that are not in the source")
+
+    query_parser = commands.add_parser("query", help="Find the clauses most similar to a query")
+    query_parser.add_argument("query", help="Search text, e.g. \"uncapped liability\"")
+    query_parser.add_argument("-k", "--top-k", type=int, default=10, help="Number of results")
+    query_parser.add_argument("--contract-id", default=None, help="Only search this contract")
+    query_parser.add_argument("--by-contract", action="store_true", help="Rank contracts by their best matching clause")
+    args = parser.parse_args(argv)
+
+    if args.command == "index":
+        print(json.dumps(index_contracts(args.source, args.parse_processes, args.prune), indent=2))
+        return 0
+
+    index = get_clause_index()
+    if args.by_contract:
+        results = index.search_contracts(args.query, top_k=args.top_k)
+    else:
+        results = index.search(args.query, top_k=args.top_k, contract_id=args.contract_id)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,64 @@
-from crewai import Crew, Process
-from tasks import create_contract_extraction_task, create_compliance_analysis_task, create_risk_assessment_task
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable
+from tasks import (
+    EXTRACTION_FIELDS,
+    TASK_AGENTS,
+    create_chunk_extraction_task,
+    create_clause_review_task,
+    create_compliance_analysis_task,
+    create_contract_extraction_task,
+    create_risk_assessment_task,
+    create_structuring_messages,
+    format_upstream_context,
+    get_prompt_fingerprint
+)
+from agents import agent_pool, get_json_llm, get_llm_config, supports_json_mode
+from schemas import TASK_SCHEMAS, ClauseFindings, get_output_model
+from utils.analysis_cache import compute_cache_key, get_analysis_cache, get_clause_cache
+from utils.clause_diff import diff_clause_units, merge_clause_findings, pack_units, risk_redline, split_clause_units
+from utils.contract_store import get_contract_store
+from utils.extraction import merge_extractions
+from utils.json_extract import extract_json, validate_json
+from utils.rule_extractor import RULES_VERSION, extract_rule_fields, split_by_confidence
+from utils.segmenter import chunk_by_clauses
+from utils.task_graph import run_task_graph, summarize_latency
+from utils.telemetry import get_tracer, propagate, record_usage, span, summarize_spans
+from utils.token_budget import count_tokens, get_task_budget
+
+# Supported values for the execution_mode option of analyze_contract
+EXECUTION_MODES = ("sequential", "parallel", "fast")
+
+# Task names in the order the sequential crew executes them
+STAGE_NAMES = ("contract_details", "compliance_analysis", "risk_assessment")
+
+# Contracts longer than this are extracted chunk by chunk (map-reduce)
+MAP_REDUCE_THRESHOLD = 12000
+MAP_REDUCE_CHUNK_SIZE = 8000
+MAP_REDUCE_MAX_WORKERS = int(os.getenv("MAP_REDUCE_MAX_WORKERS", "4"))
+
+# Index analyzed contracts by clause and let the compliance and risk agents
+# retrieve relevant clauses with their tools (see utils/clause_index.py)
+CLAUSE_RETRIEVAL = os.getenv("CLAUSE_RETRIEVAL", "0").lower() in ("1", "true", "yes")
+
+# Number of running analyses that added each contract to the clause index; the
+# contract is removed from the index when the last of them finishes
+_retrieval_refs = {}
+_retrieval_lock = threading.Lock()
+
+# Clause units reviewed by one task in revision mode
+CLAUSE_BATCH_SIZE = 6000
+
+# Times a task is run again when its output is not valid JSON of the expected shape
+# and a JSON-mode call could not restructure it
+OUTPUT_RETRIES = int(os.getenv("TASK_OUTPUT_RETRIES", "1"))
+
+# Token counters reported for every stage
+TOKEN_METRICS = ("total_tokens", "prompt_tokens", "completion_tokens", "successful_requests")
 
 class ContractAnalysisCrew:
     """
@@ -7,117 +66,933 @@ class ContractAnalysisCrew:
     """
     
     @staticmethod
-    def create_crew(contract_text: str) -> Crew:
+    def create_tasks(contract_text: str, execution_mode: str = "sequential", contract_details: dict = None,
+                     known_fields: dict = None, field_hints: dict = None, contract_id: str = None) -> dict:
         """
-        Create a crew to analyze a contract.
+        Create the analysis tasks and wire their contexts.
+        
+        In "sequential" and "parallel" mode the risk assessment depends on both the
+        extraction and the compliance analysis. In "fast" mode it depends on the
+        extraction only, so it can run at the same time as the compliance analysis.
+        
+        With CLAUSE_RETRIEVAL enabled, the contract is added to the clause index
+        (unless its contract_id is given) and the compliance and risk agents are
+        told its ID, so their tools can retrieve the clauses relevant to each
+        question instead of the whole contract.
         
         Args:
             contract_text: The text content of the contract to analyze
+            execution_mode: One of EXECUTION_MODES
+            contract_details: Contract information that was already extracted (e.g. by
+                map-reduce extraction). When given, no extraction task is created and the
+                details are included in the downstream prompts instead.
+            known_fields: Fields found by the rule-based pre-extraction with high
+                confidence; the extraction task skips them and the downstream tasks
+                receive them directly
+            field_hints: Low-confidence rule-based findings passed to the extraction task
+            contract_id: ID of the already indexed contract in the clause index
             
         Returns:
-            Crew: A configured CrewAI crew for contract analysis
+            dict: Tasks keyed by stage name, in sequential execution order
         """
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{execution_mode}'. Expected one of: {', '.join(EXECUTION_MODES)}")
+        
+        if CLAUSE_RETRIEVAL and contract_id is None:
+            contract_id = ContractAnalysisCrew.index_contract(contract_text)
+        
+        if contract_details is not None:
+            compliance_analysis = create_compliance_analysis_task(contract_details=contract_details, contract_id=contract_id)
+            risk_assessment = create_risk_assessment_task(contract_details=contract_details, contract_id=contract_id)
+            risk_assessment.context = [] if execution_mode == "fast" else [compliance_analysis]
+            return dict(zip(STAGE_NAMES[1:], (compliance_analysis, risk_assessment)))
+        
         # Create tasks with the contract text
-        contract_extraction = create_contract_extraction_task(contract_text)
-        compliance_analysis = create_compliance_analysis_task()
-        risk_assessment = create_risk_assessment_task()
+        contract_extraction = create_contract_extraction_task(contract_text, known_fields, field_hints)
+        compliance_analysis = create_compliance_analysis_task(known_fields=known_fields, contract_id=contract_id)
+        risk_assessment = create_risk_assessment_task(known_fields=known_fields, contract_id=contract_id)
         
         # Update the context of downstream tasks
         compliance_analysis.context = [contract_extraction]
-        risk_assessment.context = [contract_extraction, compliance_analysis]
+        if execution_mode == "fast":
+            risk_assessment.context = [contract_extraction]
+        else:
+            risk_assessment.context = [contract_extraction, compliance_analysis]
+        
+        return dict(zip(STAGE_NAMES, (contract_extraction, compliance_analysis, risk_assessment)))
+    
+    @staticmethod
+    def index_contract(contract_text: str, contract_id: str = None, metadata: dict = None) -> str:
+        """
+        Add a contract to the process-wide clause index.
+        
+        Args:
+            contract_text: The text content of the contract
+            contract_id: ID of the contract in the index; derived from the normalized
+                text if omitted, so the same contract always gets the same ID
+            metadata: Optional information returned with search hits
+            
+        Returns:
+            str: The contract's ID in the index
+        """
+        from utils.clause_index import get_clause_index
+        
+        contract_id = contract_id or compute_cache_key(contract_text, variant="clause_index")[:16]
+        with span("index_contract") as index_span:
+            index_span.set_attributes(clauses=get_clause_index().add_contract(contract_id, contract_text, metadata))
+        return contract_id
+    
+    @staticmethod
+    @contextmanager
+    def _clause_retrieval(contract_text: str):
+        """
+        Keep a contract in the clause index while an analysis of it runs.
+        
+        Contracts that were already indexed (e.g. by clause_search.py) stay in the
+        index. Contracts added for the analysis are removed once no running
+        analysis uses them, so the process-wide index does not grow with every
+        analyzed contract.
+        
+        Args:
+            contract_text: The text content of the contract
+            
+        Yields:
+            str: The contract's ID in the clause index, or None if CLAUSE_RETRIEVAL is off
+        """
+        if not CLAUSE_RETRIEVAL:
+            yield None
+            return
+        
+        from utils.clause_index import get_clause_index
+        
+        index = get_clause_index()
+        contract_id = compute_cache_key(contract_text, variant="clause_index")[:16]
+        with _retrieval_lock:
+            added = contract_id in _retrieval_refs or contract_id not in index.contracts
+            if added:
+                _retrieval_refs[contract_id] = _retrieval_refs.get(contract_id, 0) + 1
+        try:
+            yield ContractAnalysisCrew.index_contract(contract_text, contract_id)
+        finally:
+            if added:
+                with _retrieval_lock:
+                    _retrieval_refs[contract_id] -= 1
+                    if not _retrieval_refs[contract_id]:
+                        del _retrieval_refs[contract_id]
+                        index.remove_contract(contract_id)
+    
+    @staticmethod
+    def store_analysis(contract_text: str, results: dict, contract_id: str = None):
+        """
+        Save an analysis to the contract store, unless the store is disabled.
+        
+        The stored contract ID and version are added to the results as their
+        "store" section. A failing store is reported but does not fail the analysis.
+        
+        Args:
+            contract_text: The text content of the analyzed contract
+            results: Structured analysis results
+            contract_id: ID of the contract in the store; derived from the
+                normalized text if omitted
+        """
+        store = get_contract_store()
+        if store is None:
+            return
+        
+        with span("store_analysis") as store_span:
+            try:
+                results["store"] = store.save(contract_text, results, contract_id)
+                store_span.set_attributes(**results["store"])
+            except Exception as e:
+                print(f"Could not save the analysis to the contract store: {str(e)}")
+    
+    @staticmethod
+    def create_crew(contract_text: str, contract_details: dict = None, known_fields: dict = None,
+                    field_hints: dict = None) -> "Crew":
+        """
+        Create a crew to analyze a contract.
+        
+        Args:
+            contract_text: The text content of the contract to analyze
+            contract_details: Optional contract information that was already extracted
+            known_fields: Optional high-confidence rule-based extraction results
+            field_hints: Optional low-confidence rule-based findings
+            
+        Returns:
+            Crew: A configured CrewAI crew for contract analysis
+        """
+        from crewai import Crew, Process
+        
+        tasks = ContractAnalysisCrew.create_tasks(
+            contract_text, contract_details=contract_details, known_fields=known_fields, field_hints=field_hints
+        )
+        # The crew keeps its agents for as long as the caller holds it, so they are not pooled
+        for name, task in tasks.items():
+            task.agent = agent_pool.create(TASK_AGENTS[name])
         
         # Create and return the crew
         return Crew(
-            tasks=[contract_extraction, compliance_analysis, risk_assessment],
+            tasks=list(tasks.values()),
             process=Process.sequential,  # Execute tasks in order
             verbose=True,
         )
     
     @staticmethod
-    def analyze_contract(contract_text: str) -> dict:
+    def build_task_graph(tasks: dict) -> dict:
+        """
+        Derive the dependency graph of a set of tasks from their contexts.
+        
+        Args:
+            tasks: Tasks keyed by stage name
+            
+        Returns:
+            dict: Mapping of stage name to the names of the stages it depends on
+        """
+        names = {id(task): name for name, task in tasks.items()}
+        return {
+            name: [names[id(context_task)] for context_task in (task.context or []) if id(context_task) in names]
+            for name, task in tasks.items()
+        }
+    
+    @staticmethod
+    def get_cache_key(contract_text: str, execution_mode: str = "sequential", map_reduce: bool = False,
+                      pre_extract: bool = True) -> str:
+        """
+        Compute the analysis cache key for a contract.
+        
+        The key covers the normalized contract text, the task prompt templates
+        and the LLM configuration, so changing any of them forces a fresh analysis.
+        
+        Args:
+            contract_text: The text content of the contract to analyze
+            execution_mode: One of EXECUTION_MODES
+            map_reduce: Whether the extraction runs chunk by chunk
+            pre_extract: Whether the rule-based pre-extraction runs
+            
+        Returns:
+            str: Content-addressed cache key
+        """
+        # Sequential and parallel runs produce equivalent results; the fast
+        # variant assesses risk without the compliance analysis
+        return compute_cache_key(
+            contract_text,
+            prompt_fingerprint=get_prompt_fingerprint(),
+            model_config=get_llm_config(),
+            variant="fast" if execution_mode == "fast" else "full",
+            extraction="map_reduce" if map_reduce else "single",
+            pre_extraction=RULES_VERSION if pre_extract else "off",
+            clause_retrieval=CLAUSE_RETRIEVAL
+        )
+    
+    @staticmethod
+    def analyze_contract(contract_text: str, use_cache: bool = True, execution_mode: str = "sequential",
+                         map_reduce: bool = None, pre_extract: bool = True,
+                         on_stage_complete: Callable[[str, dict], None] = None, contract_id: str = None) -> dict:
         """
         Analyze a contract document and return structured insights.
         
+        Results are served from the persistent analysis cache when the same
+        contract was analyzed before with the same prompts and model. Structured
+        results of fresh analyses are saved to the contract store (see store_analysis).
+        
         Args:
             contract_text: The text content of the contract to analyze
+            use_cache: Whether to read from and write to the analysis cache
+            execution_mode: "sequential" runs the three tasks one after another,
+                "parallel" runs independent work concurrently following the task
+                contexts, and "fast" additionally runs the risk assessment on the
+                extraction alone, concurrently with the compliance analysis
+            map_reduce: Extract long contracts chunk by chunk in parallel and merge the
+                partial results. Defaults to True for contracts longer than MAP_REDUCE_THRESHOLD
+                characters or the token budget of the extraction task.
+            pre_extract: Extract parties, dates, payment terms, uptime and governing law
+                with patterns first. Fields found with high confidence are not asked of the
+                LLM; the others are passed to it as hints.
+            on_stage_complete: Optional callback invoked with (stage, event) on the calling
+                thread as soon as each stage finishes, so results can be shown before the
+                whole analysis is done. The event holds the "stage" name, its structured
+                "result", the number of "completed" and "total" stages, the stage's
+                "seconds" and "tokens", and whether it was "cached".
+            contract_id: ID the analysis is stored under in the contract store; analyses
+                of a changed text under the same ID are stored as new versions
             
         Returns:
-            dict: Analysis results with contract details, compliance issues, and risks
+            dict: Analysis results with contract details, compliance issues, and risks.
+            Unless they come from the cache, the "execution" section includes the
+            "timings" of every traced operation (tasks, tool calls, pre-extraction).
+            The "store" section of fresh analyses holds the contract ID and version
+            they were stored as.
         """
-        # Create the crew
-        crew = ContractAnalysisCrew.create_crew(contract_text)
+        if execution_mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{execution_mode}'. Expected one of: {', '.join(EXECUTION_MODES)}")
         
-        # Execute the crew's tasks
-        results = crew.kickoff()
+        with span("analyze_contract", execution_mode=execution_mode, chars=len(contract_text)) as analysis_span:
+            results = ContractAnalysisCrew._analyze_contract(
+                contract_text, use_cache, execution_mode, map_reduce, pre_extract, on_stage_complete
+            )
+            cached = results.get("cache", {}).get("hit", False)
+            analysis_span.set_attributes(cached=cached, structured="error" not in results)
+            # Cached results were stored when they were first analyzed
+            if "error" not in results and not cached:
+                ContractAnalysisCrew.store_analysis(contract_text, results, contract_id)
         
-        # Structure and return the results
-        try:
-            # Try to convert any string results to JSON if possible
-            import json
+        if "execution" in results:
+            results["execution"]["timings"] = summarize_spans(get_tracer().trace(analysis_span.trace_id))
+        return results
+    
+    @staticmethod
+    def analyze_revision(contract_text: str, previous_text: str = None, use_cache: bool = True,
+                         contract_id: str = None) -> dict:
+        """
+        Analyze a contract version clause by clause, reviewing only clauses not seen before.
+        
+        The contract is split into clause units that are fingerprinted by their
+        content. Findings of every reviewed clause are cached under its
+        fingerprint, so unchanged clauses of later versions are not sent to the
+        LLM again: the cost of a new version scales with the size of its changes.
+        The report is assembled from the clause findings (see
+        utils.clause_diff.merge_clause_findings).
+        
+        Args:
+            contract_text: The text content of the contract version to analyze
+            previous_text: Text of the previous version; if given, the clauses are
+                diffed against it and the report includes a redline of risk deltas
+            use_cache: Whether to read and write the clause findings cache
+            contract_id: ID the analysis is stored under in the contract store, so
+                the versions of a contract share their history
             
-            contract_details = results[0]
-            compliance_analysis = results[1]
-            risk_assessment = results[2]
+        Returns:
+            dict: Analysis results with contract details, compliance issues and risks,
+            a "revision" section with the clause changes and risk redline if a previous
+            version was given, a "store" section with the stored contract ID and
+            version, and an "execution" section with the reviewed and cached clause
+            counts, token usage and timings
+        """
+        started = time.perf_counter()
+        with span("analyze_revision", chars=len(contract_text), previous=previous_text is not None) as revision_span:
+            units = split_clause_units(contract_text)
+            previous_units = split_clause_units(previous_text) if previous_text else []
+            findings, review_info = ContractAnalysisCrew._review_clauses(units + previous_units, use_cache)
+            revision_span.set_attributes(reviewed_clauses=review_info["reviewed_clauses"],
+                                         cached_clauses=review_info["cached_clauses"])
             
-            # Try to parse JSON responses
+            results = merge_clause_findings(units, findings, EXTRACTION_FIELDS)
+            if previous_text:
+                changes = diff_clause_units(previous_units, units)
+                statuses = [change["status"] for change in changes]
+                results["revision"] = {
+                    "clauses": {status: statuses.count(status) for status in ("unchanged", "changed", "added", "removed")},
+                    "changes": [change for change in changes if change["status"] != "unchanged"],
+                    "risk_redline": risk_redline(changes, findings)
+                }
+            results["execution"] = {
+                "mode": "revision",
+                "wall_clock_seconds": round(time.perf_counter() - started, 3),
+                "clauses": len(units),
+                **review_info
+            }
+            ContractAnalysisCrew.store_analysis(contract_text, results, contract_id)
+        
+        results["execution"]["timings"] = summarize_spans(get_tracer().trace(revision_span.trace_id))
+        return results
+    
+    @staticmethod
+    def _analyze_contract(contract_text: str, use_cache: bool, execution_mode: str, map_reduce: bool,
+                          pre_extract: bool, on_stage_complete: Callable[[str, dict], None]) -> dict:
+        """
+        Run an analysis; see analyze_contract for the arguments.
+        """
+        if map_reduce is None:
+            map_reduce = len(contract_text) > MAP_REDUCE_THRESHOLD or \
+                count_tokens(contract_text) > get_task_budget("contract_details")
+        
+        # Stages reported to on_stage_complete, in the order they usually finish
+        stage_count = len(STAGE_NAMES) + (1 if pre_extract else 0) + (0 if execution_mode == "sequential" else 1)
+        completed = []
+        known_fields, field_hints = {}, {}
+        
+        def report_stage(stage, result, seconds=0.0, tokens=None, cached=False):
+            if on_stage_complete is None:
+                return
+            completed.append(stage)
+            if stage == "contract_details":
+                result = ContractAnalysisCrew._merge_known_fields(result, known_fields)
+            on_stage_complete(stage, {
+                "stage": stage,
+                "result": result,
+                "completed": len(completed),
+                "total": stage_count,
+                "seconds": round(seconds, 3),
+                "tokens": tokens or ContractAnalysisCrew._sum_usage([]),
+                "cached": cached
+            })
+        
+        cache = get_analysis_cache() if use_cache else None
+        cache_key = None
+        
+        if cache is not None:
+            cache_key = ContractAnalysisCrew.get_cache_key(contract_text, execution_mode, map_reduce, pre_extract)
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                stage_count = len(STAGE_NAMES)
+                for name in STAGE_NAMES:
+                    report_stage(name, cached_result.get(name), cached=True)
+                cached_result["cache"] = {"hit": True, "key": cache_key}
+                return cached_result
+        
+        pre_extraction_info = None
+        if pre_extract:
+            started = time.perf_counter()
+            with span("pre_extraction") as pre_extraction_span:
+                known_fields, field_hints = split_by_confidence(extract_rule_fields(contract_text))
+                pre_extraction_span.set_attributes(fields=len(known_fields), hints=len(field_hints))
+            pre_extraction_info = {
+                "fields": list(known_fields),
+                "hints": list(field_hints),
+                "seconds": round(time.perf_counter() - started, 4)
+            }
+            report_stage("pre_extraction", {"fields": known_fields, "hints": field_hints}, pre_extraction_info["seconds"])
+        
+        contract_details = None
+        map_reduce_info = None
+        if map_reduce:
+            started = time.perf_counter()
+            contract_details, map_reduce_info = ContractAnalysisCrew._run_map_reduce_extraction(contract_text, known_fields)
+            contract_details = ContractAnalysisCrew._merge_known_fields(contract_details, known_fields)
+            report_stage("contract_details", contract_details, time.perf_counter() - started, map_reduce_info["tokens"])
+        
+        with ContractAnalysisCrew._clause_retrieval(contract_text) as contract_id:
+            if execution_mode == "sequential":
+                results = ContractAnalysisCrew._run_analysis(
+                    contract_text, contract_details, known_fields, field_hints, report_stage, contract_id
+                )
+            else:
+                results = ContractAnalysisCrew._run_graph_analysis(
+                    contract_text, execution_mode, contract_details, known_fields, field_hints, report_stage, contract_id
+                )
+        results["contract_details"] = ContractAnalysisCrew._merge_known_fields(results.get("contract_details"), known_fields)
+        
+        # Stages that failed every retry are returned as text; such results are not cached or stored
+        errors = ContractAnalysisCrew._validate_results(results)
+        if errors:
+            results["error"] = f"Failed to structure results: {'; '.join(errors)}"
+        
+        if map_reduce_info is not None:
+            results["execution"]["map_reduce"] = map_reduce_info
+            results["execution"]["tokens"]["contract_details"] = map_reduce_info["tokens"]
+        if pre_extraction_info is not None:
+            results["execution"]["pre_extraction"] = pre_extraction_info
+        results["execution"]["total_tokens"] = ContractAnalysisCrew._sum_usage(results["execution"]["tokens"].values())
+        
+        # Only cache fully structured results so failures are retried next time
+        if cache is not None and "error" not in results:
+            cache.set(cache_key, {key: value for key, value in results.items() if key != "execution"})
+            results["cache"] = {"hit": False, "key": cache_key}
+        
+        return results
+    
+    @staticmethod
+    def _run_analysis(contract_text: str, contract_details: dict = None, known_fields: dict = None,
+                      field_hints: dict = None, report_stage: Callable = None, contract_id: str = None) -> dict:
+        """
+        Run the analysis tasks one after another and structure the task outputs.
+        
+        Every task runs in its own single-task crew so its result and token usage
+        can be reported as soon as it finishes; the tasks still receive the
+        outputs of the tasks in their context.
+        
+        Args:
+            contract_text: The text content of the contract to analyze
+            contract_details: Contract information that was already extracted, if any
+            known_fields: High-confidence rule-based extraction results, if any
+            field_hints: Low-confidence rule-based findings, if any
+            report_stage: Optional callback invoked with (stage, result, seconds, tokens)
+                after each task
+            contract_id: ID of the contract in the clause index, if clause retrieval is enabled
+            
+        Returns:
+            dict: Analysis results with contract details, compliance issues, and risks,
+            and an "execution" section with per-stage timings and token usage
+        """
+        tasks = ContractAnalysisCrew.create_tasks(
+            contract_text,
+            contract_details=contract_details,
+            known_fields=known_fields,
+            field_hints=field_hints,
+            contract_id=contract_id
+        )
+        
+        dependencies = ContractAnalysisCrew.build_task_graph(tasks)
+        
+        started = time.perf_counter()
+        outputs, stages, tokens = {}, {}, {}
+        for name, task in tasks.items():
+            stage_started = time.perf_counter()
+            upstream = {dependency: outputs[dependency] for dependency in dependencies[name]}
+            outputs[name], tokens[name] = ContractAnalysisCrew._kickoff_task(task, name, upstream)
+            duration = time.perf_counter() - stage_started
+            stages[name] = {"duration_seconds": round(duration, 3)}
+            if report_stage is not None:
+                report_stage(name, ContractAnalysisCrew._extract_json(outputs[name], TASK_SCHEMAS.get(name)), duration, tokens[name])
+        
+        if contract_details is not None:
+            outputs["contract_details"] = contract_details
+        results = ContractAnalysisCrew._structure_results(outputs)
+        results["execution"] = {
+            "mode": "sequential",
+            "wall_clock_seconds": round(time.perf_counter() - started, 3),
+            "stages": stages,
+            "tokens": tokens
+        }
+        return results
+    
+    @staticmethod
+    def _run_map_reduce_extraction(contract_text: str, known_fields: dict = None):
+        """
+        Extract contract information chunk by chunk and merge the partial results.
+        
+        Every chunk is extracted by its own single-task crew and the chunks run
+        in parallel, so the extraction time is bound by the slowest chunk rather
+        than the length of the whole contract.
+        
+        Args:
+            contract_text: The text content of the contract to analyze
+            known_fields: Fields already extracted by the rule-based pre-extraction,
+                which the chunk tasks skip
+            
+        Returns:
+            Tuple of (merged extraction dict, map-reduce timing information)
+        """
+        # Chunk along clause boundaries so no clause is split or duplicated across chunks
+        chunks = [contract_text[start:end] for start, end in chunk_by_clauses(contract_text, MAP_REDUCE_CHUNK_SIZE)]
+        
+        def extract_chunk(index):
+            started = time.perf_counter()
+            task = create_chunk_extraction_task(chunks[index], index + 1, len(chunks), known_fields)
+            output, tokens = ContractAnalysisCrew._kickoff_task(task, "contract_details_chunk", chunk=index + 1)
+            partial = ContractAnalysisCrew._extract_json(output, TASK_SCHEMAS["contract_details_chunk"])
+            return partial, time.perf_counter() - started, tokens
+        
+        started = time.perf_counter()
+        with span("map_reduce_extraction", chunks=len(chunks)), \
+                ThreadPoolExecutor(max_workers=min(MAP_REDUCE_MAX_WORKERS, len(chunks)) or 1) as executor:
+            chunk_results = list(executor.map(propagate(extract_chunk), range(len(chunks))))
+        
+        partials = [partial for partial, _, _ in chunk_results]
+        merged = merge_extractions(partials, EXTRACTION_FIELDS)
+        
+        return merged, {
+            "chunks": len(chunks),
+            "unparsed_chunks": sum(1 for partial in partials if not isinstance(partial, dict)),
+            "chunk_seconds": [round(duration, 3) for _, duration, _ in chunk_results],
+            "longest_chunk_seconds": round(max((duration for _, duration, _ in chunk_results), default=0.0), 3),
+            "wall_clock_seconds": round(time.perf_counter() - started, 3),
+            "tokens": ContractAnalysisCrew._sum_usage(tokens for _, _, tokens in chunk_results)
+        }
+    
+    @staticmethod
+    def _review_clauses(units: list, use_cache: bool = True):
+        """
+        Get the review findings of clause units, reviewing those that are not cached.
+        
+        Units with the same content are reviewed once. Uncached units are packed
+        into batches of CLAUSE_BATCH_SIZE characters that are reviewed in
+        parallel, one single-task crew per batch. The findings of each batch are
+        cached as soon as it returns; the clauses of a failed batch count as
+        unparsed and are reviewed again next time.
+        
+        Args:
+            units: Clause units of one or more contract versions
+            use_cache: Whether to read and write the clause findings cache
+            
+        Returns:
+            Tuple of (findings keyed by clause fingerprint, review information with the
+            "reviewed_clauses", "cached_clauses", "unparsed_clauses", "batches" and "tokens")
+        """
+        cache = get_clause_cache() if use_cache else None
+        prompt_fingerprint = get_prompt_fingerprint()
+        model_config = get_llm_config() if cache is not None else None
+        
+        def cache_key(unit):
+            return compute_cache_key(unit.fingerprint, prompt_fingerprint, model_config, variant="clause_review")
+        
+        findings, pending = {}, {}
+        for unit in units:
+            if unit.fingerprint in findings or unit.fingerprint in pending:
+                continue
+            cached = cache.get(cache_key(unit)) if cache is not None else None
+            if cached is not None:
+                findings[unit.fingerprint] = cached
+            else:
+                pending[unit.fingerprint] = unit
+        cached_count = len(findings)
+        
+        def review_batch(batch):
+            task = create_clause_review_task([(f"c{index}", unit.text) for index, unit in enumerate(batch, start=1)])
             try:
-                if isinstance(contract_details, str):
-                    contract_details = ContractAnalysisCrew._extract_json(contract_details)
-            except:
-                pass
-                
+                output, tokens = ContractAnalysisCrew._kickoff_task(task, "clause_review", clauses=len(batch))
+            except Exception as e:
+                print(f"Review of {len(batch)} clauses failed: {str(e)}")
+                return {}, len(batch), ContractAnalysisCrew._sum_usage([])
+            
+            review = ContractAnalysisCrew._extract_json(output, TASK_SCHEMAS["clause_review"])
+            batch_findings, unparsed = {}, 0
+            for index, unit in enumerate(batch, start=1):
+                try:
+                    clause_findings = ClauseFindings.parse_obj(review[f"c{index}"]).dict(exclude_none=True)
+                except (KeyError, TypeError, ValueError):
+                    # Not cached, so the clause is reviewed again with the next version
+                    unparsed += 1
+                    continue
+                batch_findings[unit.fingerprint] = clause_findings
+                if cache is not None:
+                    cache.set(cache_key(unit), clause_findings)
+            return batch_findings, unparsed, tokens
+        
+        batches = pack_units(pending.values(), CLAUSE_BATCH_SIZE)
+        reviews = []
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(MAP_REDUCE_MAX_WORKERS, len(batches))) as executor:
+                reviews = list(executor.map(propagate(review_batch), batches))
+        
+        for batch_findings, _, _ in reviews:
+            findings.update(batch_findings)
+        
+        return findings, {
+            "reviewed_clauses": len(pending),
+            "cached_clauses": cached_count,
+            "unparsed_clauses": sum(unparsed for _, unparsed, _ in reviews),
+            "batches": len(batches),
+            "tokens": ContractAnalysisCrew._sum_usage(tokens for _, _, tokens in reviews)
+        }
+    
+    @staticmethod
+    def _run_graph_analysis(contract_text: str, execution_mode: str, contract_details: dict = None,
+                            known_fields: dict = None, field_hints: dict = None,
+                            report_stage: Callable = None, contract_id: str = None) -> dict:
+        """
+        Run the analysis tasks as a dependency graph, executing independent stages concurrently.
+        
+        Each task runs in its own single-task crew as soon as the tasks in its
+        context have finished. The keyword-based risk pre-pass has no
+        dependencies and runs alongside the extraction; its findings are added
+        to the risk assessment prompt.
+        
+        Args:
+            contract_text: The text content of the contract to analyze
+            execution_mode: "parallel" or "fast"
+            contract_details: Contract information that was already extracted, if any
+            known_fields: High-confidence rule-based extraction results, if any
+            field_hints: Low-confidence rule-based findings, if any
+            report_stage: Optional callback invoked with (stage, result, seconds, tokens)
+                on the calling thread after each stage
+            contract_id: ID of the contract in the clause index, if clause retrieval is enabled
+            
+        Returns:
+            dict: Analysis results, including an "execution" section with per-stage timings
+            and token usage
+        """
+        tasks = ContractAnalysisCrew.create_tasks(
+            contract_text, execution_mode,
+            contract_details=contract_details,
+            known_fields=known_fields,
+            field_hints=field_hints,
+            contract_id=contract_id
+        )
+        dependencies = ContractAnalysisCrew.build_task_graph(tasks)
+        
+        dependencies["risk_prepass"] = []
+        dependencies["risk_assessment"] = dependencies["risk_assessment"] + ["risk_prepass"]
+        
+        def run_risk_prepass(_):
+            from tools import RiskEvaluationTool
+            
+            return RiskEvaluationTool()._run(contract_text)
+        
+        def run_task(name):
+            def run(upstream):
+                output, tokens[name] = ContractAnalysisCrew._kickoff_task(tasks[name], name, upstream)
+                return output
+            return run
+        
+        # Stages run on worker threads; keep their spans in this analysis' trace
+        stages = {name: propagate(run_task(name)) for name in tasks}
+        stages["risk_prepass"] = propagate(run_risk_prepass)
+        tokens = {}
+        
+        def on_stage_complete(name, output, timing):
+            if report_stage is not None:
+                result = output if name == "risk_prepass" else ContractAnalysisCrew._extract_json(output, TASK_SCHEMAS.get(name))
+                report_stage(name, result, timing["duration"], tokens.get(name))
+        
+        outputs, timings = run_task_graph(stages, dependencies, on_stage_complete=on_stage_complete)
+        if contract_details is not None:
+            outputs["contract_details"] = contract_details
+        
+        results = ContractAnalysisCrew._structure_results({name: outputs[name] for name in STAGE_NAMES})
+        # The sequential pipeline runs the same tasks but no risk pre-pass
+        results["execution"] = {"mode": execution_mode, **summarize_latency(timings, dependencies, sequential_stages=tasks),
+                                "tokens": tokens}
+        return results
+    
+    @staticmethod
+    def _merge_known_fields(contract_details, known_fields: dict):
+        """
+        Add the rule-based fields to the extracted contract details.
+        
+        Args:
+            contract_details: Parsed extraction output (dict) or raw text if it could not be parsed
+            known_fields: High-confidence rule-based extraction results
+            
+        Returns:
+            The contract details with the known fields in schema order, or the raw
+            text unchanged
+        """
+        if not known_fields or not isinstance(contract_details, dict):
+            return contract_details
+        
+        merged = {}
+        for key in EXTRACTION_FIELDS:
+            if key in known_fields:
+                merged[key] = known_fields[key]
+            elif key in contract_details:
+                merged[key] = contract_details[key]
+        for key, value in contract_details.items():
+            merged.setdefault(key, value)
+        return merged
+    
+    @staticmethod
+    def _kickoff_task(task, name: str, upstream: dict = None, **attributes):
+        """
+        Execute a single task in its own crew and return its agent to the agent pool.
+        
+        The execution is traced as a "task.<name>" span with the agent, token
+        usage, estimated cost and retry count. On backends with a JSON mode the
+        task's output schema is set as its output_pydantic, so CrewAI structures
+        the answer as part of the task. An output that still fails validation
+        against the schema is restructured with a JSON-mode call; only if that
+        fails is the task run again.
+        
+        Args:
+            task: The CrewAI task to execute; tasks in its context must have run already
+            name: Stage name of the task
+            upstream: Raw outputs of the stages the task depends on. They replace the
+                task's CrewAI context and are added to its description as compact JSON
+                within the task's token budget.
+            **attributes: Additional span attributes
+            
+        Returns:
+            Tuple of (raw task output, token usage of the crew)
+        """
+        from crewai import Crew, Process
+        
+        if upstream:
+            task.description += format_upstream_context(
+                name,
+                {stage: ContractAnalysisCrew._extract_json(output) for stage, output in upstream.items()},
+                count_tokens(task.description)
+            )
+            task.context = []
+        
+        with span(f"task.{name}", description_tokens=count_tokens(task.description),
+                  token_budget=get_task_budget(name), **attributes) as task_span:
+            schema = TASK_SCHEMAS.get(name)
+            description = task.description
+            usages = []
+            structured_task = schema is not None and supports_json_mode()
+            if structured_task:
+                task.output_pydantic = get_output_model(name)
+            # The agent is only checked out while the task runs, so tasks that never run hold none
+            task.agent = agent_pool.acquire(TASK_AGENTS[name])
+            task_span.set_attributes(agent=getattr(task.agent, "role", None))
             try:
-                if isinstance(compliance_analysis, str):
-                    compliance_analysis = ContractAnalysisCrew._extract_json(compliance_analysis)
-            except:
-                pass
-                
+                for attempt in range(OUTPUT_RETRIES + 1):
+                    crew = Crew(tasks=[task], process=Process.sequential, verbose=True)
+                    crew.kickoff()
+                    usages.append(ContractAnalysisCrew._usage_metrics(crew))
+                    output = ContractAnalysisCrew._task_output_text(task)
+                    _, errors = extract_json(output, schema)
+                    if not errors:
+                        break
+                    print(f"Invalid {name} output (attempt {attempt + 1}): {'; '.join(errors)}")
+                    # One JSON-mode call restructures the answer for a fraction of a task run
+                    structured, structuring_usage = ContractAnalysisCrew._structure_output(name, output, errors)
+                    if structuring_usage:
+                        usages.append(structuring_usage)
+                    if structured is not None:
+                        output, errors = structured, []
+                        break
+                    # Ask only this task again, telling the agent what was wrong with its answer
+                    task.description = description + f"""
+        Your previous answer could not be used: {'; '.join(errors)}.
+        Answer again with a single valid JSON object: double-quoted keys and strings,
+        no comments, no trailing commas and no text outside the object.
+        """
+            finally:
+                agent_pool.release(task.agent)
+            usage = ContractAnalysisCrew._sum_usage(usages)
+            record_usage(task_span, usage, get_llm_config().get("model"))
+            # Output-validation retries, plus CrewAI's own guardrail retries
+            task_span.set_attributes(retries=attempt + int(getattr(task, "retry_count", 0) or 0),
+                                     json_mode_calls=len(usages) - attempt - 1, valid_output=not errors,
+                                     structured_task=structured_task)
+        return output, usage
+    
+    @staticmethod
+    def _structure_output(name: str, output: str, errors: list):
+        """
+        Turn an invalid task answer into valid JSON with a single JSON-mode LLM call.
+        
+        The call gets the task's output schema, the validation errors and the
+        answer, so the agent's analysis is kept and only its format is fixed.
+        
+        Args:
+            name: Stage name of the task
+            output: The task's raw output
+            errors: Validation or parse errors of the output
+            
+        Returns:
+            Tuple of (JSON text of the valid output or None, token usage of the call or
+            None if the backend has no JSON mode or the task has no schema)
+        """
+        schema = TASK_SCHEMAS.get(name)
+        llm = get_json_llm() if schema is not None else None
+        if llm is None:
+            return None, None
+        
+        messages = create_structuring_messages(name, output, errors, schema)
+        with span(f"json_mode.{name}") as structuring_span:
             try:
-                if isinstance(risk_assessment, str):
-                    risk_assessment = ContractAnalysisCrew._extract_json(risk_assessment)
-            except:
-                pass
-            
-            return {
-                "contract_details": contract_details,
-                "compliance_analysis": compliance_analysis,
-                "risk_assessment": risk_assessment
-            }
-        except Exception as e:
-            # If there's an error processing the results, return raw results
-            return {
-                "contract_details": results[0],
-                "compliance_analysis": results[1],
-                "risk_assessment": results[2],
-                "error": f"Failed to structure results: {str(e)}"
+                answer = llm.call(messages)
+            except Exception as e:
+                print(f"JSON-mode call for {name} failed: {str(e)}")
+                structuring_span.set_attributes(valid_output=False)
+                return None, None
+            prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+            completion_tokens = count_tokens(answer)
+            usage = {
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "successful_requests": 1
             }
+            record_usage(structuring_span, usage, getattr(llm, "model", None))
+            data, errors = extract_json(answer, schema)
+            structuring_span.set_attributes(valid_output=not errors)
+        if errors:
+            print(f"JSON-mode output for {name} is still invalid: {'; '.join(errors)}")
+            return None, usage
+        return json.dumps(data, ensure_ascii=False), usage
     
     @staticmethod
-    def _extract_json(text):
+    def _usage_metrics(crew) -> dict:
+        """
+        Get the token usage of an executed crew.
+        
+        Args:
+            crew: An executed CrewAI crew
+            
+        Returns:
+            dict: TOKEN_METRICS counters, zero when the crew did not report usage
+        """
+        metrics = getattr(crew, "usage_metrics", None) or {}
+        if not isinstance(metrics, dict):
+            # Newer CrewAI versions report a UsageMetrics model instead of a dict
+            metrics = {key: getattr(metrics, key, 0) for key in TOKEN_METRICS}
+        return {key: int(metrics.get(key) or 0) for key in TOKEN_METRICS}
+    
+    @staticmethod
+    def _sum_usage(usages) -> dict:
+        """
+        Add up token usage counters.
+        
+        Args:
+            usages: Iterable of TOKEN_METRICS dictionaries
+            
+        Returns:
+            dict: Summed TOKEN_METRICS counters
+        """
+        total = dict.fromkeys(TOKEN_METRICS, 0)
+        for usage in usages:
+            for key in TOKEN_METRICS:
+                total[key] += usage.get(key, 0)
+        return total
+    
+    @staticmethod
+    def _task_output_text(task) -> str:
+        """
+        Get the text output of an executed task.
+        
+        Args:
+            task: An executed CrewAI task
+            
+        Returns:
+            str: The JSON of the task's structured output if CrewAI produced one,
+            otherwise its raw output, or an empty string if it has not run
+        """
+        output = task.output
+        if output is None:
+            return ""
+        structured = getattr(output, "pydantic", None)
+        if hasattr(structured, "model_dump_json"):
+            return structured.model_dump_json()
+        for attribute in ("raw", "raw_output"):
+            value = getattr(output, attribute, None)
+            if isinstance(value, str):
+                return value
+        return str(output)
+    
+    @staticmethod
+    def _structure_results(outputs: dict) -> dict:
+        """
+        Convert raw task outputs into the structured analysis result.
+        
+        Args:
+            outputs: Raw task outputs keyed by stage name
+            
+        Returns:
+            dict: Analysis results with contract details, compliance issues, and risks
+        """
+        results = {}
+        for name in STAGE_NAMES:
+            output = outputs.get(name, "")
+            # Outputs that cannot be parsed are kept as text; see _validate_results
+            results[name] = ContractAnalysisCrew._extract_json(output, TASK_SCHEMAS.get(name)) if isinstance(output, str) else output
+        return results
+    
+    @staticmethod
+    def _validate_results(results: dict) -> list:
+        """
+        Check that every stage of an analysis produced output matching its schema.
+        
+        Args:
+            results: Analysis results keyed by stage name
+            
+        Returns:
+            list: Errors prefixed with the stage name; empty if the results are complete
+        """
+        errors = []
+        for name in STAGE_NAMES:
+            if not isinstance(results.get(name), dict):
+                errors.append(f"{name}: the output is not a JSON object")
+            else:
+                errors.extend(f"{name}: {error}" for error in validate_json(results[name], TASK_SCHEMAS[name]))
+        return errors
+    
+    @staticmethod
+    def _extract_json(text, schema=None):
         """
         Extract JSON data from text that might contain additional content.
         
+        The text is scanned once for balanced objects, which are repaired if
+        needed (code fences, trailing commas, single quotes); see utils.json_extract.
+        
         Args:
             text: Text containing JSON data
+            schema: Optional pydantic model; objects matching it are preferred
             
         Returns:
             Parsed JSON data or original text if parsing fails
         """
-        import json
-        import re
-        
-        try:
-            # Try to find JSON content within the text
-            json_pattern = r'(\{.*\})'
-            matches = re.findall(json_pattern, text, re.DOTALL)
-            
-            if matches:
-                # Find the largest JSON object (likely the main result)
-                largest_match = max(matches, key=len)
-                return json.loads(largest_match)
-            
-            # If no JSON-like content found or parsing fails, try the whole text
-            return json.loads(text)
-        except:
-            # If JSON parsing fails, return the original text
-            return text 
\ No newline at end of file
+        data, _ = extract_json(text, schema)
+        return text if data is None else data 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import streamlit as st
+import json
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from schemas import RISK_LEVELS
+from utils.contract_store import EXPIRING_DAYS, ORDER_BY, get_contract_store
+
+# Set page configuration
+st.set_page_config(
+    page_title="Contract Portfolio",
+    page_icon="📊",
+    layout="wide"
+)
+
+# Contracts listed per page of the portfolio table
+PAGE_SIZE = 200
+
+# Options of the end date filter, in days from today
+ENDS_WITHIN_DAYS = {"Any time": None, "30 days": 30, "90 days": 90, "6 months": 182, "1 year": 365}
+
+def sidebar_filters(summary):
+    """Render the portfolio filters and return them as ContractStore.query arguments"""
+    st.sidebar.header("Filters")
+    filters = {
+        "party": st.sidebar.text_input("Party name starts with"),
+        "text": st.sidebar.text_input("Clause text contains", help="All words must appear in one clause"),
+    }
+
+    contract_types = [name for name in summary["contract_types"] if name != "Unknown"]
+    contract_type = st.sidebar.selectbox("Contract type", ["All"] + contract_types)
+    filters["contract_type"] = None if contract_type == "All" else contract_type
+
+    risk_level = st.sidebar.selectbox("Risk level", ["All", *RISK_LEVELS])
+    filters["risk_level"] = None if risk_level == "All" else risk_level
+    filters["min_risk_score"] = st.sidebar.slider("Minimum risk score", 0.0, 10.0, 0.0, 0.5) or None
+
+    areas = list(summary["compliance_areas"])
+    area = st.sidebar.selectbox("Compliance findings in", ["Any area"] + areas)
+    filters["compliance_area"] = None if area == "Any area" else area
+
+    ends_within = ENDS_WITHIN_DAYS[st.sidebar.selectbox("Ends within", list(ENDS_WITHIN_DAYS))]
+    if ends_within is not None:
+        filters["ends_from"] = date.today().isoformat()
+        filters["ends_to"] = (date.today() + timedelta(days=ends_within)).isoformat()
+
+    filters["order_by"] = st.sidebar.selectbox("Sort by", list(ORDER_BY))
+    filters["all_versions"] = st.sidebar.checkbox("Include earlier versions")
+    return filters
+
+def show_overview(summary):
+    """Render the portfolio metrics and charts"""
+    columns = st.columns(4)
+    columns[0].metric("Contracts", f"{summary['contracts']:,}", f"{summary['versions']:,} versions", delta_color="off")
+    columns[1].metric("High risk", f"{summary['risk_levels'].get('High', 0):,}")
+    columns[2].metric("Average risk score",
+                      f"{summary['average_risk_score']:.1f}" if summary["average_risk_score"] is not None else "n/a")
+    columns[3].metric(f"Ending within {EXPIRING_DAYS} days", f"{len(summary['expiring']):,}")
+
+    columns = st.columns(3)
+    with columns[0]:
+        st.subheader("Risk levels")
+        st.bar_chart(summary["risk_levels"])
+    with columns[1]:
+        st.subheader("Contract types")
+        st.bar_chart(summary["contract_types"])
+    with columns[2]:
+        st.subheader("Compliance findings")
+        st.bar_chart(dict(list(summary["compliance_areas"].items())[:10]))
+
+    if summary["high_risk_areas"]:
+        with st.expander("Most frequent high-risk areas", expanded=False):
+            st.table([{"area": area, "contracts": count} for area, count in summary["high_risk_areas"].items()])
+
+def show_contract(store, contract_id):
+    """Render the stored analysis and version history of one contract"""
+    record = store.get(contract_id)
+    if record is None:
+        st.warning("The selected contract is no longer stored.")
+        return
+
+    st.markdown(f"### {contract_id} (version {record['version']})")
+    history = store.history(contract_id)
+    if len(history) > 1:
+        st.caption("Risk score by version")
+        st.line_chart({entry["version"]: entry["risk_score"] for entry in history})
+
+    columns = st.columns(2)
+    with columns[0]:
+        st.markdown("**Parties**")
+        st.table(record["parties"] or [{"name": "Not extracted"}])
+        st.markdown("**Risks**")
+        st.table(record["risks"] or [{"area": "No risk areas"}])
+    with columns[1]:
+        st.markdown("**Compliance findings**")
+        st.dataframe(record["compliance_findings"], use_container_width=True)
+
+    with st.expander("Full analysis", expanded=False):
+        st.json(record["results"])
+
+def main():
+    st.title("📊 Contract Portfolio")
+
+    store = get_contract_store()
+    if store is None:
+        st.warning("The contract store is disabled. Set CONTRACT_STORE_ENABLED=1 to keep analyses for portfolio reporting.")
+        return
+
+    summary = store.summary()
+    if not summary["contracts"]:
+        st.info("No analyses stored yet. Analyze a contract on the main page or run batch.py over a portfolio.")
+        return
+
+    filters = sidebar_filters(summary)
+    show_overview(summary)
+
+    # Matching contracts; read from the indexed columns, so no analysis is re-run
+    st.markdown("## Contracts")
+    contracts = store.query(**filters, limit=PAGE_SIZE)
+    st.caption(f"{len(contracts)} matching contract versions" + (f" (first {PAGE_SIZE})" if len(contracts) == PAGE_SIZE else ""))
+    st.dataframe(
+        [{**contract, "parties": "; ".join(contract["parties"])} for contract in contracts],
+        use_container_width=True
+    )
+    st.download_button(
+        label="Download Matching Contracts",
+        data=json.dumps(contracts, indent=2),
+        file_name="contract-portfolio.json",
+        mime="application/json"
+    )
+
+    if filters["text"]:
+        st.markdown("## Matching Clauses")
+        for hit in store.search_clauses(filters["text"], all_versions=filters["all_versions"]):
+            st.markdown(f"**{hit['contract_id']}** v{hit['version']}, {hit['key']}: {hit['snippet']}")
+
+    if contracts:
+        st.markdown("## Contract Details")
+        contract_ids = list(dict.fromkeys(contract["contract_id"] for contract in contracts))
+        show_contract(store, st.selectbox("Contract", contract_ids))
+
+if __name__ == "__main__":
+    main()
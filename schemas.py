@@ -0,0 +1,198 @@
+import re
+from typing import Any, Dict, List, Optional, Union
+import pydantic
+from pydantic.v1 import BaseModel, Field, ValidationError, root_validator, validator
+
+# Output schemas of the analysis tasks, used to validate the JSON the agents
+# return and sent to the model as the target of JSON-mode calls. They type the
+# shape the prompts ask for and accept any additional keys, since the agents
+# choose their own compliance and risk categories.
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+# Risk levels the risk assessment prompt asks for
+RISK_LEVELS = ("High", "Medium", "Low")
+
+# Free text, a list of items or a nested object, as the agents describe a contract element
+Text = Union[str, List[Any], Dict[str, Any]]
+
+class ContractDetails(BaseModel):
+    """Structured contract information returned by the extraction task."""
+    parties: Optional[Union[List[Union[str, Dict[str, Any]]], str]] = None
+    dates: Optional[Union[Dict[str, Any], List[Any], str]] = None
+    contract_type: Optional[Union[str, List[str]]] = None
+    value_and_payment_terms: Optional[Text] = None
+    deliverables: Optional[Text] = None
+    performance_metrics: Optional[Text] = None
+    termination_conditions: Optional[Text] = None
+    intellectual_property: Optional[Text] = None
+    data_privacy: Optional[Text] = None
+    governing_law: Optional[Text] = None
+    unique_clauses: Optional[Text] = None
+
+    class Config:
+        extra = "allow"
+
+    @root_validator(pre=True)
+    def check_extraction_keys(cls, values):
+        if not any(key in values for key in cls.__fields__):
+            raise ValueError(f"Expected at least one of the extraction keys: {', '.join(cls.__fields__)}")
+        return values
+
+class ChunkExtraction(ContractDetails):
+    """Contract information found in one chunk of a long contract; elements may be null."""
+
+class ComplianceIssue(BaseModel):
+    """One compliance issue: the problematic clause or gap, its legal risk and a recommendation."""
+    issue: Optional[Text] = None
+    clause: Optional[Text] = None
+    risk: Optional[Text] = None
+    recommendation: Optional[Text] = None
+
+    class Config:
+        extra = "allow"
+
+class ComplianceAnalysis(BaseModel):
+    """Compliance findings grouped by compliance area."""
+    __root__: Dict[str, Union[ComplianceIssue, List[Union[ComplianceIssue, str]], str]]
+
+    @validator("__root__")
+    def check_categories(cls, value):
+        if not value:
+            raise ValueError("Expected at least one compliance area")
+        return value
+
+def _normalize_level(value):
+    """Map risk levels written as text, e.g. "high risk", onto RISK_LEVELS."""
+    if isinstance(value, str):
+        if value.strip().lower() in ("", "none", "n/a"):
+            return None
+        for level in RISK_LEVELS:
+            if value.strip().lower().startswith(level.lower()):
+                return level
+    return value
+
+def _parse_score(value):
+    """Read risk scores written as text, e.g. "7/10" or "7 (High)"."""
+    if isinstance(value, str):
+        match = _NUMBER_RE.search(value)
+        return float(match.group()) if match else value
+    return value
+
+class Risk(BaseModel):
+    """One identified risk with its level, business impact and mitigation."""
+    level: Optional[str] = None
+    impact: Optional[Text] = None
+    mitigation: Optional[Text] = None
+    recommendations: Optional[Text] = None
+
+    class Config:
+        extra = "allow"
+
+    _level = validator("level", pre=True, allow_reuse=True)(_normalize_level)
+
+class RiskSummary(BaseModel):
+    """Overall risk assessment: the 1-10 score and the critical risk areas."""
+    overall_risk_score: Optional[float] = Field(None, ge=0, le=10)
+    critical_areas: Optional[Union[List[Any], str]] = None
+
+    class Config:
+        extra = "allow"
+
+    _score = validator("overall_risk_score", pre=True, allow_reuse=True)(_parse_score)
+
+class RiskAssessment(BaseModel):
+    """Risks grouped by risk area, with an overall assessment."""
+    summary: Optional[Union[RiskSummary, str]] = None
+    overall_risk_score: Optional[float] = Field(None, ge=0, le=10)
+
+    class Config:
+        extra = "allow"
+
+    _score = validator("overall_risk_score", pre=True, allow_reuse=True)(_parse_score)
+
+    @root_validator(pre=True)
+    def check_summary(cls, values):
+        if not any("summary" in key.lower() or "overall" in key.lower() for key in values):
+            raise ValueError("Expected a summary section with the overall risk assessment")
+        return values
+
+    @root_validator
+    def check_risk_areas(cls, values):
+        # Risk areas are named by the agent; those given as objects must describe a risk
+        for key, value in values.items():
+            if key not in cls.__fields__ and isinstance(value, dict):
+                try:
+                    values[key] = Risk.parse_obj(value)
+                except ValidationError as e:
+                    details = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                    raise ValueError(f"Invalid risk area '{key}' ({details})")
+        return values
+
+class ClauseFindings(BaseModel):
+    """Findings of the clause review for one clause."""
+    fields: Dict[str, Any] = {}
+    compliance_issues: List[Union[ComplianceIssue, str]] = []
+    risk_level: Optional[str] = None
+    risk_score: Optional[float] = Field(None, ge=0, le=10)
+    risk_areas: Union[List[str], str] = []
+    mitigation: Optional[Text] = None
+
+    class Config:
+        extra = "allow"
+
+    _level = validator("risk_level", pre=True, allow_reuse=True)(_normalize_level)
+    _score = validator("risk_score", pre=True, allow_reuse=True)(_parse_score)
+
+class ClauseReview(BaseModel):
+    """Clause review findings keyed by clause ID."""
+    __root__: Dict[str, ClauseFindings]
+
+    @validator("__root__")
+    def check_clauses(cls, value):
+        if not value:
+            raise ValueError("Expected findings for at least one clause")
+        return value
+
+# Output schema of each task, keyed by stage name
+TASK_SCHEMAS: Dict[str, type] = {
+    "contract_details": ContractDetails,
+    "contract_details_chunk": ChunkExtraction,
+    "compliance_analysis": ComplianceAnalysis,
+    "risk_assessment": RiskAssessment,
+    "clause_review": ClauseReview
+}
+
+_output_models: Dict[str, type] = {}
+
+def get_output_model(name: str) -> Optional[type]:
+    """
+    Return the model CrewAI converts a task's answer into, or None if the task has no schema.
+
+    CrewAI's output_pydantic takes pydantic v2 models, while the task schemas
+    are pydantic.v1 models. The returned model holds the answer's JSON object,
+    validates it against the task's schema and reports that schema as its own,
+    so CrewAI's structured-output call gets the full output structure.
+
+    Args:
+        name: Stage name of the task
+
+    Returns:
+        Pydantic v2 model class, or None
+    """
+    schema = TASK_SCHEMAS.get(name)
+    if schema is None:
+        return None
+    if name not in _output_models:
+        def check_schema(model):
+            schema.parse_obj(model.root)
+            return model
+
+        model = pydantic.create_model(
+            f"{schema.__name__}Output",
+            __base__=pydantic.RootModel[Dict[str, Any]],
+            __validators__={"check_schema": pydantic.model_validator(mode="after")(check_schema)}
+        )
+        model.model_json_schema = classmethod(lambda cls, *args, **kwargs: schema.schema())
+        _output_models[name] = model
+    return _output_models[name]
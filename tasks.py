@@ -1,17 +1,228 @@
-from crewai import Task
-from typing import Optional
-from agents import create_document_parsing_agent, create_legal_compliance_agent, create_risk_analysis_agent
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from functools import lru_cache
+import ast
+import hashlib
+import inspect
+import json
+import textwrap
+from schemas import TASK_SCHEMAS
+from utils.token_budget import METADATA_KEYS, compact_json, count_tokens, get_task_budget
 
-def create_contract_extraction_task(contract_text: str) -> Task:
+# CrewAI is imported on first use so importing the prompts is fast
+if TYPE_CHECKING:
+    from crewai import Task
+
+# Agent kind of each task. The tasks are created without an agent; ContractAnalysisCrew
+# checks one out of the shared agent pool while the task runs and returns it afterwards
+TASK_AGENTS = {
+    "contract_details": "document_parsing",
+    "contract_details_chunk": "document_parsing",
+    "compliance_analysis": "legal_compliance",
+    "risk_assessment": "risk_analysis",
+    "clause_review": "legal_compliance"
+}
+
+# Keys of the structured contract extraction, in output order
+EXTRACTION_FIELDS = {
+    "parties": "Contract parties (names of all organizations involved)",
+    "dates": "Contract effective date and termination date",
+    "contract_type": "Contract type (e.g., SaaS, software license, maintenance, consulting)",
+    "value_and_payment_terms": "Contract value and payment terms",
+    "deliverables": "Key deliverables or services",
+    "performance_metrics": "SLAs or performance metrics",
+    "termination_conditions": "Termination conditions",
+    "intellectual_property": "Intellectual property clauses",
+    "data_privacy": "Data handling and privacy clauses",
+    "governing_law": "Governing law and jurisdiction for disputes",
+    "unique_clauses": "Any unique or unusual clauses"
+}
+
+def _format_extraction_fields(known_fields: Optional[dict] = None) -> str:
+    """Render the extraction fields that still need to be extracted as a numbered prompt list."""
+    fields = [(key, description) for key, description in EXTRACTION_FIELDS.items() if key not in (known_fields or {})]
+    return "\n        ".join(
+        f"{i}. {key}: {description}" for i, (key, description) in enumerate(fields, start=1)
+    )
+
+# Headings of upstream stage outputs in downstream prompts
+UPSTREAM_LABELS = {
+    "contract_details": "Parsed contract information",
+    "compliance_analysis": "Compliance analysis",
+    "risk_prepass": "Keyword-based risk pre-assessment of the full contract (from the risk evaluation tool)"
+}
+
+# Keys of upstream outputs a task does not need, on top of METADATA_KEYS
+CONTEXT_DROP_KEYS = {
+    "compliance_analysis": METADATA_KEYS | {"deliverables"},
+    # Keyword counts, offsets and clause lengths of the risk pre-pass
+    "risk_assessment": METADATA_KEYS | {"hits", "term_counts", "matches", "clause_length"}
+}
+
+# Share of a task's token budget its creation-time context may use; the rest is
+# left for the instructions and the outputs of upstream tasks
+CONTEXT_SHARE = 0.5
+
+def format_upstream_context(task_name: str, upstream: dict, used_tokens: int = 0) -> str:
+    """
+    Render the outputs of upstream stages as compact JSON within the task's token budget.
+    
+    The tokens left in the budget after the task's own description are split
+    evenly between the upstream outputs; outputs smaller than their share pass
+    the unused tokens on to the others.
+    
+    Args:
+        task_name: Stage name of the task receiving the context
+        upstream: Parsed outputs of upstream stages keyed by stage name
+        used_tokens: Tokens already used by the task's description
+        
+    Returns:
+        str: Prompt section with one compact JSON block per upstream output
+    """
+    drop_keys = CONTEXT_DROP_KEYS.get(task_name, METADATA_KEYS)
+    remaining = max(get_task_budget(task_name) - used_tokens, 0)
+    sections = []
+    # Render the smallest outputs first so they hand their unused share on
+    rendered = {name: compact_json(output, drop_keys=drop_keys) for name, output in upstream.items()}
+    for index, name in enumerate(sorted(rendered, key=lambda name: len(rendered[name]))):
+        share = remaining // (len(rendered) - index)
+        text = compact_json(upstream[name], max_tokens=share, drop_keys=drop_keys)
+        if text:
+            remaining -= count_tokens(text)
+            sections.append((name, text))
+    
+    order = list(upstream)
+    return "".join(
+        f"""
+        {UPSTREAM_LABELS.get(name, name)}:
+        {text}
+        """ for name, text in sorted(sections, key=lambda section: order.index(section[0]))
+    )
+
+def _format_field_hints(field_hints: Optional[dict]) -> str:
+    """Render low-confidence rule-based findings as hints for the extraction prompt."""
+    if not field_hints:
+        return ""
+    return f"""
+        The following values were found by pattern matching and may be incomplete.
+        Verify them against the contract and complete them:
+        {compact_json(field_hints)}
+        """
+
+def _format_known_fields(known_fields: Optional[dict]) -> str:
+    """Render contract information extracted by rules for downstream prompts."""
+    if not known_fields:
+        return ""
+    return f"""
+        Contract information extracted by pattern matching (in addition to the parsed contract information):
+        {compact_json(known_fields)}
+        """
+
+# Names of the task outputs in JSON-mode structuring prompts
+OUTPUT_LABELS = {
+    "contract_details": "contract information extraction",
+    "contract_details_chunk": "contract information extraction",
+    "compliance_analysis": "compliance analysis",
+    "risk_assessment": "risk assessment",
+    "clause_review": "clause review"
+}
+
+def create_structuring_messages(task_name: str, answer: str, errors: list, schema) -> list:
+    """
+    Create the chat messages of a JSON-mode call that restructures an invalid task answer.
+    
+    Args:
+        task_name: Stage name of the task
+        answer: The agent's answer that failed validation
+        errors: Validation or parse errors of the answer
+        schema: Pydantic model of the task's output
+        
+    Returns:
+        list: System and user messages for the JSON-mode LLM
+    """
+    json_schema = schema.schema()
+    keys = "\n        ".join(
+        f"{i}. {key}: {field.get('description') or field.get('title', key)}"
+        for i, (key, field) in enumerate(json_schema.get("properties", {}).items(), start=1)
+        if key != "__root__"
+    )
+    return [
+        {
+            "role": "system",
+            "content": "You convert the answers of contract analysis agents into JSON. Reply with a single "
+                       "JSON object matching the given JSON schema. Keep every finding of the answer and "
+                       "do not add information that is not in it."
+        },
+        {
+            "role": "user",
+            "content": f"""
+        Convert this {OUTPUT_LABELS.get(task_name, task_name)} answer into JSON.
+        
+        Keys:
+        {keys or "One key per area, as in the answer"}
+        
+        JSON schema:
+        {compact_json(json_schema)}
+        
+        The answer could not be used: {'; '.join(errors)}
+        
+        Answer:
+        {answer}
+        """
+        }
+    ]
+
+def _prompt_code(function) -> str:
+    """The syntax tree of a function without docstrings, so comments and docs do not count."""
+    tree = ast.parse(textwrap.dedent(inspect.getsource(function)))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and ast.get_docstring(node) is not None:
+            node.body = node.body[1:]
+    return ast.dump(tree)
+
+@lru_cache(maxsize=None)
+def get_prompt_fingerprint() -> str:
+    """
+    Fingerprint the task prompt templates and output schemas.
+    
+    Covers the code of every function that writes a prompt, the prompt
+    constants of this module and the JSON schemas of the task outputs.
+    Changing any of them changes the fingerprint, which invalidates previously
+    cached analysis results; edits elsewhere in this module do not.
+    
+    Returns:
+        str: Hex-encoded SHA-256 digest of the prompts and schemas
+    """
+    prompt_functions = (
+        _format_extraction_fields, format_upstream_context, _format_field_hints, _format_known_fields,
+        create_structuring_messages, create_contract_extraction_task, create_chunk_extraction_task,
+        _format_contract_details, _format_clause_index, create_compliance_analysis_task,
+        create_risk_assessment_task, create_clause_review_task
+    )
+    digest = hashlib.sha256()
+    for function in prompt_functions:
+        digest.update(_prompt_code(function).encode("utf-8"))
+    constants = [EXTRACTION_FIELDS, UPSTREAM_LABELS, CONTEXT_DROP_KEYS, CONTEXT_SHARE, OUTPUT_LABELS]
+    digest.update(json.dumps(constants, sort_keys=True, default=sorted).encode("utf-8"))
+    for name, schema in sorted(TASK_SCHEMAS.items()):
+        digest.update(json.dumps([name, schema.schema()], sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+def create_contract_extraction_task(contract_text: str, known_fields: Optional[dict] = None,
+                                    field_hints: Optional[dict] = None) -> "Task":
     """
     Create a task for extracting information from a contract.
     
     Args:
         contract_text: The text content of the contract document
+        known_fields: Fields already extracted with high confidence by the rule-based
+            pre-extraction; they are left out of the prompt
+        field_hints: Low-confidence rule-based findings the LLM should verify and complete
         
     Returns:
         Task: CrewAI task for contract extraction
     """
+    from crewai import Task
+    
     return Task(
         description=f"""
         Analyze the following IT contract and extract key information in a structured format:
@@ -19,36 +230,95 @@ def create_contract_extraction_task(contract_text: str) -> Task:
         {contract_text}
         
         Extract and organize the following elements:
-        1. Contract parties (names of all organizations involved)
-        2. Contract effective date and termination date
-        3. Contract type (e.g., SaaS, software license, maintenance, consulting)
-        4. Contract value and payment terms
-        5. Key deliverables or services
-        6. SLAs or performance metrics
-        7. Termination conditions
-        8. Intellectual property clauses
-        9. Data handling and privacy clauses
-        10. Any unique or unusual clauses
-        
-        Format the output as a structured JSON object with these categories as keys.
+        {_format_extraction_fields(known_fields)}
+        {_format_field_hints(field_hints)}
+        Format the output as a structured JSON object using the element names above as keys.
         """,
         expected_output="""
         A structured JSON object containing key information extracted from the contract,
         including parties, dates, terms, and clauses.
+        """
+    )
+
+def create_chunk_extraction_task(chunk_text: str, chunk_index: int, chunk_count: int,
+                                 known_fields: Optional[dict] = None) -> "Task":
+    """
+    Create a task for extracting information from one part of a long contract.
+    
+    The partial results of all chunks are merged into the full extraction schema.
+    
+    Args:
+        chunk_text: The text content of this part of the contract
+        chunk_index: Position of the chunk (1-based)
+        chunk_count: Total number of chunks in the contract
+        known_fields: Fields already extracted with high confidence by the rule-based
+            pre-extraction; they are left out of the prompt
+        
+    Returns:
+        Task: CrewAI task for extracting information from a contract chunk
+    """
+    from crewai import Task
+    
+    return Task(
+        description=f"""
+        The following text is part {chunk_index} of {chunk_count} of an IT contract.
+        Extract the key information that appears in THIS PART ONLY:
+        
+        {chunk_text}
+        
+        Extract and organize the following elements:
+        {_format_extraction_fields(known_fields)}
+        
+        Format the output as a structured JSON object using the element names above as keys.
+        Use null for elements that are not mentioned in this part. Do not guess or repeat
+        information from other parts of the contract.
         """,
-        agent=create_document_parsing_agent()
+        expected_output="""
+        A structured JSON object with the information found in this part of the contract,
+        using null for elements that are not present.
+        """
     )
 
-def create_compliance_analysis_task() -> Task:
+def _format_contract_details(contract_details, task_name: str) -> str:
+    """Render already extracted contract information as compact JSON within the task's context share."""
+    if not contract_details:
+        return ""
+    return f"""
+        Parsed contract information:
+        {compact_json(contract_details, int(get_task_budget(task_name) * CONTEXT_SHARE), CONTEXT_DROP_KEYS[task_name])}
+        """
+
+def _format_clause_index(contract_id: Optional[str]) -> str:
+    """Tell the agent how to retrieve the wording of the contract's clauses from the clause index."""
+    if not contract_id:
+        return ""
+    return f"""
+        The full contract is indexed as contract_id "{contract_id}". To check the exact wording of a
+        clause, call your tools with this contract_id; they return only the most relevant clauses.
+        """
+
+def create_compliance_analysis_task(contract_details=None, known_fields: Optional[dict] = None,
+                                    contract_id: Optional[str] = None) -> "Task":
     """
     Create a task for analyzing legal compliance in a contract.
     
+    Args:
+        contract_details: Optional extracted contract information (dict or JSON text) to
+            include in the prompt, used when the extraction did not run as a task in the same crew
+        known_fields: Rule-based extraction results that are not part of the
+            extraction task's output
+        contract_id: ID of the contract in the clause index, if its clauses can be
+            retrieved with the agent's tools
+    
     Returns:
         Task: CrewAI task for compliance analysis
     """
+    from crewai import Task
+    
     return Task(
-        description="""
+        description=f"""
         Analyze the parsed contract information for legal compliance issues and risks.
+        {_format_contract_details(contract_details, "compliance_analysis")}{_format_known_fields(known_fields)}{_format_clause_index(contract_id)}
         
         Specifically evaluate:
         1. GDPR and data privacy compliance
@@ -72,22 +342,32 @@ def create_compliance_analysis_task() -> Task:
         expected_output="""
         A comprehensive compliance analysis in JSON format that identifies legal issues,
         potential risks, and provides actionable recommendations.
-        """,
-        agent=create_legal_compliance_agent(),
-        context=[create_contract_extraction_task]  # This will be dynamically replaced with actual task
+        """
     )
 
-def create_risk_assessment_task() -> Task:
+def create_risk_assessment_task(contract_details=None, known_fields: Optional[dict] = None,
+                                contract_id: Optional[str] = None) -> "Task":
     """
     Create a task for assessing business and operational risks in a contract.
     
+    Args:
+        contract_details: Optional extracted contract information (dict or JSON text) to
+            include in the prompt, used when the extraction did not run as a task in the same crew
+        known_fields: Rule-based extraction results that are not part of the
+            extraction task's output
+        contract_id: ID of the contract in the clause index, if its clauses can be
+            retrieved with the agent's tools
+    
     Returns:
         Task: CrewAI task for risk assessment
     """
+    from crewai import Task
+    
     return Task(
-        description="""
+        description=f"""
         Conduct a comprehensive risk assessment of the IT contract based on the parsed contract
         information and compliance analysis.
+        {_format_contract_details(contract_details, "risk_assessment")}{_format_known_fields(known_fields)}{_format_clause_index(contract_id)}
         
         Your risk assessment should cover:
         1. Financial risks (e.g., cost overruns, hidden fees, payment terms)
@@ -113,7 +393,47 @@ def create_risk_assessment_task() -> Task:
         expected_output="""
         A detailed risk assessment in JSON format that quantifies risks, provides
         mitigation strategies, and highlights critical areas requiring attention.
+        """
+    )
+
+def create_clause_review_task(clauses: List[Tuple[str, str]]) -> "Task":
+    """
+    Create a task for reviewing individual clauses of a contract version.
+    
+    Every clause is judged on its own text, so its findings can be cached by
+    the clause's content and reused for later versions of the contract.
+    
+    Args:
+        clauses: (clause ID, clause text) pairs to review
+        
+    Returns:
+        Task: CrewAI task for the clause review
+    """
+    from crewai import Task
+    
+    clause_texts = "\n        ".join(f"[{clause_id}] {text.strip()}" for clause_id, text in clauses)
+    return Task(
+        description=f"""
+        Review the following clauses of an IT contract one by one. Each clause starts with its ID
+        in square brackets:
+        
+        {clause_texts}
+        
+        For each clause, report:
+        - fields: the contract information it contains, as an object using these keys where they apply:
+          {", ".join(EXTRACTION_FIELDS)}
+        - compliance_issues: legal compliance issues of the clause, each an object with area, issue
+          and recommendation (an empty list if there are none)
+        - risk_level: High, Medium, Low or None
+        - risk_score: business risk of the clause from 1 to 10
+        - risk_areas: risk areas affected (financial, operational, strategic, reputational, security,
+          vendor, exit)
+        - mitigation: how to mitigate the risk in the negotiation
+        
+        Judge each clause on its own text only. Format the output as a structured JSON object with
+        the clause IDs as keys.
         """,
-        agent=create_risk_analysis_agent(),
-        context=[create_contract_extraction_task, create_compliance_analysis_task]  # Will be replaced with actual tasks
-    ) 
\ No newline at end of file
+        expected_output="""
+        A JSON object with the fields, compliance issues and risk of every clause, keyed by clause ID.
+        """
+    )
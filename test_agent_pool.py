@@ -0,0 +1,39 @@
+"""
+Tests for the checkout and release of reusable agents in agents.AgentPool
+"""
+from types import SimpleNamespace
+
+from agents import AgentPool
+
+
+def make_pool():
+    return AgentPool({"risk_analysis": lambda: SimpleNamespace(role="Risk Assessment Specialist")})
+
+
+def test_released_agents_are_reused():
+    pool = make_pool()
+    first, second = pool.acquire("risk_analysis"), pool.acquire("risk_analysis")
+    assert first is not second
+    pool.release(first)
+    assert pool.acquire("risk_analysis") is first
+    assert pool.stats() == {"risk_analysis": {"created": 2, "idle": 0}}
+
+
+def test_only_checked_out_agents_are_returned():
+    pool = make_pool()
+    agent = pool.acquire("risk_analysis")
+    pool.release(agent)
+    # A second release does not queue the agent twice
+    pool.release(agent)
+    assert pool.stats()["risk_analysis"]["idle"] == 1
+
+    # Agents from create() and foreign agents with the same role are not adopted
+    pool.release(pool.create("risk_analysis"))
+    pool.release(SimpleNamespace(role="Risk Assessment Specialist"))
+    assert pool.stats()["risk_analysis"]["idle"] == 1
+    assert pool.acquire("risk_analysis") is agent and pool.stats()["risk_analysis"]["idle"] == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,106 @@
+"""
+Tests for the persistent analysis cache in utils/analysis_cache.py
+"""
+import crew
+from crew import ContractAnalysisCrew
+from utils import analysis_cache
+from utils.analysis_cache import AnalysisCache, compute_cache_key
+from utils.contract_store import ContractStore
+
+CONTRACT = "MASTER SERVICES AGREEMENT\n\n1. Fees are due within 30 days.\n"
+
+
+def test_get_set_and_stats(tmp_path):
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"))
+    assert cache.get("a") is None
+    cache.set("a", {"risk_assessment": {"overall_risk_score": 4}})
+    assert cache.get("a") == {"risk_assessment": {"overall_risk_score": 4}}
+
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["size_bytes"] > 0
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    # Counters persist across instances sharing the database
+    assert AnalysisCache(path=cache.path).stats()["total_hits"] == 1
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.set("b", {})
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["total_misses"] == 2
+
+
+def test_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(analysis_cache.time, "time", lambda: now[0])
+
+    # Least recently used entries go first once there are too many
+    cache = AnalysisCache(path=str(tmp_path / "entries.sqlite3"), max_entries=2, max_bytes=0, max_age_seconds=0)
+    cache.set("a", {"n": 1})
+    now[0] += 1
+    cache.set("b", {"n": 2})
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None and cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.stats()["total_evictions"] == 1
+
+    # ... or once they are too large
+    cache = AnalysisCache(path=str(tmp_path / "bytes.sqlite3"), max_entries=0, max_bytes=250, max_age_seconds=0)
+    for key in "abc":
+        now[0] += 1
+        cache.set(key, {"text": key * 100})
+    assert cache.get("a") is None and cache.get("b") is not None and cache.get("c") is not None
+
+    # Entries expire after max_age_seconds
+    cache = AnalysisCache(path=str(tmp_path / "age.sqlite3"), max_entries=0, max_bytes=0, max_age_seconds=60)
+    cache.set("a", {"n": 1})
+    now[0] += 30
+    assert cache.get("a") == {"n": 1}
+    now[0] += 31
+    assert cache.get("a") is None and cache.stats()["entries"] == 0
+
+
+def test_cache_key_covers_prompts_and_model():
+    key = compute_cache_key(CONTRACT, "prompts-v1", {"model": "gpt-4o", "temperature": 0.2}, variant="full")
+    # Cosmetic whitespace differences and key order do not matter
+    assert key == compute_cache_key(CONTRACT.replace(" ", "  ").replace("\n", "\r\n"), "prompts-v1",
+                                    {"temperature": 0.2, "model": "gpt-4o"}, variant="full")
+    assert key != compute_cache_key(CONTRACT, "prompts-v2", {"model": "gpt-4o", "temperature": 0.2}, variant="full")
+    assert key != compute_cache_key(CONTRACT, "prompts-v1", {"model": "gpt-4o-mini", "temperature": 0.2}, variant="full")
+    assert key != compute_cache_key(CONTRACT, "prompts-v1", {"model": "gpt-4o", "temperature": 0.2}, variant="fast")
+    assert key != compute_cache_key(CONTRACT.replace("30", "60"), "prompts-v1", {"model": "gpt-4o", "temperature": 0.2}, variant="full")
+
+
+def test_only_structured_results_are_cached(tmp_path, monkeypatch):
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"))
+    store = ContractStore(str(tmp_path / "store.sqlite3"))
+    outputs = {
+        "contract_details": {"parties": ["Acme Corp", "Globex Inc."]},
+        "compliance_analysis": "I could not analyze the compliance of this contract.",
+        "risk_assessment": {"summary": {"overall_risk_score": 5}}
+    }
+
+    def run_analysis(contract_text, *args):
+        return {**outputs, "execution": {"mode": "sequential", "tokens": {}}}
+
+    monkeypatch.setattr(crew, "get_analysis_cache", lambda: cache)
+    monkeypatch.setattr(crew, "get_contract_store", lambda: store)
+    monkeypatch.setattr(crew, "get_llm_config", lambda: {"model": "test"})
+    monkeypatch.setattr(ContractAnalysisCrew, "_run_analysis", staticmethod(run_analysis))
+
+    results = ContractAnalysisCrew.analyze_contract(CONTRACT, map_reduce=False, pre_extract=False)
+    assert results["error"].startswith("Failed to structure results: compliance_analysis:")
+    assert "cache" not in results and cache.stats()["entries"] == 0 and store.summary()["contracts"] == 0
+
+    outputs["compliance_analysis"] = {"gdpr": {"issue": "No data processing agreement"}}
+    results = ContractAnalysisCrew.analyze_contract(CONTRACT, map_reduce=False, pre_extract=False)
+    assert "error" not in results and results["cache"]["hit"] is False and results["store"]["version"] == 1
+    # Cache hits are not stored again
+    results = ContractAnalysisCrew.analyze_contract(CONTRACT, map_reduce=False, pre_extract=False)
+    assert results["cache"]["hit"] and "store" not in results
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
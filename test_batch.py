@@ -0,0 +1,131 @@
+"""
+Tests for the batch scheduler in utils/scheduler.py and the resumable batch runs of batch.py
+"""
+import json
+import time
+
+from batch import load_completed, run_batch
+from crew import ContractAnalysisCrew
+from utils import scheduler
+from utils.scheduler import RateLimiter, retry_with_backoff
+
+
+def test_rate_limiter_paces_requests_and_tokens():
+    limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=100, window_seconds=0.3)
+    started = time.monotonic()
+    limiter.acquire(tokens=40)
+    limiter.acquire(tokens=40)
+    assert time.monotonic() - started < 0.1
+    assert limiter.usage() == {"requests": 2, "tokens": 80}
+
+    # The third request waits until the first two leave the window
+    limiter.acquire(tokens=40)
+    assert time.monotonic() - started >= 0.29
+    assert limiter.usage() == {"requests": 1, "tokens": 40}
+
+    # ... and so does one that would exceed the token budget
+    started = time.monotonic()
+    limiter.acquire(tokens=70)
+    assert time.monotonic() - started >= 0.29
+
+    # A reservation larger than the whole budget is admitted once the window is empty
+    time.sleep(0.3)
+    started = time.monotonic()
+    limiter.acquire(tokens=500)
+    assert time.monotonic() - started < 0.1
+
+
+def test_retry_with_backoff(monkeypatch):
+    delays, retries = [], []
+    monkeypatch.setattr(scheduler.time, "sleep", delays.append)
+    calls = []
+
+    def flaky():
+        calls.append(len(calls))
+        if len(calls) < 4:
+            raise RuntimeError("rate limited")
+        return "done"
+
+    result = retry_with_backoff(flaky, max_retries=3, base_delay=2.0, max_delay=3.0,
+                                on_retry=lambda attempt, error, delay: retries.append((attempt, str(error))))
+    assert result == "done" and len(calls) == 4
+    assert retries == [(1, "rate limited"), (2, "rate limited"), (3, "rate limited")]
+    # Exponential delays with jitter in [delay / 2, delay], capped at max_delay
+    for delay, upper in zip(delays, [2.0, 3.0, 3.0]):
+        assert upper / 2 <= delay <= upper
+
+    calls.clear()
+    try:
+        retry_with_backoff(flaky, max_retries=1, base_delay=0.1)
+    except RuntimeError:
+        assert len(calls) == 2
+    else:
+        raise AssertionError("the last error was not raised")
+
+
+def test_resumed_batch_skips_completed_contracts(tmp_path, monkeypatch):
+    monkeypatch.setenv("PARSE_CACHE_ENABLED", "0")
+    source = tmp_path / "contracts"
+    source.mkdir()
+    for name in ("a", "b", "c"):
+        (source / f"{name}.txt").write_text(f"Contract {name}: fees are due within 30 days.", encoding="utf-8")
+
+    # a succeeded and b failed in the previous run, which crashed while writing a line
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "a.txt", "status": "success"}) + "\n"
+        + json.dumps({"id": "b.txt", "status": "failed", "error": "timeout"}) + "\n"
+        + '{"id": "c.txt", "sta', encoding="utf-8"
+    )
+    assert load_completed(str(output)) == {"a.txt"}
+
+    analyzed = []
+
+    def analyze_contract(contract_text, contract_id=None, **options):
+        analyzed.append(contract_id)
+        return {"contract_details": {"length": len(contract_text)}}
+
+    monkeypatch.setattr(ContractAnalysisCrew, "analyze_contract", staticmethod(analyze_contract))
+    summary = run_batch(str(source), str(output), workers=2, parse_processes=1)
+    assert sorted(analyzed) == ["b.txt", "c.txt"]
+    assert (summary["total"], summary["skipped"], summary["succeeded"], summary["failed"]) == (3, 1, 2, 0)
+
+    assert load_completed(str(output)) == {"a.txt", "b.txt", "c.txt"}
+    analyzed.clear()
+    assert run_batch(str(source), str(output))["skipped"] == 3 and analyzed == []
+
+
+
+def test_error_results_are_recorded_without_retrying(tmp_path, monkeypatch):
+    monkeypatch.setenv("PARSE_CACHE_ENABLED", "0")
+    monkeypatch.setattr(scheduler.time, "sleep", lambda delay: None)
+    source = tmp_path / "contracts"
+    source.mkdir()
+    for name in ("a", "b"):
+        (source / f"{name}.txt").write_text(f"Contract {name}: fees are due within 30 days.", encoding="utf-8")
+
+    calls = []
+
+    def analyze_contract(contract_text, contract_id=None, **options):
+        calls.append(contract_id)
+        if contract_id == "a.txt":
+            return {"error": "Failed to structure results: risk_assessment"}
+        # b hits a transient error once and succeeds on the retry
+        if calls.count(contract_id) == 1:
+            raise RuntimeError("rate limited")
+        return {"contract_details": {}}
+
+    monkeypatch.setattr(ContractAnalysisCrew, "analyze_contract", staticmethod(analyze_contract))
+    output = tmp_path / "results.jsonl"
+    summary = run_batch(str(source), str(output), workers=2, parse_processes=1, max_retries=3)
+    assert sorted(calls) == ["a.txt", "b.txt", "b.txt"]
+    assert (summary["succeeded"], summary["failed"]) == (1, 1)
+
+    records = {record["id"]: record for record in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert records["a.txt"]["status"] == "failed" and records["a.txt"]["error"].startswith("Failed to structure")
+    assert records["b.txt"]["status"] == "success"
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,47 @@
+"""
+Tests for the benchmark harness in benchmark.py
+"""
+import os
+import tempfile
+
+from benchmark import build_corpus, compare_reports, percentile, scale_contract
+from utils.document_parser import parse_document_path
+
+
+def test_renderings_parse_back_to_the_contract():
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = build_corpus(workdir, scales=(1,))
+        assert corpus and all(sorted(document["paths"]) == ["docx", "pdf", "txt"] for document in corpus)
+        for document in corpus:
+            letters = "".join(document["text"].split())
+            for path in document["paths"].values():
+                parsed = parse_document_path(path, use_cache=False)
+                assert parsed["success"], parsed.get("error")
+                # Long lines are wrapped in the PDF, so compare the text without whitespace
+                assert "".join(parsed["text"].split())[:2000] == letters[:2000], os.path.basename(path)
+
+
+def test_scaling_and_percentiles():
+    assert scale_contract("clause", 1) == "clause"
+    assert scale_contract("clause", 3).count("clause") == 3
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert percentile([1.0, 2.0], 100) == 2.0
+
+
+def test_regressions_against_baseline():
+    def report(p50_ms):
+        return {"results": [{"document": "sla", "scale": 1, "stages": {
+            "chunk_text": {"p50_ms": p50_ms}, "pipeline_sequential": {"skipped": "crewai is not installed"}
+        }}]}
+
+    assert compare_reports(report(10.0), report(10.0)) == []
+    assert compare_reports(report(11.0), report(10.0)) == []
+    regressions = compare_reports(report(20.0), report(10.0))
+    assert [regression["stage"] for regression in regressions] == ["chunk_text"]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,124 @@
+"""
+Tests for the clause-level diffing and incremental revision analysis
+"""
+import random
+
+import crew
+from crew import ContractAnalysisCrew
+from utils.analysis_cache import AnalysisCache
+from utils.clause_diff import diff_clause_units, merge_clause_findings, risk_redline, split_clause_units
+from utils.contract_store import ContractStore
+from utils.mock_llm import synthetic_answer
+
+# Long enough that its sections are reviewed as separate units
+FILLER = " The parties agree to this clause." * 70
+
+CONTRACT = f"""# SERVICES AGREEMENT
+
+## 1. DEFINITIONS
+
+1.1 "Services" means the hosting services.{FILLER}
+
+## 2. FEES
+
+2.1 Fees are due within 30 days of the invoice.
+
+## 3. LIABILITY
+
+3.1 Liability is capped at the fees paid in the last 12 months.{FILLER}
+"""
+
+
+def test_diff_finds_changed_added_and_removed_clauses():
+    revised = CONTRACT.replace("30 days", "60 days").replace(
+        f"## 3. LIABILITY\n\n3.1 Liability is capped at the fees paid in the last 12 months.{FILLER}\n",
+        f"## 3. ESCROW\n\n3.1 The source code is deposited in escrow.{FILLER}\n"
+    )
+    previous, current = split_clause_units(CONTRACT), split_clause_units(revised)
+    assert [unit.key for unit in previous][1:] == ["1 DEFINITIONS", "2 FEES", "3 LIABILITY"]
+    # Whitespace and renumbering do not change a clause's fingerprint
+    renumbered = split_clause_units(CONTRACT.replace("## 1. DEFINITIONS\n\n1.1", "## 4. DEFINITIONS\n\n4.1   "))
+    assert renumbered[1].fingerprint == previous[1].fingerprint
+
+    changes = {change["key"]: change for change in diff_clause_units(previous, current)}
+    assert changes["1 DEFINITIONS"]["status"] == "unchanged"
+    assert changes["2 FEES"]["status"] == "changed"
+    assert changes["2 FEES"]["diff"] == ["-2.1 Fees are due within 30 days of the invoice.",
+                                         "+2.1 Fees are due within 60 days of the invoice."]
+    assert changes["3 ESCROW"]["status"] == "added" and changes["3 LIABILITY"]["status"] == "removed"
+
+    findings = {
+        changes["2 FEES"]["previous_fingerprint"]: {"risk_level": "Low", "risk_score": 3,
+                                                    "compliance_issues": [{"area": "payment", "issue": "Late fees unclear"}]},
+        changes["2 FEES"]["fingerprint"]: {"risk_level": "Medium", "risk_score": 5, "compliance_issues": []},
+        changes["3 LIABILITY"]["previous_fingerprint"]: {"risk_level": "Low"}
+    }
+    redline = {entry["clause"]: entry for entry in risk_redline(list(changes.values()), findings)}
+    assert redline["2 FEES"]["risk_delta"] == 2 and redline["2 FEES"]["resolved_issues"] == ["Late fees unclear"]
+    assert redline["3 LIABILITY"]["risk_delta"] == -2 and redline["3 ESCROW"]["risk_score"] is None
+
+    report = merge_clause_findings(previous, {previous[2].fingerprint: findings[changes["2 FEES"]["previous_fingerprint"]]})
+    assert report["compliance_analysis"] == {"payment": [{"clause": "2 FEES", "issue": "Late fees unclear"}]}
+    assert report["risk_assessment"]["summary"]["overall_risk_score"] == 3.0
+
+
+def test_revision_reviews_only_new_clauses(monkeypatch, tmp_path):
+    reviewed = []
+
+    def kickoff_task(task, name, upstream=None, **attributes):
+        reviewed.extend(text for _, text in task)
+        prompt = "Review the following clauses\n" + "\n".join(f"[{clause_id}] {text}" for clause_id, text in task)
+        answer = synthetic_answer([{"role": "user", "content": prompt}], random.Random(0), json_mode=True)
+        return answer, {"total_tokens": len(prompt) // 4, "successful_requests": 1}
+
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"))
+    clause_cache = AnalysisCache(path=str(tmp_path / "clause_cache.sqlite3"))
+    store = ContractStore(str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(crew, "get_analysis_cache", lambda: cache)
+    monkeypatch.setattr(crew, "get_clause_cache", lambda: clause_cache)
+    monkeypatch.setattr(crew, "get_contract_store", lambda: store)
+    monkeypatch.setattr(crew, "get_llm_config", lambda: {"model": "test"})
+    monkeypatch.setattr(crew, "create_clause_review_task", lambda clauses: clauses)
+    monkeypatch.setattr(ContractAnalysisCrew, "_kickoff_task", staticmethod(kickoff_task))
+
+    first = ContractAnalysisCrew.analyze_revision(CONTRACT)
+    assert first["execution"]["reviewed_clauses"] == 4 and first["execution"]["cached_clauses"] == 0
+    assert first["risk_assessment"]["summary"]["overall_risk_score"] is not None
+
+    reviewed.clear()
+    revised = CONTRACT.replace("30 days", "45 days")
+    second = ContractAnalysisCrew.analyze_revision(revised, previous_text=CONTRACT)
+    assert reviewed == ["## 2. FEES\n\n2.1 Fees are due within 45 days of the invoice.\n\n"]
+    assert second["execution"]["cached_clauses"] == 4
+    assert second["revision"]["clauses"] == {"unchanged": 3, "changed": 1, "added": 0, "removed": 0}
+    assert [entry["clause"] for entry in second["revision"]["risk_redline"]] == ["2 FEES"]
+    assert len(store.history(first["store"]["contract_id"])) == 1 and store.summary()["versions"] == 2
+    # Clause findings are kept out of the cache of whole analyses
+    assert clause_cache.stats()["entries"] == 5 and cache.stats()["entries"] == 0
+
+
+def test_failed_review_batches_count_as_unparsed(monkeypatch, tmp_path):
+    def kickoff_task(task, name, upstream=None, **attributes):
+        if any("FEES" in text for _, text in task):
+            raise RuntimeError("rate limited")
+        prompt = "Review the following clauses\n" + "\n".join(f"[{clause_id}] {text}" for clause_id, text in task)
+        answer = synthetic_answer([{"role": "user", "content": prompt}], random.Random(0), json_mode=True)
+        return answer, {"total_tokens": len(prompt) // 4, "successful_requests": 1}
+
+    cache = AnalysisCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(crew, "get_clause_cache", lambda: cache)
+    monkeypatch.setattr(crew, "get_llm_config", lambda: {"model": "test"})
+    monkeypatch.setattr(crew, "create_clause_review_task", lambda clauses: clauses)
+    monkeypatch.setattr(crew, "CLAUSE_BATCH_SIZE", 1)
+    monkeypatch.setattr(ContractAnalysisCrew, "_kickoff_task", staticmethod(kickoff_task))
+
+    # The other batches are still reviewed and cached
+    units = split_clause_units(CONTRACT)
+    findings, info = ContractAnalysisCrew._review_clauses(units)
+    assert (info["batches"], info["unparsed_clauses"], len(findings)) == (4, 1, 3)
+    assert cache.stats()["entries"] == 3 and info["tokens"]["successful_requests"] == 3
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,102 @@
+"""
+Tests for the clause embedding index in utils/clause_index.py
+"""
+import numpy as np
+
+import crew
+import utils.clause_index as clause_index
+from crew import ContractAnalysisCrew
+from utils.clause_index import ClauseIndex, EmbeddingCache, HashingEmbedder, embed_texts
+
+LIABILITY = """## 8. LIABILITY
+
+8.1 The Vendor's total liability under this Agreement is unlimited and is not capped.
+
+8.2 Neither party is liable for indirect or consequential damages.
+"""
+
+PAYMENT = """## 5. PAYMENT
+
+5.1 The Customer shall pay all invoices within 30 days; late payments incur interest.
+
+5.2 Fees are fixed for the initial term.
+"""
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dimensions=256)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def test_batch_embedding_deduplicates_and_caches(tmp_path):
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    vectors = embed_texts(["fees", "liability", "fees"], embedder, cache, batch_size=1)
+    assert embedder.embedded == ["fees", "liability"]
+    assert vectors.shape == (3, 256) and np.allclose(vectors[0], vectors[2])
+    assert np.isclose(np.linalg.norm(vectors[1]), 1.0)
+
+    embedder.embedded.clear()
+    assert np.allclose(embed_texts(["liability", "fees"], embedder, cache), vectors[[1, 0]])
+    assert embedder.embedded == []
+
+
+def test_index_search_save_and_load(tmp_path, monkeypatch):
+    embedder = CountingEmbedder()
+    index = ClauseIndex(embedder)
+    assert index.add_contract("acme", PAYMENT + "\n" + LIABILITY, {"vendor": "Acme"}) == 2
+    assert index.add_contract("globex", PAYMENT) == 1
+    # Re-adding an unchanged contract embeds nothing
+    embedder.embedded.clear()
+    assert index.add_contract("globex", PAYMENT) == 0 and embedder.embedded == []
+
+    hits = index.search("uncapped liability", top_k=2)
+    assert hits[0]["contract_id"] == "acme" and hits[0]["key"] == "8 LIABILITY"
+    assert hits[0]["metadata"] == {"vendor": "Acme"}
+    assert [hit["contract_id"] for hit in index.search("late payment interest", contract_id="globex")] == ["globex"]
+    assert [entry["contract_id"] for entry in index.search_contracts("unlimited liability")][0] == "acme"
+
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    loaded = ClauseIndex.load(path, embedder)
+    assert len(loaded) == 3 and loaded.search("uncapped liability", top_k=1)[0]["key"] == "8 LIABILITY"
+
+    # Large indexes are partitioned and only the closest partitions are searched
+    monkeypatch.setattr(clause_index, "IVF_MIN_CLAUSES", 20)
+    for n in range(20):
+        index.add_contract(f"contract-{n}", PAYMENT.replace("30 days", f"{n + 10} days"))
+    assert index.centroids is not None and len(index.assignments) == len(index)
+    assert index.search("uncapped liability", top_k=1, nprobe=len(index.centroids))[0]["contract_id"] == "acme"
+    assert index.remove_contract("acme") and len(index.assignments) == len(index) == 21
+
+
+def test_analyzed_contracts_leave_the_index(monkeypatch):
+    index = ClauseIndex(CountingEmbedder())
+    index.add_contract("library", LIABILITY)
+    monkeypatch.setattr(clause_index, "_default_index", index)
+    monkeypatch.setattr(crew, "CLAUSE_RETRIEVAL", True)
+
+    # The contract stays indexed until the last of two overlapping analyses finishes
+    with ContractAnalysisCrew._clause_retrieval(PAYMENT) as first:
+        with ContractAnalysisCrew._clause_retrieval(PAYMENT) as second:
+            assert first == second and first in index.contracts
+        assert index.search("late payment interest", contract_id=first)
+    assert list(index.contracts) == ["library"] and len(index) == 1
+
+    # Contracts indexed before the analysis are kept
+    with ContractAnalysisCrew._clause_retrieval(LIABILITY) as contract_id:
+        assert contract_id in index.contracts
+    index.add_contract(contract_id, LIABILITY)
+    with ContractAnalysisCrew._clause_retrieval(LIABILITY):
+        pass
+    assert contract_id in index.contracts
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,84 @@
+"""
+Tests for the compliance knowledge base in utils/compliance_kb.py
+"""
+import random
+import tempfile
+
+from utils.compliance_kb import ComplianceKnowledgeBase, load_knowledge_base, load_regulations, tokenize
+
+
+def exhaustive_scores(knowledge_base, query, allowed=None):
+    """Reference implementation: sum every posting of every query term."""
+    scores = {}
+    for term in tokenize(query):
+        for doc_id, weight in knowledge_base.postings.get(term, ()):
+            if allowed is None or doc_id in allowed:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+    return sorted(scores.values(), reverse=True)
+
+
+def synthetic_regulations(copies=20, seed=11):
+    """Expand the shipped regulations into a larger corpus with varied text."""
+    rng = random.Random(seed)
+    regulations = load_regulations()
+    words = [word for regulation in regulations for requirement in regulation["requirements"]
+             for word in requirement["text"].split()]
+    corpus = []
+    for copy in range(copies):
+        for regulation in regulations:
+            requirements = [
+                dict(requirement, id=f"{requirement['id']}-{copy}", text=" ".join(rng.choices(words, k=60)))
+                for requirement in regulation["requirements"]
+            ]
+            corpus.append(dict(regulation, regulation=f"{regulation['regulation']}{copy}", requirements=requirements))
+    return corpus
+
+
+def test_breach_notification_is_ranked_first():
+    knowledge_base = ComplianceKnowledgeBase.build(load_regulations())
+    results = knowledge_base.search("data breach notification", jurisdiction="EU")
+    assert results[0]["id"] == "gdpr-art33"
+    assert all(result["regulation"] in ("GDPR", "DORA") for result in results)
+    assert [result["score"] for result in results] == sorted((result["score"] for result in results), reverse=True)
+
+
+def test_jurisdiction_without_query_lists_requirements():
+    knowledge_base = ComplianceKnowledgeBase.build(load_regulations())
+    results = knowledge_base.search("", jurisdiction="hipaa", top_k=100)
+    assert results and {result["regulation"] for result in results} == {"HIPAA"}
+    assert knowledge_base.regulations_for("Atlantis") is None
+
+
+def test_pruned_search_matches_exhaustive_ranking():
+    rng = random.Random(5)
+    for knowledge_base in (ComplianceKnowledgeBase.build(load_regulations()),
+                           ComplianceKnowledgeBase.build(synthetic_regulations())):
+        vocabulary = sorted(knowledge_base.postings)
+        for _ in range(300):
+            query = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 6)))
+            top_k = rng.randint(1, 8)
+            jurisdiction = rng.choice([None, "EU", "US"])
+            codes = knowledge_base.regulations_for(jurisdiction) if jurisdiction else None
+            allowed = None if codes is None else {
+                doc_id for doc_id, document in enumerate(knowledge_base.documents) if document["regulation"] in codes
+            }
+            expected = exhaustive_scores(knowledge_base, query, allowed)[:top_k]
+            results = knowledge_base.search(query, jurisdiction=jurisdiction, top_k=top_k)
+            assert len(results) == len(expected), query
+            # Scores are summed in a different order, so allow for rounding
+            assert all(abs(result["score"] - score) < 1e-3 for result, score in zip(results, expected)), query
+
+
+def test_index_is_cached_on_disk():
+    with tempfile.TemporaryDirectory() as index_dir:
+        built = load_knowledge_base(index_dir=index_dir)
+        loaded = load_knowledge_base(index_dir=index_dir)
+        assert loaded.postings == built.postings
+        assert loaded.search("encryption") == built.search("encryption")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,127 @@
+"""
+Tests for the persistent contract analysis store
+"""
+import multiprocessing
+import random
+from datetime import date
+
+import crew
+from crew import ContractAnalysisCrew
+from utils.contract_store import ContractStore, parse_date
+from utils.mock_llm import synthetic_answer
+
+# Long enough that its sections are stored as separate clauses
+FILLER = " The parties agree to this clause." * 70
+
+CONTRACT = f"""# MASTER SERVICES AGREEMENT
+
+## 1. SERVICES
+
+1.1 Provider shall host the Customer's applications with 99.9% availability.{FILLER}
+
+## 2. LIABILITY
+
+2.1 Provider's liability for data breaches shall be unlimited.{FILLER}
+
+## 3. TERM
+
+3.1 This Agreement starts on January 15, 2024 and ends on 12/31/2024.
+"""
+
+RESULTS = {
+    "contract_details": {
+        "parties": [{"name": "Acme Hosting Ltd.", "role": "Provider"}, "Globex Corporation"],
+        "contract_type": "Managed Services",
+        "dates": {"effective_date": "January 15, 2024 (the Effective Date)", "termination_date": "12/31/2024"}
+    },
+    "compliance_analysis": {
+        "gdpr": [{"issue": "No data processing agreement", "clause": "1.1", "recommendation": "Add a DPA"}],
+        "ccpa": "No opt-out of data sales"
+    },
+    "risk_assessment": {
+        "liability": {"level": "high risk", "mitigation": "Cap the liability"},
+        "summary": {"overall_risk_score": "7/10", "critical_areas": ["liability"]}
+    },
+    "execution": {"mode": "sequential"}
+}
+
+
+def test_store_versions_and_queries(tmp_path):
+    store = ContractStore(str(tmp_path / "store.sqlite3"))
+    assert parse_date("effective as of 1 March 2023") == "2023-03-01"
+
+    assert store.save(CONTRACT, RESULTS, "acme") == {"contract_id": "acme", "version": 1}
+    # Re-analyzing the same text replaces the version; a changed text adds one
+    assert store.save(CONTRACT.replace("\n", "  \n"), RESULTS, "acme")["version"] == 1
+    low_risk = {**RESULTS, "risk_assessment": {"summary": {"overall_risk_score": 3}}}
+    assert store.save(CONTRACT.replace("unlimited", "capped"), low_risk, "acme")["version"] == 2
+    store.save(CONTRACT.replace("Globex", "Initech"), RESULTS, "initech")
+
+    contracts = {contract["contract_id"]: contract for contract in store.query(party="acme HOST")}
+    assert list(contracts) == ["initech", "acme"]
+    assert contracts["initech"]["risk_level"] == "High" and contracts["initech"]["risk_score"] == 7.0
+    assert contracts["acme"]["risk_level"] == "Low" and contracts["acme"]["version"] == 2
+    assert contracts["acme"]["effective_date"] == "2024-01-15" and contracts["acme"]["end_date"] == "2024-12-31"
+    assert contracts["acme"]["compliance_issues"] == 2
+
+    assert [c["contract_id"] for c in store.query(risk_level="High", contract_type="managed services")] == ["initech"]
+    assert [c["version"] for c in store.query(text="liability unlimited", all_versions=True, order_by="contract_id")] == [1, 1]
+    assert store.query(party="Initech") == [] and store.query(ends_to="2024-06-30") == []
+    hits = store.search_clauses("breaches", contract_id="acme")
+    assert [(hit["version"], hit["key"]) for hit in hits] == [(2, "2 LIABILITY")] and "**breaches**" in hits[0]["snippet"]
+
+    record = store.get("acme", version=1)
+    assert record["results"]["risk_assessment"]["summary"]["overall_risk_score"] == "7/10"
+    assert "execution" not in record["results"] and not record["latest"]
+    assert record["risks"] == [{"area": "liability", "level": "High", "score": None}]
+    assert [entry["risk_score"] for entry in store.history("acme")] == [7.0, 3.0]
+
+    summary = store.summary(today=date(2024, 11, 1))
+    assert summary["contracts"] == 2 and summary["versions"] == 3 and summary["average_risk_score"] == 5.0
+    assert summary["risk_levels"] == {"High": 1, "Low": 1} and summary["compliance_areas"] == {"gdpr": 2, "ccpa": 2}
+    assert [contract["contract_id"] for contract in summary["expiring"]] == ["acme", "initech"]
+
+    assert store.delete("acme") == 2
+    assert store.get("acme") is None and store.search_clauses("breaches", contract_id="acme") == []
+
+
+def save_revision(path, revision):
+    return ContractStore(path).save(CONTRACT.replace("99.9%", f"{revision}%"), RESULTS, "acme")["version"]
+
+
+def test_concurrent_saves_add_distinct_versions(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    ContractStore(path)
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        versions = pool.starmap(save_revision, [(path, revision) for revision in range(8)])
+    assert sorted(versions) == list(range(1, 9))
+    assert [entry["version"] for entry in ContractStore(path).history("acme")] == list(range(1, 9))
+
+
+def test_revision_analyses_are_stored_as_versions(monkeypatch, tmp_path):
+    def kickoff_task(task, name, upstream=None, **attributes):
+        prompt = "Review the following clauses\n" + "\n".join(f"[{clause_id}] {text}" for clause_id, text in task)
+        answer = synthetic_answer([{"role": "user", "content": prompt}], random.Random(0), json_mode=True)
+        return answer, {"total_tokens": len(prompt) // 4, "successful_requests": 1}
+
+    store = ContractStore(str(tmp_path / "store.sqlite3"))
+    monkeypatch.setattr(crew, "get_contract_store", lambda: store)
+    monkeypatch.setattr(crew, "create_clause_review_task", lambda clauses: clauses)
+    monkeypatch.setattr(ContractAnalysisCrew, "_kickoff_task", staticmethod(kickoff_task))
+
+    first = ContractAnalysisCrew.analyze_revision(CONTRACT, use_cache=False, contract_id="acme")
+    revised = CONTRACT.replace("unlimited", "capped at the annual fees")
+    second = ContractAnalysisCrew.analyze_revision(revised, CONTRACT, use_cache=False, contract_id="acme")
+    assert (first["store"], second["store"]) == ({"contract_id": "acme", "version": 1}, {"contract_id": "acme", "version": 2})
+
+    record = store.get("acme", include_text=True)
+    assert record["text"] == revised and "revision" in record["results"]
+    # Clause risks of clause-by-clause analyses are kept with the clause segments
+    scored = [clause for clause in record["clauses"] if clause["risk_score"] is not None]
+    assert scored and {clause["key"] for clause in scored} <= {risk["area"] for risk in record["risks"]}
+    assert len(store.history("acme")) == 2
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,213 @@
+"""
+Tests for the document parsers and text chunking utilities in utils/document_parser.py
+"""
+import io
+import os
+import random
+import tempfile
+
+from benchmark import render_docx, render_pdf, scale_contract
+from utils import document_parser
+from utils.document_parser import (
+    DocumentSource, chunk_text, iter_chunk_spans, iter_chunks, iter_pdf_pages, parse_document
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def legacy_chunk_text(text, chunk_size=4000, overlap=200):
+    """
+    The original list-based chunk_text implementation.
+
+    Returns the chunks and whether the tail branch re-sliced from an offset
+    other than the start of the chunk it replaced (the behaviour that was fixed).
+    """
+    chunks = []
+    starts = []
+    start = 0
+    text_length = len(text)
+    resliced = False
+
+    while start < text_length:
+        end = min(start + chunk_size, text_length)
+
+        if end == text_length and end - start < chunk_size / 2:
+            if chunks:
+                new_start = start - chunk_size + overlap
+                resliced = new_start != starts[-1]
+                chunks[-1] = text[new_start:end]
+            else:
+                chunks.append(text[start:end])
+            break
+
+        chunks.append(text[start:end])
+        starts.append(start)
+        start = end - overlap
+
+    return chunks, resliced
+
+
+def random_cases(count=2000, seed=42):
+    rng = random.Random(seed)
+    for _ in range(count):
+        chunk_size = rng.randint(1, 300)
+        overlap = rng.randint(0, chunk_size - 1)
+        text = "".join(rng.choice("abcdefgh \n") for _ in range(rng.randint(0, 2000)))
+        yield text, chunk_size, overlap
+
+
+def test_spans_cover_text_with_bounded_overlap():
+    for text, chunk_size, overlap in random_cases():
+        spans = list(iter_chunk_spans(text, chunk_size, overlap))
+        if not text:
+            assert spans == []
+            continue
+
+        assert spans[0][0] == 0
+        assert spans[-1][1] == len(text)
+        for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+            assert end - start == chunk_size
+            assert end - next_start == overlap
+            assert next_end > end
+        assert spans[-1][1] - spans[-1][0] < chunk_size * 1.5
+
+
+def test_merged_tail_is_at_most_half_a_chunk_longer():
+    # A 49 character tail is merged: the last chunk holds 100 + 49 - 10 characters
+    assert list(iter_chunk_spans("x" * 229, chunk_size=100, overlap=10)) == [(0, 100), (90, 229)]
+    assert list(iter_chunk_spans("x" * 230, chunk_size=100, overlap=10)) == [(0, 100), (90, 190), (180, 230)]
+
+    for text, chunk_size, overlap in random_cases():
+        lengths = [end - start for start, end in iter_chunk_spans(text, chunk_size, overlap)]
+        assert all(length <= chunk_size for length in lengths[:-1])
+        assert not lengths or lengths[-1] <= max(chunk_size, chunk_size + chunk_size // 2 - overlap)
+
+
+def test_chunk_text_matches_legacy_implementation():
+    for text, chunk_size, overlap in random_cases():
+        # The legacy loop never terminates when the overlap can exceed the tail
+        overlap = overlap // 2
+        legacy, resliced = legacy_chunk_text(text, chunk_size, overlap)
+        if resliced:
+            continue
+        assert chunk_text(text, chunk_size, overlap) == legacy
+
+
+def test_chunk_text_keeps_short_document_intact():
+    # The old tail branch re-sliced from a negative offset and returned only the end
+    text = "x" * 2000 + "y" * 1000
+    assert chunk_text(text, chunk_size=4000, overlap=200) == [text]
+
+
+def test_iter_chunks_is_lazy_and_zero_copy_for_bytes():
+    data = bytes(range(256)) * 100
+    chunks = iter_chunks(data, chunk_size=1000, overlap=100)
+    first = next(chunks)
+    assert isinstance(first, memoryview)
+    assert first.obj is data
+    assert b"".join(bytes(chunk) for chunk in [first, *chunks])[:1000] == data[:1000]
+
+
+def test_iter_chunks_matches_chunk_text():
+    for text, chunk_size, overlap in random_cases(count=200, seed=7):
+        assert list(iter_chunks(text, chunk_size, overlap)) == chunk_text(text, chunk_size, overlap)
+
+
+def test_invalid_overlap_is_rejected():
+    for chunk_size, overlap in [(0, 0), (100, 100), (100, -1)]:
+        try:
+            list(iter_chunk_spans("text", chunk_size, overlap))
+        except ValueError:
+            continue
+        raise AssertionError(f"chunk_size={chunk_size}, overlap={overlap} was accepted")
+
+
+def test_parallel_pdf_extraction_matches_sequential():
+    with open(os.path.join(DATA_DIR, "it_service_level_agreement.txt"), encoding="utf-8") as f:
+        text = scale_contract(f.read(), 2)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "contract.pdf")
+        render_pdf(text, path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        sequential = list(iter_pdf_pages(path, parallel=False))
+        assert len(sequential) > document_parser.PDF_PAGES_PER_TASK
+        assert list(iter_pdf_pages(path, parallel=True, max_workers=2)) == sequential
+
+        # Uploads are spilled to a single temporary file shared by the workers, and removed afterwards
+        original_tempdir = tempfile.tempdir
+        tempfile.tempdir = spill_dir = os.path.join(workdir, "spill")
+        os.mkdir(spill_dir)
+        try:
+            assert list(iter_pdf_pages(io.BytesIO(data), parallel=True, max_workers=2)) == sequential
+        finally:
+            tempfile.tempdir = original_tempdir
+        assert os.listdir(spill_dir) == []
+
+
+def test_path_bytes_and_file_sources_give_identical_text():
+    with open(os.path.join(DATA_DIR, "software_licensing_agreement.txt"), encoding="utf-8") as f:
+        text = f.read()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {"txt": os.path.join(workdir, "contract.txt")}
+        with open(paths["txt"], "w", encoding="utf-8") as f:
+            f.write(text)
+        for file_format, render in (("pdf", render_pdf), ("docx", render_docx)):
+            paths[file_format] = os.path.join(workdir, f"contract.{file_format}")
+            render(text, paths[file_format])
+
+        for file_format, path in paths.items():
+            filename = os.path.basename(path)
+            expected = parse_document(path, filename, use_cache=False)
+            assert expected["success"], expected["error"]
+            with open(path, "rb") as f:
+                data = f.read()
+                assert parse_document(f, filename, use_cache=False)["text"] == expected["text"], file_format
+            assert parse_document(data, filename, use_cache=False)["text"] == expected["text"], file_format
+            assert parse_document(io.BytesIO(data), filename, use_cache=False)["text"] == expected["text"], file_format
+
+
+def test_memory_maps_are_closed():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "contract.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Fees are due within 30 days.")
+
+        source = DocumentSource(path)
+        mapped, opened = source._mmap, source._file
+        with source.buffer() as view:
+            assert bytes(view) == b"Fees are due within 30 days."
+        source.close()
+        assert mapped.closed and opened.closed and source._mmap is None
+
+        # Sources opened by the parsers are closed once parsing finishes
+        sources = []
+        original = document_parser.DocumentSource
+
+        class TrackedSource(original):
+            def __init__(self, *args):
+                super().__init__(*args)
+                sources.append(self)
+
+        document_parser.DocumentSource = TrackedSource
+        try:
+            assert parse_document(path, "contract.txt", use_cache=False)["success"]
+        finally:
+            document_parser.DocumentSource = original
+        assert sources and all(source._mmap is None and source._file is None for source in sources)
+
+        # Empty files are not mapped
+        open(path, "wb").close()
+        source = DocumentSource(path)
+        assert source._mmap is None and source.buffer().nbytes == 0
+        source.close()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,58 @@
+"""
+Tests for merging the partial extractions of map-reduce chunks in utils/extraction.py
+"""
+from utils.extraction import merge_extractions
+
+FIELDS = ["parties", "contract_type", "dates", "payment_terms"]
+
+
+def test_merge_keeps_schema_order_then_first_appearance():
+    merged = merge_extractions([
+        {"Payment Terms": "Net 30", "notes": "first chunk"},
+        "Unparseable answer",
+        {"contract-type": "SaaS", "renewal": "Automatic", "notes": "second chunk"}
+    ], FIELDS)
+    assert list(merged) == FIELDS + ["notes", "renewal"]
+    assert merged["payment_terms"] == "Net 30" and merged["contract_type"] == "SaaS"
+    # Conflicting scalars are kept in chunk order
+    assert merged["notes"] == ["first chunk", "second chunk"]
+
+    # Values follow the chunk order
+    reversed_merge = merge_extractions([{"notes": "second chunk"}, {"notes": "first chunk"}], FIELDS)
+    assert reversed_merge["notes"] == ["second chunk", "first chunk"]
+
+
+def test_list_fields_are_deduplicated():
+    merged = merge_extractions([
+        {"parties": ["Acme Corp", {"name": "Globex", "role": "Customer"}]},
+        {"parties": ["acme  corp", {"role": "Customer", "name": "Globex"}, "Initech"]},
+        {"parties": "Initech"}
+    ], FIELDS)
+    assert merged["parties"] == ["Acme Corp", {"name": "Globex", "role": "Customer"}, "Initech"]
+
+    # Nested dictionaries are merged key by key
+    merged = merge_extractions([
+        {"dates": {"effective_date": "2024-01-15", "termination_date": None}},
+        {"dates": {"termination_date": "2024-12-31", "effective_date": "2024-01-15"}}
+    ], FIELDS)
+    assert merged["dates"] == {"effective_date": "2024-01-15", "termination_date": "2024-12-31"}
+
+
+def test_null_and_empty_chunk_fields_are_ignored():
+    merged = merge_extractions([
+        {"contract_type": None, "payment_terms": "N/A", "parties": []},
+        {"contract_type": "  ", "payment_terms": "Not specified", "dates": {}},
+        {"contract_type": "Master Services Agreement", "parties": [None, "", "Acme Corp"]}
+    ], FIELDS)
+    assert merged == {
+        "parties": ["Acme Corp"],
+        "contract_type": "Master Services Agreement",
+        "dates": None,
+        "payment_terms": None
+    }
+    assert merge_extractions([], FIELDS) == dict.fromkeys(FIELDS)
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
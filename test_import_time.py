@@ -0,0 +1,79 @@
+"""
+Cold-start import checks: the parsing, tool and orchestration modules must import
+quickly, without LLM credentials and without loading CrewAI, LangChain or the
+document format libraries
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must stay cheap to import
+LIGHT_MODULES = (
+    "utils",
+    "utils.document_parser",
+    "utils.segmenter",
+    "utils.keyword_matcher",
+    "utils.compliance_kb",
+    "utils.rule_extractor",
+    "utils.analysis_cache",
+    "utils.job_queue",
+    "utils.mock_llm",
+    "utils.telemetry",
+    "utils.token_budget",
+    "utils.json_extract",
+    "utils.clause_diff",
+    "utils.contract_store",
+    "agents",
+    "tasks",
+    "tools",
+    "crew"
+)
+
+# Libraries that are only imported when they are first used
+HEAVY_MODULES = ("crewai", "langchain", "langchain_openai", "openai", "litellm", "PyPDF2", "docx2txt")
+
+# Cold import time budget per module, in seconds
+IMPORT_BUDGET_SECONDS = 0.5
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def cold_import(module):
+    """Import a module in a fresh interpreter without credentials and report the time and heavy libraries loaded."""
+    env = {key: value for key, value in os.environ.items()
+           if not key.endswith("_API_KEY") and key != "PYTHONPATH"}
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_modules_import_without_heavy_libraries():
+    for module in LIGHT_MODULES:
+        report = cold_import(module)
+        assert report["loaded"] == [], f"{module} imports {', '.join(report['loaded'])}"
+
+
+def test_cold_import_time():
+    for module in LIGHT_MODULES:
+        report = cold_import(module)
+        print(f"{module}: {report['seconds'] * 1000:.1f} ms")
+        assert report["seconds"] < IMPORT_BUDGET_SECONDS, f"{module} took {report['seconds']:.3f}s to import"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,98 @@
+"""
+Tests for the analysis job queue in utils/job_queue.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from utils.job_queue import FAILED, MAX_ATTEMPTS, QUEUED, RUNNING, SUCCEEDED, JobQueue, run_next_job
+
+
+def fake_analyze(contract_text, on_stage_complete=None, **options):
+    for index, stage in enumerate(("contract_details", "compliance_analysis", "risk_assessment")):
+        on_stage_complete(stage, {"stage": stage, "result": {"length": len(contract_text)},
+                                  "completed": index + 1, "total": 3})
+    return {"contract_details": {"length": len(contract_text)}, "options": options}
+
+
+def failing_analyze(contract_text, on_stage_complete=None, **options):
+    raise RuntimeError("rate limited")
+
+
+def test_jobs_run_in_submission_order():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        first = queue.submit("first contract", document_name="a.txt", execution_mode="fast")
+        second = queue.submit("second", document_name="b.txt")
+        assert queue.get(first)["status"] == QUEUED
+        assert "contract_text" not in queue.get(first)
+
+        assert run_next_job(queue, fake_analyze) == first
+        job = queue.get(first)
+        assert job["status"] == SUCCEEDED
+        assert job["result"] == {"contract_details": {"length": 14}, "options": {"execution_mode": "fast"}}
+        assert [event["stage"] for event in job["stages"]] == ["contract_details", "compliance_analysis", "risk_assessment"]
+
+        assert run_next_job(queue, fake_analyze) == second
+        assert run_next_job(queue, fake_analyze) is None
+        assert queue.stats() == {QUEUED: 0, RUNNING: 0, SUCCEEDED: 2, FAILED: 0}
+
+
+def test_failed_analysis_is_recorded():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        job_id = queue.submit("contract")
+        run_next_job(queue, failing_analyze)
+        job = queue.get(job_id)
+        assert job["status"] == FAILED
+        assert job["error"].startswith("rate limited")
+
+
+def test_jobs_of_dead_workers_are_requeued():
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(os.path.join(directory, "jobs.sqlite3"))
+        job_id = queue.submit("contract")
+
+        # Claim the job from a process that exits right away
+        dead = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        for attempt in range(MAX_ATTEMPTS):
+            assert queue.claim(worker_pid=int(dead.stdout))["id"] == job_id
+            assert queue.recover() == 1
+        assert queue.get(job_id)["status"] == FAILED
+
+        # Jobs of live workers are left alone
+        running = queue.submit("other contract")
+        queue.claim()
+        assert queue.recover() == 0
+        assert queue.get(running)["status"] == RUNNING
+
+
+def test_finished_jobs_are_pruned():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.sqlite3")
+        queue = JobQueue(path, max_finished_jobs=2, max_age_seconds=3600)
+        jobs = [queue.submit(f"contract {index}") for index in range(4)]
+
+        # Only the newest finished jobs are kept
+        for _ in range(3):
+            run_next_job(queue, fake_analyze)
+        assert queue.get(jobs[0]) is None
+        assert queue.stats() == {QUEUED: 1, RUNNING: 0, SUCCEEDED: 2, FAILED: 0}
+
+        # Finished jobs expire, queued and running ones are kept however old
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE jobs SET created_at = created_at - 7200, finished_at = finished_at - 7200")
+        running = queue.submit("running contract")
+        assert run_next_job(queue, failing_analyze) == jobs[3]
+        queue.claim()
+        assert queue.stats() == {QUEUED: 0, RUNNING: 1, SUCCEEDED: 0, FAILED: 1}
+        assert queue.get(running)["status"] == RUNNING
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,49 @@
+"""
+Tests for the JSON scanner and repair in utils/json_extract.py
+"""
+import time
+
+from schemas import ContractDetails, RiskAssessment
+from utils.json_extract import extract_json, iter_json_spans, repair_json
+
+
+def test_finds_objects_among_prose():
+    output = 'Thought: I need {more} detail.\nFinal Answer: {"parties": ["Acme"], "note": "use {braces}"} Hope this helps :}'
+    data, errors = extract_json(output, ContractDetails)
+    assert data == {"parties": ["Acme"], "note": "use {braces}"} and errors == []
+    # A stray opening brace does not hide the objects after it
+    assert [span for span in iter_json_spans('{ stray {"a": 1} and {"b": {"c": 2}}')] == [(8, 16), (21, 36)]
+
+
+def test_repairs_llm_artifacts():
+    fenced = "```json\n{'parties': ['Acme', \"Globex's unit\"], 'governing_law': None, 'notes': 'None given',}\n```"
+    data, errors = extract_json(fenced, ContractDetails)
+    assert errors == []
+    assert data == {"parties": ["Acme", "Globex's unit"], "governing_law": None, "notes": "None given"}
+    assert repair_json('{"a": [1, 2,], "b": True,}') == '{"a": [1, 2], "b": true}'
+
+
+def test_schema_validation_errors():
+    data, errors = extract_json('{"financial": {"level": "High"}}', RiskAssessment)
+    assert data == {"financial": {"level": "High"}}
+    assert errors and "summary" in errors[0]
+    # Objects matching the schema win over larger ones that do not
+    data, errors = extract_json('{"example": "' + "x" * 200 + '"} {"parties": ["Acme"]}', ContractDetails)
+    assert data == {"parties": ["Acme"]} and errors == []
+    assert extract_json("I could not analyze the contract.", ContractDetails) == (None, ["The output does not contain a JSON object"])
+
+
+def test_scanning_is_linear():
+    # The greedy regex this replaces backtracked heavily on outputs with many unbalanced braces
+    output = "{ " * 50000 + '{"parties": ["Acme"]}' + " }x" * 1000
+    started = time.perf_counter()
+    data, _ = extract_json(output, ContractDetails)
+    assert data == {"parties": ["Acme"]}
+    assert time.perf_counter() - started < 1.0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
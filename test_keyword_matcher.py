@@ -0,0 +1,64 @@
+"""
+Tests for the Aho-Corasick keyword matcher in utils/keyword_matcher.py
+"""
+import random
+import re
+
+from utils.keyword_matcher import KeywordMatcher, _inflections
+
+
+def regex_matches(categories, text):
+    """Reference implementation: one word-bounded regex per keyword form."""
+    found = set()
+    for category, keywords in categories.items():
+        for keyword in keywords:
+            term = keyword.rstrip("*")
+            if keyword.endswith("*"):
+                pattern = rf"(?<!\w){re.escape(term)}\w*"
+            else:
+                forms = "|".join(re.escape(form) for form in _inflections(term))
+                pattern = rf"(?<!\w)(?:{forms})(?!\w)"
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                found.add((category, term, match.start(), match.end()))
+    return found
+
+
+def test_word_boundaries_and_stems():
+    matcher = KeywordMatcher({"security": ["data", "encrypt*"], "legal": ["warrant*", "penalty"]})
+    text = "Metadata and DATA; the database is Encrypted. Warranties and penalties apply."
+    matched = [(m["term"], m["matched"]) for m in matcher.find_all(text)]
+    assert matched == [
+        ("data", "DATA"),
+        ("encrypt", "Encrypted"),
+        ("warrant", "Warranties"),
+        ("penalty", "penalties")
+    ]
+
+
+def test_match_counts_per_category():
+    matcher = KeywordMatcher({"financial": ["fee", "payment"], "operational": ["uptime"]})
+    hits = matcher.match("Fees and fees; payment of fees. Uptime.", categories=["financial"])
+    assert list(hits) == ["financial"]
+    assert hits["financial"]["hits"] == 4
+    assert hits["financial"]["terms"] == {"fee": 3, "payment": 1}
+
+
+def test_matches_regex_reference():
+    categories = {
+        "a": ["ab", "abc*", "bca", "cab"],
+        "b": ["a", "bb", "ca*"],
+        "c": ["ab", "cc"]
+    }
+    rng = random.Random(3)
+    matcher = KeywordMatcher(categories)
+    for _ in range(500):
+        text = "".join(rng.choice("abcABs ed.") for _ in range(rng.randint(0, 200)))
+        found = {(m["category"], m["term"], m["start"], m["end"]) for m in matcher.find_all(text)}
+        assert found == regex_matches(categories, text), text
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,105 @@
+"""
+Tests for the OpenAI-compatible mock LLM server in utils/mock_llm.py
+"""
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from utils.mock_llm import MockLLM, MockLLMServer
+
+EXTRACTION_PROMPT = """
+        Analyze the following IT contract and extract key information in a structured format:
+
+        This Agreement is made between Acme Corp and Globex Inc.
+
+        Extract and organize the following elements:
+        1. parties: Contract parties (names of all organizations involved)
+        2. dates: Contract effective date and termination date
+        """
+
+
+def chat(url, content, **options):
+    body = json.dumps({"model": "gpt-4o-mini", "messages": [{"role": "user", "content": content}], **options})
+    request = urllib.request.Request(f"{url}/chat/completions", data=body.encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode("utf-8")
+
+
+def final_answer(response):
+    content = json.loads(response)["choices"][0]["message"]["content"]
+    return json.loads(content.split("Final Answer:", 1)[1])
+
+
+def test_synthetic_answers_follow_the_prompt():
+    server = MockLLMServer(MockLLM(latency_ms=0, tokens_per_second=0)).start()
+    try:
+        first = chat(server.url, EXTRACTION_PROMPT)
+        assert sorted(final_answer(first)) == ["dates", "parties"]
+        assert json.loads(first)["usage"]["total_tokens"] > 0
+        # Identical requests get identical answers
+        assert final_answer(chat(server.url, EXTRACTION_PROMPT)) == final_answer(first)
+        assert "summary" in final_answer(chat(server.url, "Conduct a comprehensive risk assessment of the IT contract"))
+        assert server.mock.stats()["requests"] == 3
+    finally:
+        server.stop()
+
+
+def test_simulated_latency():
+    mock = MockLLM(latency_ms=50, latency_sigma=0.0, tokens_per_second=1000, tokens_per_second_std=0.0)
+    first_token, decoding = mock.latency("key", completion_tokens=100)
+    assert abs(first_token - 0.05) < 1e-9 and abs(decoding - 0.1) < 1e-9
+
+    server = MockLLMServer(mock).start()
+    try:
+        started = time.perf_counter()
+        chat(server.url, EXTRACTION_PROMPT)
+        assert time.perf_counter() - started >= 0.05
+    finally:
+        server.stop()
+
+
+def test_streaming_response():
+    server = MockLLMServer(MockLLM(latency_ms=0, tokens_per_second=0)).start()
+    try:
+        events = [line[len("data: "):] for line in chat(server.url, EXTRACTION_PROMPT, stream=True).splitlines()
+                  if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        content = "".join(json.loads(event)["choices"][0]["delta"].get("content", "") for event in events[:-1])
+        assert final_answer(chat(server.url, EXTRACTION_PROMPT)) == json.loads(content.split("Final Answer:", 1)[1])
+    finally:
+        server.stop()
+
+
+def test_record_then_replay_offline():
+    upstream = MockLLMServer(MockLLM(latency_ms=0, tokens_per_second=0, seed=7)).start()
+    with tempfile.TemporaryDirectory() as fixtures_dir:
+        recorder = MockLLMServer(MockLLM(mode="record", fixtures_dir=fixtures_dir, upstream_url=upstream.url)).start()
+        try:
+            recorded = chat(recorder.url, EXTRACTION_PROMPT)
+        finally:
+            recorder.stop()
+            upstream.stop()
+        assert len(os.listdir(fixtures_dir)) == 1
+
+        # The upstream is gone; answers come from the fixtures
+        replayer = MockLLMServer(MockLLM(mode="replay", fixtures_dir=fixtures_dir)).start()
+        try:
+            assert json.loads(chat(replayer.url, EXTRACTION_PROMPT)) == json.loads(recorded)
+            try:
+                chat(replayer.url, "A request that was never recorded")
+                assert False, "expected a 404 for an unrecorded request"
+            except urllib.error.HTTPError as e:
+                assert e.code == 404
+        finally:
+            replayer.stop()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,91 @@
+"""
+Tests for the on-disk parsed-document cache in utils/parse_cache.py
+"""
+import os
+
+import pytest
+
+from utils import parse_cache
+from utils.parse_cache import ParseCache, compute_file_digest, page_for_offset
+
+RESULT = {
+    "success": True,
+    "text": "Page one.\n\nPage two.\n\n",
+    "metadata": {"pages": 2, "page_offsets": [[0, 9], [11, 20]], "format": "PDF"},
+    "error": None
+}
+
+
+def test_round_trip(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    digest = compute_file_digest(memoryview(b"%PDF-1.4 contract"))
+    assert digest == compute_file_digest(b"%PDF-1.4 contract")
+
+    assert cache.get(digest, "pdf", "2") is None
+    cache.set(digest, "pdf", "2", RESULT)
+    assert cache.get(digest, "pdf", "2") == RESULT
+    # Entries are specific to the file format and parser version
+    assert cache.get(digest, "docx", "2") is None and cache.get(digest, "pdf", "3") is None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 3) and stats["size_bytes"] > 0
+    cache.clear()
+    assert cache.get(digest, "pdf", "2") is None and cache.stats()["entries"] == 0
+
+
+def test_writes_replace_entries_atomically(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    cache.set("ab" * 32, "txt", "2", RESULT)
+    updated = {**RESULT, "text": "Updated text"}
+    cache.set("ab" * 32, "txt", "2", updated)
+    assert cache.get("ab" * 32, "txt", "2") == updated
+
+    # A failed write leaves the previous entry in place and no temporary file behind
+    def fail_replace(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(parse_cache.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        cache.set("ab" * 32, "txt", "2", RESULT)
+    assert cache.get("ab" * 32, "txt", "2") == updated
+    assert [filename for filename in os.listdir(tmp_path / "ab") if filename.endswith(".tmp")] == []
+
+
+def test_eviction(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(parse_cache.time, "time", lambda: now[0])
+
+    # Least recently used entries go first once the cache is too large
+    cache = ParseCache(str(tmp_path / "size"), max_bytes=0, max_age_seconds=0)
+    for digest in ("aa", "bb", "cc"):
+        now[0] += 10
+        cache.set(digest * 32, "txt", "2", RESULT)
+    entry_size = cache.stats()["size_bytes"] // 3
+    now[0] += 10
+    cache.get("aa" * 32, "txt", "2")
+    cache.max_bytes = entry_size * 3
+    now[0] += 10
+    cache.set("dd" * 32, "txt", "2", RESULT)
+    assert cache.get("bb" * 32, "txt", "2") is None
+    assert all(cache.get(digest * 32, "txt", "2") for digest in ("aa", "cc", "dd"))
+    assert cache.stats()["evictions"] == 1
+
+    # Entries unused for max_age_seconds expire
+    cache = ParseCache(str(tmp_path / "age"), max_bytes=0, max_age_seconds=60)
+    cache.set("aa" * 32, "txt", "2", RESULT)
+    now[0] += 30
+    assert cache.get("aa" * 32, "txt", "2") == RESULT
+    now[0] += 61
+    assert cache.get("aa" * 32, "txt", "2") is None
+    cache.set("bb" * 32, "txt", "2", RESULT)
+    assert cache.stats()["entries"] == 1
+
+
+def test_page_for_offset():
+    offsets = RESULT["metadata"]["page_offsets"]
+    assert [page_for_offset(offsets, offset) for offset in (0, 8, 9, 10, 11, 19, 20, -1)] == [1, 1, None, None, 2, 2, None, None]
+    assert page_for_offset([], 0) is None
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,65 @@
+"""
+Tests for the rule-based pre-extraction in utils/rule_extractor.py against the sample contracts in data/
+"""
+import os
+
+from utils.rule_extractor import extract_rule_fields, split_by_confidence
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def load_sample(filename):
+    with open(os.path.join(DATA_DIR, filename), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_software_licensing_agreement():
+    fields = extract_rule_fields(load_sample("software_licensing_agreement.txt"))
+    known, _ = split_by_confidence(fields)
+
+    assert known["parties"] == [{"name": "Google LLC", "role": "Licensor"}, {"name": "Salesforce, Inc.", "role": "Licensee"}]
+    assert known["dates"]["effective_date"] == "April 1, 2023"
+    assert known["dates"]["term"] == "three (3) years"
+    assert known["value_and_payment_terms"]["payment_days"] == [30]
+    assert known["value_and_payment_terms"]["late_payment_interest"] == "1.5% per month"
+    assert {"amount": "$5,000,000", "context": "Initial license fee: $5,000,000"} in known["value_and_payment_terms"]["fees"]
+    assert known["governing_law"]["law"] == "State of California"
+
+
+def test_software_development_agreement():
+    fields = extract_rule_fields(load_sample("software_development_agreement.txt"))
+    known, hints = split_by_confidence(fields)
+
+    assert [party["name"] for party in known["parties"]] == ["DevTech Solutions, Inc.", "Microsoft Corporation"]
+    assert [party["role"] for party in known["parties"]] == ["Developer", "Client"]
+    assert known["governing_law"] == {
+        "law": "State of Washington",
+        "venue": "federal and state courts located in King County, Washington"
+    }
+    # No effective date or payment deadline: left to the LLM with hints
+    assert hints["dates"]["other_dates"] == {"Delivery Date": "December 31, 2023"}
+    assert "value_and_payment_terms" in hints
+
+
+def test_it_service_level_agreement():
+    fields = extract_rule_fields(load_sample("it_service_level_agreement.txt"))
+    known, hints = split_by_confidence(fields)
+
+    assert [party["name"] for party in known["parties"]] == ["Amazon Web Services", "Microsoft Corporation"]
+    assert known["dates"] == {"effective_date": "March 1, 2023", "end_date": "March 1, 2024"}
+    # Service credit percentages are not uptime commitments
+    assert [entry["value"] for entry in hints["performance_metrics"]["uptime"]] == ["99.99%", "99.999%"]
+
+
+def test_spans_point_at_evidence():
+    text = load_sample("software_licensing_agreement.txt")
+    for field, result in extract_rule_fields(text).items():
+        for start, end in result["spans"]:
+            assert 0 <= start < end <= len(text), field
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,82 @@
+"""
+Tests for the clause segmentation and clause-aligned chunking in utils/segmenter.py
+"""
+import glob
+import os
+
+from utils.segmenter import chunk_by_clauses, outline, segment_contract
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+CONTRACT = """# MASTER SERVICES AGREEMENT
+
+## 1. SERVICES
+
+1.1 Provider shall host the applications.
+
+1.2 Provider shall back up data daily.
+
+## 2. FEES
+
+2.1 Fees are due within 30 days.
+"""
+
+
+def load_contracts():
+    paths = sorted(glob.glob(os.path.join(DATA_DIR, "*.txt")))
+    assert paths
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            yield os.path.basename(path), f.read()
+
+
+def test_chunks_are_contiguous_and_bounded():
+    assert chunk_by_clauses("") == []
+    for name, text in load_contracts():
+        for max_chars in (500, 2000, 8000):
+            spans = chunk_by_clauses(text, max_chars)
+            assert spans[0][0] == 0 and spans[-1][1] == len(text), (name, max_chars)
+            for (_, end), (next_start, _) in zip(spans, spans[1:]):
+                assert end == next_start, (name, max_chars)
+            assert all(0 < end - start <= max_chars for start, end in spans), (name, max_chars)
+
+
+def test_chunks_follow_clause_boundaries():
+    for name, text in load_contracts():
+        starts = {entry["start"] for entry in outline(segment_contract(text))}
+        for max_chars in (2000, 8000):
+            spans = chunk_by_clauses(text, max_chars)
+            # Every cut falls on a heading or clause, and no chunk ends with a heading
+            assert all(start in starts for start, _ in spans[1:]), (name, max_chars)
+            for start, end in spans[:-1]:
+                assert not text[start:end].rstrip().splitlines()[-1].startswith("#"), (name, max_chars)
+
+    # Sections that fit are kept whole
+    assert chunk_by_clauses(CONTRACT, 100) == [(0, 29), (29, 128), (128, len(CONTRACT))]
+    assert chunk_by_clauses(CONTRACT, 200) == [(0, len(CONTRACT))]
+
+
+def test_outline():
+    assert outline(segment_contract(CONTRACT)) == [
+        {"kind": "heading", "number": None, "title": "MASTER SERVICES AGREEMENT", "start": 0, "end": 173},
+        {"kind": "heading", "number": "1", "title": "SERVICES", "start": 29, "end": 128},
+        {"kind": "clause", "number": "1.1", "title": "Provider shall host the applications", "start": 45, "end": 88},
+        {"kind": "clause", "number": "1.2", "title": "Provider shall back up data daily", "start": 88, "end": 128},
+        {"kind": "heading", "number": "2", "title": "FEES", "start": 128, "end": 173},
+        {"kind": "clause", "number": "2.1", "title": "Fees are due within 30 days", "start": 140, "end": 173}
+    ]
+
+    # Spans start at their heading and nest within their parents
+    for name, text in load_contracts():
+        entries = outline(segment_contract(text))
+        assert entries[0]["start"] == 0 and entries[0]["end"] == len(text), name
+        assert [entry["start"] for entry in entries] == sorted(entry["start"] for entry in entries), name
+        for entry in entries:
+            assert entry["start"] < entry["end"] <= len(text), name
+            if entry["number"]:
+                assert entry["number"] in text[entry["start"]:entry["end"]].split("\n", 1)[0], name
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
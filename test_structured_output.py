@@ -0,0 +1,81 @@
+"""
+Tests for the typed task schemas and the JSON-mode restructuring of invalid answers
+"""
+import json
+from types import SimpleNamespace
+
+import pydantic
+import pytest
+
+import crew
+from crew import ContractAnalysisCrew
+from schemas import ComplianceAnalysis, RiskAssessment, get_output_model
+from utils.json_extract import validate_json
+from utils.mock_llm import synthetic_answer
+
+
+def test_typed_schemas():
+    data = {"summary": {"overall_risk_score": "7/10"}, "financial": {"level": "high risk"}}
+    assessment = RiskAssessment.parse_obj(data)
+    assert assessment.summary.overall_risk_score == 7.0
+    assert assessment.financial.level == "High"
+    assert validate_json({"summary": {"overall_risk_score": 14}}, RiskAssessment)
+    assert validate_json({"overall": 5, "vendor": {"level": {"rating": 3}}}, RiskAssessment)
+    assert validate_json({"gdpr": [{"issue": "No DPA"}, "Unclear retention"]}, ComplianceAnalysis) == []
+    assert validate_json({}, ComplianceAnalysis)
+
+
+class FakeJsonLLM:
+    def __init__(self, answer=None):
+        self.answer = answer
+        self.messages = None
+
+    def call(self, messages):
+        self.messages = messages
+        if self.answer is not None:
+            return self.answer
+        import random
+        return synthetic_answer(messages, random.Random(0), json_mode=True)
+
+
+def test_structure_output_with_json_mode(monkeypatch):
+    llm = FakeJsonLLM()
+    monkeypatch.setattr(crew, "get_json_llm", lambda: llm)
+    errors = ["object: Expected a summary section with the overall risk assessment"]
+    output, usage = ContractAnalysisCrew._structure_output("risk_assessment", "Final Answer: {'vendor': 'High'}", errors)
+    assert validate_json(json.loads(output), RiskAssessment) == []
+    assert usage["successful_requests"] == 1 and usage["prompt_tokens"] > 0
+    # The prompt carries the schema, the errors and the original answer
+    prompt = llm.messages[-1]["content"]
+    assert "overall_risk_score" in prompt and errors[0] in prompt and "'vendor': 'High'" in prompt
+
+    llm.answer = '{"vendor": "High"}'
+    output, usage = ContractAnalysisCrew._structure_output("risk_assessment", "no JSON", errors)
+    assert output is None and usage["successful_requests"] == 1
+
+    monkeypatch.setattr(crew, "get_json_llm", lambda: None)
+    assert ContractAnalysisCrew._structure_output("risk_assessment", "no JSON", errors) == (None, None)
+
+
+
+def test_output_models_validate_with_the_task_schemas():
+    model = get_output_model("risk_assessment")
+    assert model is get_output_model("risk_assessment") and get_output_model("unknown") is None
+    answer = '{"summary": {"overall_risk_score": 6}, "vendor": {"level": "High"}}'
+    structured = model.model_validate_json(answer)
+    assert json.loads(structured.model_dump_json()) == json.loads(answer)
+    # CrewAI's converter is given the task schema
+    assert "overall_risk_score" in json.dumps(model.model_json_schema())
+    with pytest.raises(pydantic.ValidationError):
+        model.model_validate({"vendor": "High"})
+    assert get_output_model("compliance_analysis").model_validate({"gdpr": {"issue": "No DPA"}}).root
+
+    # A structured output is preferred over the raw answer it was converted from
+    task = SimpleNamespace(output=SimpleNamespace(raw="Final Answer: " + answer, pydantic=structured))
+    assert json.loads(ContractAnalysisCrew._task_output_text(task)) == json.loads(answer)
+    task.output.pydantic = None
+    assert ContractAnalysisCrew._task_output_text(task) == "Final Answer: " + answer
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
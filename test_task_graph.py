@@ -0,0 +1,60 @@
+"""
+Tests for the dependency graph runner in utils/task_graph.py
+"""
+from utils.task_graph import run_task_graph, summarize_latency, topological_order
+
+DEPENDENCIES = {
+    "contract_details": [],
+    "risk_prepass": [],
+    "compliance_analysis": ["contract_details"],
+    "risk_assessment": ["contract_details", "risk_prepass"]
+}
+
+TIMINGS = {
+    "contract_details": {"started_at": 0.0, "finished_at": 4.0, "duration": 4.0},
+    "risk_prepass": {"started_at": 0.0, "finished_at": 1.0, "duration": 1.0},
+    "compliance_analysis": {"started_at": 4.0, "finished_at": 7.0, "duration": 3.0},
+    "risk_assessment": {"started_at": 4.0, "finished_at": 9.0, "duration": 5.0}
+}
+
+
+def test_topological_order():
+    assert topological_order(DEPENDENCIES) == ["contract_details", "risk_prepass", "compliance_analysis", "risk_assessment"]
+    for dependencies in ({"a": ["b"]}, {"a": ["b"], "b": ["a"]}):
+        try:
+            topological_order(dependencies)
+        except ValueError:
+            continue
+        raise AssertionError(f"{dependencies} was accepted")
+
+
+def test_summarize_latency_excludes_graph_only_stages():
+    summary = summarize_latency(TIMINGS, DEPENDENCIES,
+                                sequential_stages=["contract_details", "compliance_analysis", "risk_assessment"])
+    # 4 + 3 + 5 seconds one after another, against 9 seconds of wall-clock time
+    assert summary["wall_clock_seconds"] == 9.0
+    assert summary["sequential_estimate_seconds"] == 12.0
+    assert summary["latency_saved_seconds"] == 3.0
+    assert [stage["latency_saved_seconds"] for name, stage in summary["stages"].items() if name != "risk_prepass"] == [0.0, 0.0, 3.0]
+    assert "latency_saved_seconds" not in summary["stages"]["risk_prepass"]
+
+    # By default every timed stage counts towards the sequential estimate
+    assert summarize_latency(TIMINGS, DEPENDENCIES)["sequential_estimate_seconds"] == 13.0
+
+
+def test_run_task_graph_passes_upstream_outputs():
+    stages = {
+        "contract_details": lambda upstream: "details",
+        "risk_prepass": lambda upstream: "prepass",
+        "compliance_analysis": lambda upstream: sorted(upstream.items()),
+        "risk_assessment": lambda upstream: sorted(upstream)
+    }
+    outputs, timings = run_task_graph(stages, DEPENDENCIES)
+    assert outputs["compliance_analysis"] == [("contract_details", "details")]
+    assert outputs["risk_assessment"] == ["contract_details", "risk_prepass"]
+    assert set(timings) == set(DEPENDENCIES)
+
+
+if __name__ == "__main__":
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))
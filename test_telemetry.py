@@ -0,0 +1,74 @@
+"""
+Tests for the tracing and metrics instrumentation in utils/telemetry.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.telemetry import (
+    Tracer,
+    estimate_cost,
+    get_tracer,
+    propagate,
+    record_usage,
+    span,
+    summarize_spans,
+    to_otlp,
+    traced
+)
+
+
+@traced("test.tool")
+def tool_call():
+    return "done"
+
+
+def test_spans_nest_across_threads():
+    with span("test.analysis", mode="fast") as root:
+        with span("test.task") as task:
+            record_usage(task, {"prompt_tokens": 1000, "completion_tokens": 200, "successful_requests": 2}, "gpt-4o-mini")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(propagate(lambda _: tool_call()), range(2))) == ["done", "done"]
+
+    spans = get_tracer().trace(root.trace_id)
+    assert sorted(s.name for s in spans) == ["test.analysis", "test.task", "test.tool", "test.tool"]
+    assert all(s.parent_id == root.span_id for s in spans if s is not root)
+
+    timings = {entry["name"]: entry for entry in summarize_spans(spans)}
+    assert timings["test.analysis"]["parent"] is None
+    assert timings["test.task"]["prompt_tokens"] == 1000 and timings["test.task"]["cost_usd"] == estimate_cost("gpt-4o-mini", 1000, 200)
+
+
+def test_errors_are_recorded_and_reraised():
+    try:
+        with span("test.failing") as failing:
+            raise ValueError("bad clause")
+    except ValueError:
+        pass
+    else:
+        assert False, "expected the exception to propagate"
+    assert failing.error == "ValueError: bad clause"
+    assert to_otlp([failing])["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["status"] == {"code": 2, "message": failing.error}
+
+
+def test_cost_estimates():
+    assert estimate_cost("azure/gpt-4o", 1_000_000, 0) == 2.5
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 0, 1_000_000) == 0.6
+    assert estimate_cost("unknown-model", 10, 10) is None
+
+
+def test_prometheus_metrics():
+    tracer = Tracer()
+    with span("test.metrics") as metrics_span:
+        record_usage(metrics_span, {"prompt_tokens": 10, "completion_tokens": 5, "successful_requests": 1})
+        metrics_span.set_attributes(retries=2)
+    tracer.finish(metrics_span)
+    text = tracer.metrics.render()
+    assert 'contract_analysis_span_duration_seconds_count{span="test.metrics"} 1' in text
+    assert 'contract_analysis_llm_tokens_total{span="test.metrics",type="prompt"} 10' in text
+    assert 'contract_analysis_retries_total{span="test.metrics"} 2' in text
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -0,0 +1,64 @@
+"""
+Tests for the token budgeting and context compaction in utils/token_budget.py
+"""
+import json
+import os
+
+from tasks import format_upstream_context
+from tools import RiskEvaluationTool
+from utils.token_budget import compact, compact_json, count_tokens, get_task_budget
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "software_development_agreement.txt")) as f:
+    CONTRACT = f.read()
+
+
+def test_compact_removes_noise():
+    extraction = {
+        "parties": ["Acme  Corp", "Globex\n Inc.", "Acme Corp"],
+        "dates": {"effective": "2024-01-01", "termination": None},
+        "deliverables": [],
+        "reasoning": "I read the contract carefully",
+        "governing_law": "  New York  "
+    }
+    assert compact(extraction) == {
+        "parties": ["Acme Corp", "Globex Inc."],
+        "dates": {"effective": "2024-01-01"},
+        "governing_law": "New York"
+    }
+    assert compact_json(extraction) == '{"parties":["Acme Corp","Globex Inc."],"dates":{"effective":"2024-01-01"},"governing_law":"New York"}'
+
+
+def test_compact_json_fits_budget():
+    findings = {"issues": [{"clause": f"Clause {i}: " + "the vendor shall indemnify the customer " * 20} for i in range(200)]}
+    text = compact_json(findings, max_tokens=500)
+    assert count_tokens(text) <= 500
+    # Shortened, not cut off mid-structure
+    assert json.loads(text)["issues"][0]["clause"].startswith("Clause 0:")
+
+
+def test_upstream_context_respects_task_budget():
+    os.environ["TOKEN_BUDGET_RISK_ASSESSMENT"] = "1200"
+    try:
+        assert get_task_budget("risk_assessment") == 1200
+        upstream = {
+            "contract_details": {"parties": ["Acme Corp", "Globex Inc."]},
+            "compliance_analysis": {"findings": ["Missing breach notification deadline " * 30] * 50},
+            "risk_prepass": RiskEvaluationTool()._run(CONTRACT)
+        }
+        assert json.loads(upstream["risk_prepass"])["identified_risks"]["security"]["matches"]
+        context = format_upstream_context("risk_assessment", upstream, used_tokens=400)
+        assert count_tokens(context) <= 800 + 100  # section headings are outside the JSON budget
+        assert '"parties":["Acme Corp","Globex Inc."]' in context
+        assert '"keywords_found":' in context
+        # Only the keywords found reach the prompt, not their counts and offsets
+        for key in ("hits", "term_counts", "matches", "clause_length", '"start"'):
+            assert key not in context
+    finally:
+        del os.environ["TOKEN_BUDGET_RISK_ASSESSMENT"]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✓ {name}")
@@ -1,132 +1,214 @@
-from langchain.tools import BaseTool
 from pydantic.v1 import BaseModel, Field
-from typing import Optional, Type, Annotated, ClassVar
+from typing import TYPE_CHECKING, Optional, ClassVar
+from functools import lru_cache
 import os
 import json
 from utils.document_parser import parse_document, chunk_text
+from utils.segmenter import segment_contract, chunk_by_clauses, outline
+from utils.keyword_matcher import KeywordMatcher
+from utils.compliance_kb import get_compliance_kb
+from utils.telemetry import traced
+from utils.token_budget import truncate_to_tokens
+
+# LangChain is imported on first use so importing the tools is fast
+if TYPE_CHECKING:
+    from langchain.tools import BaseTool
+
+# The tools are plain classes with the name, description, args_schema and _run of
+# a LangChain BaseTool, which is all the CrewAI wrappers in agents.py use; wrap
+# them with as_langchain_tool where a LangChain BaseTool is required
+
+@lru_cache(maxsize=None)
+def as_langchain_tool(tool_class: type) -> type:
+    """
+    Create a LangChain BaseTool subclass that runs one of the tools below.
+    
+    Args:
+        tool_class: A tool class of this module
+        
+    Returns:
+        type: BaseTool subclass with the tool's name, description and arguments
+    """
+    from langchain.tools import BaseTool
+    
+    class LangChainTool(BaseTool):
+        name: ClassVar[str] = tool_class.name
+        description: ClassVar[str] = tool_class.description
+        args_schema: ClassVar[type] = tool_class.args_schema
+        
+        def _run(self, *args, **kwargs) -> str:
+            return tool_class()._run(*args, **kwargs)
+    
+    LangChainTool.__name__ = LangChainTool.__qualname__ = tool_class.__name__
+    LangChainTool.__doc__ = tool_class.__doc__
+    return LangChainTool
 
 class ContractParsingInput(BaseModel):
     """Input for contract parsing tool."""
     contract_text: str = Field(..., description="The text content of the contract to parse")
 
-class ContractParsingTool(BaseTool):
+class ContractParsingTool:
     """Tool for parsing contracts and extracting structured information."""
     name: ClassVar[str] = "contract_parsing_tool"
     description: ClassVar[str] = "Parses contract text and extracts key information such as parties, dates, terms, etc."
-    args_schema: Type[BaseModel] = ContractParsingInput
+    args_schema: ClassVar[type] = ContractParsingInput
     
+    @traced("tool.contract_parsing")
     def _run(self, contract_text: str) -> str:
         """Run the contract parsing tool."""
-        # If the contract is too long, chunk it and process in parts
+        # Segment the contract into its clause structure
+        clause_tree = segment_contract(contract_text)
+        sections = outline(clause_tree)
+        
+        # If the contract is too long, chunk it along clause boundaries and process in parts
         if len(contract_text) > 12000:
-            chunks = chunk_text(contract_text, chunk_size=8000)
-            results = []
-            for i, chunk in enumerate(chunks):
-                results.append(f"Analyzing chunk {i+1} of {len(chunks)}...")
-                # Process each chunk - in a real tool, you'd do more here
-            return json.dumps({"status": "success", "message": f"Contract analyzed in {len(chunks)} chunks"})
+            chunks = chunk_by_clauses(contract_text, max_chars=8000, root=clause_tree)
+            return json.dumps({
+                "status": "success",
+                "message": f"Contract analyzed in {len(chunks)} chunks",
+                "length": len(contract_text),
+                "sections": sections,
+                "chunks": [
+                    {"index": i + 1, "start": start, "end": end, "preview": contract_text[start:start + 200]}
+                    for i, (start, end) in enumerate(chunks)
+                ]
+            })
         else:
             # Process the entire contract
             return json.dumps({
                 "status": "success", 
                 "message": "Contract analyzed successfully",
-                "length": len(contract_text)
+                "length": len(contract_text),
+                "sections": sections
             })
 
 class ComplianceDatabaseInput(BaseModel):
     """Input for compliance database search tool."""
     query: str = Field(..., description="The compliance requirement or term to search for")
-    jurisdiction: Optional[str] = Field(None, description="Specific jurisdiction to search regulations for")
+    jurisdiction: Optional[str] = Field(None, description="Specific jurisdiction or regulation to search (e.g., EU, California, GDPR, HIPAA)")
+    max_results: int = Field(5, description="Maximum number of requirements to return")
+    contract_id: Optional[str] = Field(None, description="ID of an indexed contract; its clauses most relevant to the query are returned too")
 
-class ComplianceDatabaseTool(BaseTool):
+class ComplianceDatabaseTool:
     """Tool for searching compliance requirements in different jurisdictions."""
     name: ClassVar[str] = "compliance_database_tool"
-    description: ClassVar[str] = "Search for legal compliance requirements for specific terms or jurisdictions."
-    args_schema: Type[BaseModel] = ComplianceDatabaseInput
+    description: ClassVar[str] = "Search for legal compliance requirements for specific terms or jurisdictions. Returns the most relevant requirements ranked by relevance."
+    args_schema: ClassVar[type] = ComplianceDatabaseInput
     
-    def _run(self, query: str, jurisdiction: Optional[str] = None) -> str:
+    @traced("tool.compliance_database")
+    def _run(self, query: str, jurisdiction: Optional[str] = None, max_results: int = 5,
+             contract_id: Optional[str] = None) -> str:
         """Run the compliance database search tool."""
-        # In a real implementation, this would query a compliance database
-        compliance_data = {
-            "GDPR": {
-                "data_processing": "Requires explicit consent and right to be forgotten",
-                "data_breach": "Must be reported within 72 hours"
-            },
-            "CCPA": {
-                "data_collection": "Must disclose what personal information is collected",
-                "opt_out": "Must provide a way to opt-out of data sale"
-            }
+        knowledge_base = get_compliance_kb()
+        results = knowledge_base.search(query, jurisdiction=jurisdiction, top_k=max_results)
+        
+        response = {
+            "query": query,
+            "jurisdiction": jurisdiction,
+            "results": results
         }
+        if jurisdiction and knowledge_base.regulations_for(jurisdiction) is None:
+            response["message"] = f"Unknown jurisdiction '{jurisdiction}', searched all regulations"
+        if contract_id:
+            response["contract_clauses"] = [
+                {"clause": clause["key"], "score": clause["score"], "text": clause["text"]}
+                for clause in retrieve_clauses(query, contract_id, CONTRACT_CLAUSES_TOP_K)
+            ]
         
-        results = {}
-        if jurisdiction and jurisdiction.upper() in compliance_data:
-            results[jurisdiction.upper()] = compliance_data[jurisdiction.upper()]
-        else:
-            # Search all jurisdictions
-            for jur, reqs in compliance_data.items():
-                for term, desc in reqs.items():
-                    if query.lower() in term.lower() or query.lower() in desc.lower():
-                        if jur not in results:
-                            results[jur] = {}
-                        results[jur][term] = desc
+        return json.dumps(response)
+
+# Clauses of an indexed contract returned per tool call, and their maximum length
+CONTRACT_CLAUSES_TOP_K = 3
+CLAUSE_MAX_TOKENS = 400
+
+def retrieve_clauses(query: str, contract_id: str, top_k: int = CONTRACT_CLAUSES_TOP_K) -> list:
+    """
+    Find the clauses of an indexed contract most relevant to a query.
+    
+    Args:
+        query: Search text
+        contract_id: ID of the contract in the clause index
+        top_k: Maximum number of clauses
         
-        return json.dumps(results)
+    Returns:
+        list: Clause hits of utils.clause_index with their text shortened to CLAUSE_MAX_TOKENS
+    """
+    from utils.clause_index import get_clause_index
+    
+    hits = get_clause_index().search(query, top_k=top_k, contract_id=contract_id)
+    # Clauses sharing nothing with the query are not worth the prompt tokens
+    return [dict(hit, text=truncate_to_tokens(hit["text"].strip(), CLAUSE_MAX_TOKENS)) for hit in hits if hit["score"] > 0]
+
+# Risk keywords per category; a trailing "*" matches any word starting with the stem
+RISK_KEYWORDS = {
+    "financial": ["payment", "fee", "cost", "penalty", "compensation"],
+    "operational": ["service", "performance", "availability", "uptime"],
+    "security": ["data", "breach", "confidential*", "secure", "encrypt*"],
+    "legal": ["liability", "indemnif*", "warrant*", "comply", "jurisdict*"]
+}
 
 class RiskEvaluationInput(BaseModel):
     """Input for risk evaluation tool."""
     contract_clause: str = Field(..., description="The specific contract clause to evaluate for risks")
     risk_type: Optional[str] = Field(None, description="Specific type of risk to evaluate (e.g., financial, operational)")
+    contract_id: Optional[str] = Field(None, description="ID of an indexed contract; contract_clause is then a search query and the most relevant clauses of the contract are evaluated")
 
-class RiskEvaluationTool(BaseTool):
+class RiskEvaluationTool:
     """Tool for evaluating the risk level of specific contract clauses."""
     name: ClassVar[str] = "risk_evaluation_tool"
     description: ClassVar[str] = "Evaluates the risk level of specific contract clauses."
-    args_schema: Type[BaseModel] = RiskEvaluationInput
+    args_schema: ClassVar[type] = RiskEvaluationInput
+    
+    # Compiled once and shared by every instance
+    keyword_matcher: ClassVar[KeywordMatcher] = KeywordMatcher(RISK_KEYWORDS)
     
-    def _run(self, contract_clause: str, risk_type: Optional[str] = None) -> str:
+    @traced("tool.risk_evaluation")
+    def _run(self, contract_clause: str, risk_type: Optional[str] = None, contract_id: Optional[str] = None) -> str:
         """Run the risk evaluation tool."""
-        # In a real implementation, this would use more sophisticated analysis
-        risk_levels = {
-            "financial": "medium",
-            "operational": "low",
-            "security": "high",
-            "legal": "medium"
-        }
-        
+        if contract_id:
+            return json.dumps({
+                "query": contract_clause,
+                "contract_id": contract_id,
+                "clauses": [
+                    {"clause": clause["key"], "score": clause["score"], "text": clause["text"],
+                     **self._evaluate(clause["text"], risk_type)}
+                    for clause in retrieve_clauses(contract_clause, contract_id)
+                ]
+            })
+        return json.dumps(self._evaluate(contract_clause, risk_type))
+    
+    def _evaluate(self, contract_clause: str, risk_type: Optional[str] = None) -> dict:
+        """Score the risk categories of a clause by the risk keywords it contains."""
         analysis = {
             "clause_length": len(contract_clause),
             "identified_risks": {}
         }
         
-        # Simple risk evaluation based on keywords
-        risk_keywords = {
-            "financial": ["payment", "fee", "cost", "penalty", "compensation"],
-            "operational": ["service", "performance", "availability", "uptime"],
-            "security": ["data", "breach", "confidential", "secure", "encrypt"],
-            "legal": ["liability", "indemnify", "warrant", "comply", "jurisdict"]
-        }
+        # Scan the clause once for the keywords of every category
+        categories = [risk_type.lower()] if risk_type else None
+        category_hits = self.keyword_matcher.match(contract_clause, categories)
         
         # Evaluate risks
-        for risk_category, keywords in risk_keywords.items():
-            if risk_type and risk_category != risk_type.lower():
+        for risk_category in RISK_KEYWORDS:
+            if risk_category not in category_hits:
                 continue
+            hits = category_hits[risk_category]
+                
+            # The score counts distinct keywords, not repeated mentions
+            risk_score = len(hits["terms"])
+            level = "low"
+            if risk_score >= 3:
+                level = "high"
+            elif risk_score >= 2:
+                level = "medium"
                 
-            risk_score = 0
-            for keyword in keywords:
-                if keyword.lower() in contract_clause.lower():
-                    risk_score += 1
-            
-            if risk_score > 0:
-                level = "low"
-                if risk_score >= 3:
-                    level = "high"
-                elif risk_score >= 2:
-                    level = "medium"
-                    
-                analysis["identified_risks"][risk_category] = {
-                    "level": level,
-                    "score": risk_score,
-                    "keywords_found": [k for k in keywords if k.lower() in contract_clause.lower()]
-                }
+            analysis["identified_risks"][risk_category] = {
+                "level": level,
+                "score": risk_score,
+                "keywords_found": list(hits["terms"]),
+                "hits": hits["hits"],
+                "term_counts": hits["terms"],
+                "matches": hits["matches"]
+            }
         
-        return json.dumps(analysis) 
\ No newline at end of file
+        return analysis
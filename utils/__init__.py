@@ -1,16 +1,49 @@
 # Utility modules for IT Contract Analysis
-from utils.document_parser import parse_document, chunk_text
 # Removed import for contract_analysis_crew since it has been moved to root directory
+import importlib
 
-# Dynamic imports for OpenAI configuration
-try:
-    from utils.azure_openai_config import get_azure_openai_client, get_native_azure_client
-except ImportError:
-    from utils.openai_fallback import get_openai_client, get_native_openai_client
+# Re-exported names are imported on first access, so importing one utility module
+# does not load the document parsers or the OpenAI client libraries
+_LAZY_EXPORTS = {
+    'parse_document': 'utils.document_parser',
+    'parse_document_path': 'utils.document_parser',
+    'chunk_text': 'utils.document_parser',
+    'segment_contract': 'utils.segmenter',
+    'chunk_by_clauses': 'utils.segmenter',
+    'get_azure_openai_client': 'utils.azure_openai_config',
+    'get_native_azure_client': 'utils.azure_openai_config',
+    'get_openai_client': 'utils.openai_fallback',
+    'get_native_openai_client': 'utils.openai_fallback'
+}
+
+# Clients used in place of the Azure OpenAI clients when their dependencies are missing
+_OPENAI_FALLBACKS = {
+    'get_azure_openai_client': 'get_openai_client',
+    'get_native_azure_client': 'get_native_openai_client'
+}
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'utils' has no attribute '{name}'")
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        if name not in _OPENAI_FALLBACKS:
+            raise
+        module, name_in_module = importlib.import_module('utils.openai_fallback'), _OPENAI_FALLBACKS[name]
+    else:
+        name_in_module = name
+    value = getattr(module, name_in_module)
+    globals()[name] = value
+    return value
 
 __all__ = [
     'parse_document',
+    'parse_document_path',
     'chunk_text',
+    'segment_contract',
+    'chunk_by_clauses',
     'get_azure_openai_client',
     'get_native_azure_client'
-] 
\ No newline at end of file
+]
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Default location of the on-disk cache (relative to the working directory)
+DEFAULT_CACHE_PATH = os.path.join(".cache", "analysis_cache.sqlite3")
+
+# Default eviction limits; 0 disables the corresponding limit
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+# Per-clause review findings are kept apart from whole analyses, with room for
+# the clauses of many contract versions, so neither evicts the other
+DEFAULT_CLAUSE_CACHE_PATH = os.path.join(".cache", "clause_cache.sqlite3")
+DEFAULT_CLAUSE_MAX_ENTRIES = 50000
+DEFAULT_CLAUSE_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_CLAUSE_MAX_AGE_SECONDS = 180 * 24 * 60 * 60
+
+_WHITESPACE_RE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def normalize_contract_text(text: str) -> str:
+    """
+    Normalize contract text so that cosmetic differences do not change the cache key.
+
+    Line endings are unified, runs of spaces/tabs are collapsed, trailing
+    whitespace is removed from every line and long runs of blank lines are
+    reduced to a single blank line.
+
+    Args:
+        text: Raw contract text
+
+    Returns:
+        Normalized contract text
+    """
+    if not text:
+        return ""
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_WHITESPACE_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def compute_cache_key(contract_text: str, prompt_fingerprint: str = "", model_config: Optional[Dict[str, Any]] = None, **extra) -> str:
+    """
+    Compute a content-addressed cache key for an analysis.
+
+    Args:
+        contract_text: The text content of the contract
+        prompt_fingerprint: Fingerprint of the task prompt templates
+        model_config: LLM settings that influence the output (model, temperature, ...)
+        **extra: Additional options that change the shape of the result
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(normalize_contract_text(contract_text).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(prompt_fingerprint.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(json.dumps(model_config or {}, sort_keys=True, default=str).encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """
+    Persistent SQLite cache for structured contract analysis results.
+
+    Entries are evicted least-recently-used first once the cache exceeds
+    ``max_entries`` or ``max_bytes``, and expire after ``max_age_seconds``.
+    Hits and misses are counted per instance and persisted across processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _bump_stat(self, conn: sqlite3.Connection, name: str):
+        conn.execute(
+            "INSERT INTO cache_stats (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached analysis result.
+
+        Args:
+            key: Cache key from compute_cache_key
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.max_age_seconds and now - row[1] > self.max_age_seconds:
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                self._bump_stat(conn, "misses")
+                return None
+
+            conn.execute(
+                "UPDATE analysis_cache SET accessed_at = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (now, key)
+            )
+            self.hits += 1
+            self._bump_stat(conn, "hits")
+
+        return json.loads(row[0])
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """
+        Store an analysis result and apply the eviction policy.
+
+        Args:
+            key: Cache key from compute_cache_key
+            result: JSON-serializable analysis result
+        """
+        payload = json.dumps(result, default=str)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, result, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Remove expired entries, then least-recently-used entries over the limits."""
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.max_age_seconds,))
+
+        count, total_size = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+        ).fetchone()
+
+        if (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total_size <= self.max_bytes):
+            return
+
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM analysis_cache ORDER BY accessed_at ASC"):
+            if (not self.max_entries or count <= self.max_entries) and (not self.max_bytes or total_size <= self.max_bytes):
+                break
+            evicted.append((key,))
+            count -= 1
+            total_size -= size
+
+        conn.executemany("DELETE FROM analysis_cache WHERE key = ?", evicted)
+        for _ in evicted:
+            self._bump_stat(conn, "evictions")
+
+    def invalidate(self, key: str):
+        """Remove a single entry from the cache."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove all entries from the cache (statistics are kept)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM analysis_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache statistics.
+
+        Returns:
+            Dictionary with entry count, total size and hit/miss counters
+        """
+        with self._lock, self._connect() as conn:
+            count, total_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+            ).fetchone()
+            persisted = dict(conn.execute("SELECT name, value FROM cache_stats").fetchall())
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "size_bytes": total_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hits": persisted.get("hits", 0),
+            "total_misses": persisted.get("misses", 0),
+            "total_evictions": persisted.get("evictions", 0),
+        }
+
+
+_default_cache = None
+_default_clause_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def _cache_from_env(prefix: str, path: str, max_entries: int, max_bytes: int, max_age_seconds: float) -> AnalysisCache:
+    """Create a cache whose location and limits can be overridden by <prefix>_* environment variables."""
+    return AnalysisCache(
+        path=os.getenv(f"{prefix}_PATH", path),
+        max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", max_entries)),
+        max_bytes=int(float(os.getenv(f"{prefix}_MAX_MB", max_bytes / (1024 * 1024))) * 1024 * 1024),
+        max_age_seconds=float(os.getenv(f"{prefix}_MAX_AGE_DAYS", max_age_seconds / 86400)) * 86400,
+    )
+
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """
+    Return the process-wide analysis cache configured from environment variables.
+
+    Environment variables:
+        ANALYSIS_CACHE_ENABLED: Set to "0"/"false" to disable caching
+        ANALYSIS_CACHE_PATH: Location of the SQLite database
+        ANALYSIS_CACHE_MAX_ENTRIES: Maximum number of cached analyses
+        ANALYSIS_CACHE_MAX_MB: Maximum total size of cached results in megabytes
+        ANALYSIS_CACHE_MAX_AGE_DAYS: Maximum age of a cached analysis in days
+
+    Returns:
+        AnalysisCache instance, or None if caching is disabled
+    """
+    global _default_cache
+
+    if os.getenv("ANALYSIS_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = _cache_from_env(
+                "ANALYSIS_CACHE", DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_BYTES, DEFAULT_MAX_AGE_SECONDS
+            )
+        return _default_cache
+
+
+def get_clause_cache() -> Optional[AnalysisCache]:
+    """
+    Return the process-wide cache of per-clause review findings.
+
+    It is a separate database with its own limits, so reviewing many revised
+    contracts does not evict whole analyses and vice versa.
+
+    Environment variables:
+        ANALYSIS_CACHE_ENABLED: Set to "0"/"false" to disable caching
+        CLAUSE_CACHE_PATH: Location of the SQLite database
+        CLAUSE_CACHE_MAX_ENTRIES: Maximum number of cached clause findings
+        CLAUSE_CACHE_MAX_MB: Maximum total size of cached findings in megabytes
+        CLAUSE_CACHE_MAX_AGE_DAYS: Maximum age of cached findings in days
+
+    Returns:
+        AnalysisCache instance, or None if caching is disabled
+    """
+    global _default_clause_cache
+
+    if os.getenv("ANALYSIS_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_clause_cache is None:
+            _default_clause_cache = _cache_from_env(
+                "CLAUSE_CACHE", DEFAULT_CLAUSE_CACHE_PATH, DEFAULT_CLAUSE_MAX_ENTRIES,
+                DEFAULT_CLAUSE_MAX_BYTES, DEFAULT_CLAUSE_MAX_AGE_SECONDS
+            )
+        return _default_clause_cache
@@ -0,0 +1,317 @@
+import difflib
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.analysis_cache import normalize_contract_text
+from utils.extraction import merge_extractions
+from utils.segmenter import Clause, segment_contract
+
+# Clauses up to this size are reviewed and cached as one unit; larger sections
+# are split into their subclauses
+CLAUSE_UNIT_CHARS = 4000
+
+# Numbering at the start of a line, e.g. "5.2 ", "## 7. " or "A.1 ", which is
+# left out of clause fingerprints so renumbered clauses keep their findings
+_NUMBERING_RE = re.compile(r"(?m)^(#*[ \t]*)(?:\d+(?:\.\d+)*|[A-Z](?:\.\d+)+)\.?[ \t]+")
+
+# Scores of clauses without a numeric risk score, by risk level
+RISK_LEVEL_SCORES = {"High": 8, "Medium": 5, "Low": 2}
+
+# Number of highest clause risk scores averaged into the overall risk score
+CRITICAL_CLAUSES = 3
+
+
+@dataclass
+class ClauseUnit:
+    """
+    A clause of a contract version that is reviewed and cached on its own.
+
+    ``key`` identifies the clause across versions (its number or title);
+    ``fingerprint`` identifies its content regardless of whitespace and numbering.
+    """
+    key: str
+    title: str
+    start: int
+    end: int
+    text: str
+    fingerprint: str
+
+    def to_dict(self) -> dict:
+        """Convert the unit to a JSON-serializable dictionary without its text."""
+        return {"key": self.key, "title": self.title, "start": self.start, "end": self.end,
+                "fingerprint": self.fingerprint}
+
+
+def fingerprint_clause(text: str) -> str:
+    """
+    Fingerprint a clause's content.
+
+    Whitespace differences and clause numbering do not change the fingerprint.
+
+    Args:
+        text: Clause text
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    normalized = normalize_contract_text(_NUMBERING_RE.sub(r"\1", text))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _node_key(node: Clause) -> str:
+    return " ".join(part for part in (node.number, node.title) if part) or node.kind
+
+
+def split_clause_units(text: str, max_chars: int = CLAUSE_UNIT_CHARS, root: Optional[Clause] = None) -> List[ClauseUnit]:
+    """
+    Split a contract into the clause units that are reviewed and cached.
+
+    A heading or clause that fits max_chars is one unit. Larger sections are
+    split into their children; text before the first child (a section's
+    heading and introduction) becomes a unit of its own. Whitespace-only
+    spans are skipped.
+
+    Args:
+        text: The contract text
+        max_chars: Maximum size of a unit that is not split further
+        root: Clause tree of the text, segmented on demand if omitted
+
+    Returns:
+        Units in document order, with keys unique within the contract
+    """
+    root = root or segment_contract(text)
+    spans = []
+
+    def visit(node: Clause, key: str):
+        if node is not root and (node.end - node.start <= max_chars or not node.children):
+            spans.append((key, node.title, node.start, node.end))
+            return
+        cursor = node.start
+        for child in node.children:
+            if child.start > cursor:
+                label = "Preamble" if node is root else f"{key} (introduction)" if cursor == node.start else f"{key} (continued)"
+                spans.append((label, node.title, cursor, child.start))
+            visit(child, _node_key(child))
+            cursor = child.end
+        if node.end > cursor:
+            spans.append((f"{key} (continued)" if node is not root else "End", node.title, cursor, node.end))
+
+    visit(root, "")
+
+    units, seen = [], {}
+    for key, title, start, end in spans:
+        if not text[start:end].strip():
+            continue
+        # Repeated titles (e.g. several "Definitions" labels) get a running suffix
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key} [{seen[key]}]"
+        units.append(ClauseUnit(key, title, start, end, text[start:end], fingerprint_clause(text[start:end])))
+    return units
+
+
+def pack_units(units: Iterable[ClauseUnit], max_chars: int) -> List[List[ClauseUnit]]:
+    """
+    Pack consecutive units into batches of at most max_chars characters.
+
+    A unit longer than max_chars forms a batch of its own.
+
+    Args:
+        units: Units to pack
+        max_chars: Maximum batch size in characters
+
+    Returns:
+        List of batches
+    """
+    batches, size = [], 0
+    for unit in units:
+        length = len(unit.text)
+        if not batches or size + length > max_chars:
+            batches.append([])
+            size = 0
+        batches[-1].append(unit)
+        size += length
+    return batches
+
+
+def diff_clause_units(previous: List[ClauseUnit], current: List[ClauseUnit]) -> List[dict]:
+    """
+    Align the clauses of two contract versions.
+
+    Clauses with the same fingerprint are unchanged, even if they moved or
+    were renumbered. The remaining clauses are matched by key, then by title;
+    matched ones are changed, the others added or removed.
+
+    Args:
+        previous: Units of the previous version
+        current: Units of the current version
+
+    Returns:
+        One entry per clause with its "key", "title", "status" ("unchanged",
+        "changed", "added" or "removed"), "previous_key", the fingerprints and,
+        for changed clauses, a line "diff". Current clauses come first in
+        document order, followed by removed clauses.
+    """
+    unmatched = list(previous)
+
+    def take(predicate) -> Optional[ClauseUnit]:
+        for index, unit in enumerate(unmatched):
+            if predicate(unit):
+                return unmatched.pop(index)
+        return None
+
+    # Match identical content first, so a changed clause cannot claim an unchanged one
+    matches = {}
+    for unit in current:
+        matches[unit.key] = take(lambda old: old.fingerprint == unit.fingerprint)
+    for unit in current:
+        if matches[unit.key] is None:
+            matches[unit.key] = take(lambda old: old.key == unit.key) or \
+                take(lambda old: old.title and old.title.lower() == unit.title.lower())
+
+    changes = []
+    for unit in current:
+        old = matches[unit.key]
+        change = {
+            "key": unit.key,
+            "title": unit.title,
+            "status": "added" if old is None else "unchanged" if old.fingerprint == unit.fingerprint else "changed",
+            "previous_key": old.key if old is not None else None,
+            "previous_fingerprint": old.fingerprint if old is not None else None,
+            "fingerprint": unit.fingerprint
+        }
+        if change["status"] == "changed":
+            change["diff"] = [
+                line for line in difflib.unified_diff(old.text.splitlines(), unit.text.splitlines(), lineterm="", n=0)
+                if not line.startswith(("---", "+++", "@@"))
+            ]
+        changes.append(change)
+    for old in unmatched:
+        changes.append({
+            "key": old.key,
+            "title": old.title,
+            "status": "removed",
+            "previous_key": old.key,
+            "previous_fingerprint": old.fingerprint,
+            "fingerprint": None
+        })
+    return changes
+
+
+def clause_risk_score(findings: Optional[dict]) -> Optional[float]:
+    """
+    Risk score of a clause: its reviewed 1-10 score, or an estimate from its risk level.
+
+    Args:
+        findings: Clause review findings
+
+    Returns:
+        The score, or None for clauses without risk
+    """
+    if not findings:
+        return None
+    score = findings.get("risk_score")
+    if isinstance(score, (int, float)):
+        return float(score)
+    return RISK_LEVEL_SCORES.get(findings.get("risk_level"))
+
+
+def _issue_texts(findings: Optional[dict]) -> List[str]:
+    issues = (findings or {}).get("compliance_issues") or []
+    return [issue.get("issue") or str(issue) if isinstance(issue, dict) else str(issue) for issue in issues]
+
+
+def risk_redline(changes: List[dict], findings: Dict[str, dict]) -> List[dict]:
+    """
+    Describe how the risk of every changed, added or removed clause moved.
+
+    Args:
+        changes: Output of diff_clause_units
+        findings: Clause review findings keyed by clause fingerprint
+
+    Returns:
+        One entry per non-unchanged clause with the previous and current risk
+        level and score, the score delta, compliance issues that appeared or
+        were resolved, and the text diff of changed clauses
+    """
+    redline = []
+    for change in changes:
+        if change["status"] == "unchanged":
+            continue
+        old = findings.get(change["previous_fingerprint"]) if change["previous_fingerprint"] else None
+        new = findings.get(change["fingerprint"]) if change["fingerprint"] else None
+        old_score, new_score = clause_risk_score(old), clause_risk_score(new)
+        old_issues, new_issues = _issue_texts(old), _issue_texts(new)
+        entry = {
+            "clause": change["key"],
+            "status": change["status"],
+            "previous_risk_level": (old or {}).get("risk_level"),
+            "risk_level": (new or {}).get("risk_level"),
+            "previous_risk_score": old_score,
+            "risk_score": new_score,
+            "risk_delta": round((new_score or 0.0) - (old_score or 0.0), 1),
+            "new_issues": [issue for issue in new_issues if issue not in old_issues],
+            "resolved_issues": [issue for issue in old_issues if issue not in new_issues]
+        }
+        if "diff" in change:
+            entry["diff"] = change["diff"]
+        redline.append(entry)
+    # Largest risk increases first
+    redline.sort(key=lambda entry: -entry["risk_delta"])
+    return redline
+
+
+def merge_clause_findings(units: List[ClauseUnit], findings: Dict[str, dict], fields: Iterable[str] = ()) -> dict:
+    """
+    Assemble a contract report from the findings of its clauses.
+
+    The contract details merge the fields found in every clause (in document
+    order), compliance issues are grouped by area, and the overall risk score
+    is the mean of the CRITICAL_CLAUSES highest clause scores, since a
+    contract's risk is driven by its worst clauses.
+
+    Args:
+        units: Units of the contract version, in document order
+        findings: Clause review findings keyed by clause fingerprint
+        fields: Keys of the extraction schema
+
+    Returns:
+        dict: "contract_details", "compliance_analysis" and "risk_assessment" sections
+    """
+    reviewed = [(unit, findings[unit.fingerprint]) for unit in units if findings.get(unit.fingerprint)]
+
+    compliance = {}
+    for unit, clause_findings in reviewed:
+        for issue in clause_findings.get("compliance_issues") or []:
+            issue = dict(issue) if isinstance(issue, dict) else {"issue": str(issue)}
+            area = str(issue.pop("area", None) or "general")
+            compliance.setdefault(area, []).append({"clause": unit.key, **issue})
+
+    clause_risks = {}
+    for unit, clause_findings in reviewed:
+        score = clause_risk_score(clause_findings)
+        if score is None:
+            continue
+        clause_risks[unit.key] = {
+            "level": clause_findings.get("risk_level"),
+            "score": score,
+            "areas": clause_findings.get("risk_areas") or [],
+            "mitigation": clause_findings.get("mitigation")
+        }
+    critical = sorted(clause_risks, key=lambda key: -clause_risks[key]["score"])[:CRITICAL_CLAUSES]
+    scores = [clause_risks[key]["score"] for key in critical]
+
+    return {
+        "contract_details": merge_extractions((clause_findings.get("fields") for _, clause_findings in reviewed), fields),
+        "compliance_analysis": compliance,
+        "risk_assessment": {
+            "clauses": clause_risks,
+            "summary": {
+                "overall_risk_score": round(sum(scores) / len(scores), 1) if scores else None,
+                "critical_areas": critical,
+                "high_risk_clauses": sum(1 for risk in clause_risks.values() if risk["level"] == "High")
+            }
+        }
+    }
@@ -0,0 +1,509 @@
+import hashlib
+import io
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.clause_diff import split_clause_units
+from utils.compliance_kb import tokenize
+
+# Bump when the clause units, the hashing embedder or the on-disk layout change
+INDEX_VERSION = "1"
+
+# Default locations (relative to the working directory)
+DEFAULT_INDEX_PATH = os.path.join(".cache", "clause_index.npz")
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(".cache", "embeddings.sqlite3")
+
+# Dimensions of the local hashing embedder
+HASHING_DIMENSIONS = 4096
+
+# Sections up to this size are indexed as one clause; smaller units than the
+# review units of utils.clause_diff keep search hits (and prompts) focused
+INDEX_CLAUSE_CHARS = 1500
+
+# Texts sent to an embedding model per call
+EMBEDDING_BATCH_SIZE = 64
+
+# Default API embedding model
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Indexes with fewer clauses are searched exhaustively; larger ones are
+# partitioned by k-means into about sqrt(n) lists of which NPROBE are searched
+IVF_MIN_CLAUSES = 2000
+NPROBE = 8
+KMEANS_ITERATIONS = 10
+
+# The partitioning is retrained once the index grew by this factor since training
+RETRAIN_GROWTH = 2.0
+
+
+def _text_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+def _index_units(text: str) -> List[Dict[str, Any]]:
+    """
+    Split a contract into the clauses that are indexed.
+
+    Units that are a lone heading line (a section's introduction without
+    text) are joined with the clause after them, so they do not match
+    queries on their title alone.
+    """
+    clauses = []
+    pending = None
+    for unit in split_clause_units(text, INDEX_CLAUSE_CHARS):
+        clause = {"key": unit.key, "title": unit.title, "start": unit.start, "end": unit.end, "text": unit.text}
+        if pending is not None:
+            clause.update(start=pending["start"], text=pending["text"] + clause["text"])
+            pending = None
+        if "\n" not in unit.text.strip():
+            pending = clause
+        else:
+            clauses.append(clause)
+    if pending is not None:
+        clauses.append(pending)
+    return clauses
+
+
+class HashingEmbedder:
+    """
+    Local embedding model without downloads: stemmed words and word pairs are
+    hashed into a fixed number of dimensions with sublinear term frequencies.
+
+    Captures shared vocabulary rather than meaning, which suits the fixed
+    terminology of contracts; use a sentence-transformers or API model for
+    paraphrased queries.
+    """
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}-v{INDEX_VERSION}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            counts = {}
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dimensions] += sign * (1.0 + math.log(count))
+        return _normalize_rows(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model, e.g. all-MiniLM-L6-v2 (requires the sentence-transformers package)."""
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model)
+        self.dimensions = self._model.get_sentence_embedding_dimension()
+        self.name = f"st-{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize_rows(np.asarray(self._model.encode(texts), dtype=np.float32))
+
+
+class OpenAIEmbedder:
+    """OpenAI embedding API; combine with an EmbeddingCache so every text is only sent once."""
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL):
+        self.model = model
+        self.name = f"openai-{model}"
+        self.dimensions = None
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        from utils.openai_fallback import get_native_openai_client
+
+        response = get_native_openai_client().embeddings.create(model=self.model, input=texts)
+        matrix = _normalize_rows(np.asarray([item.embedding for item in response.data], dtype=np.float32))
+        self.dimensions = matrix.shape[1]
+        return matrix
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite store of embeddings keyed by model and text.
+
+    Safe to share between threads and processes; every operation uses its own
+    short-lived connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_EMBEDDING_CACHE_PATH):
+        """
+        Args:
+            path: Location of the SQLite database file
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors of the given keys; missing keys are left out."""
+        found = {}
+        with self._connect() as conn:
+            # Stay below SQLite's limit of host parameters per statement
+            for offset in range(0, len(keys), 500):
+                batch = keys[offset:offset + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def set_many(self, vectors: Dict[str, np.ndarray]):
+        """Store vectors by key."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+            )
+
+
+def embed_texts(texts: List[str], embedder, cache: Optional[EmbeddingCache] = None,
+                batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """
+    Embed texts in batches, embedding every distinct text only once.
+
+    Duplicate texts are embedded once, and texts already in the cache are not
+    embedded again, so re-indexing unchanged contracts costs no model calls.
+
+    Args:
+        texts: Texts to embed
+        embedder: Embedding model with a "name" and an "embed(texts)" method
+        cache: Optional persistent embedding cache
+        batch_size: Texts per embedding call
+
+    Returns:
+        Matrix with one L2-normalized row per text
+    """
+    keys = [_text_key(embedder.name, text) for text in texts]
+    unique = dict(zip(keys, texts))
+    vectors = cache.get_many(list(unique)) if cache is not None else {}
+
+    missing = [key for key in unique if key not in vectors]
+    for offset in range(0, len(missing), batch_size):
+        batch = missing[offset:offset + batch_size]
+        embedded = dict(zip(batch, embedder.embed([unique[key] for key in batch])))
+        vectors.update(embedded)
+        if cache is not None:
+            cache.set_many(embedded)
+
+    if not texts:
+        return np.zeros((0, embedder.dimensions or 0), dtype=np.float32)
+    return np.vstack([vectors[key] for key in keys]).astype(np.float32)
+
+
+def _kmeans(vectors: np.ndarray, clusters: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over normalized vectors; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)]
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class ClauseIndex:
+    """
+    Vector index over the clause segments of many contracts.
+
+    Clause embeddings are rows of a NumPy matrix. Small indexes are searched
+    exhaustively. Once the index holds IVF_MIN_CLAUSES clauses, it is
+    partitioned by k-means (an inverted file), and a query only scores the
+    clauses of the NPROBE partitions closest to it.
+    """
+
+    def __init__(self, embedder, cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            embedder: Embedding model with a "name", "dimensions" and an "embed(texts)" method
+            cache: Optional persistent embedding cache
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.clauses: List[Dict[str, Any]] = []
+        self.contracts: Dict[str, Dict[str, Any]] = {}
+        self.vectors = np.zeros((0, embedder.dimensions or 0), dtype=np.float32)
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def add_contract(self, contract_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Index the clauses of a contract, replacing a previously indexed version.
+
+        Args:
+            contract_id: Identifier of the contract
+            text: Contract text
+            metadata: Optional JSON-serializable information returned with search hits
+
+        Returns:
+            Number of clauses indexed; 0 if the same version is already indexed
+        """
+        units = _index_units(text)
+        fingerprints = [hashlib.sha256(unit["text"].encode("utf-8")).hexdigest() for unit in units]
+        with self._lock:
+            known = self.contracts.get(contract_id)
+            if known is not None and known["fingerprints"] == fingerprints and known["metadata"] == (metadata or {}):
+                return 0
+
+        vectors = embed_texts([unit["text"] for unit in units], self.embedder, self.cache)
+        with self._lock:
+            self.remove_contract(contract_id)
+            self.contracts[contract_id] = {"fingerprints": fingerprints, "metadata": metadata or {}}
+            self.clauses.extend(dict(unit, contract_id=contract_id) for unit in units)
+            self.vectors = vectors if not len(self.vectors) else np.vstack([self.vectors, vectors])
+            if self.centroids is not None and len(vectors):
+                self.assignments = np.concatenate([self.assignments, np.argmax(vectors @ self.centroids.T, axis=1)])
+            self._maybe_train()
+        return len(units)
+
+    def remove_contract(self, contract_id: str) -> bool:
+        """
+        Remove a contract's clauses from the index.
+
+        Args:
+            contract_id: Identifier of the contract
+
+        Returns:
+            True if the contract was indexed
+        """
+        with self._lock:
+            if self.contracts.pop(contract_id, None) is None:
+                return False
+            keep = np.array([clause["contract_id"] != contract_id for clause in self.clauses], dtype=bool)
+            self.clauses = [clause for clause, kept in zip(self.clauses, keep) if kept]
+            self.vectors = self.vectors[keep]
+            if self.centroids is not None:
+                self.assignments = self.assignments[keep]
+            return True
+
+    def _maybe_train(self):
+        """Partition the index once it is large enough, and again after it grew."""
+        if len(self.clauses) < IVF_MIN_CLAUSES:
+            self.centroids, self.assignments, self._trained_size = None, np.zeros(0, dtype=np.int32), 0
+        elif self.centroids is None or len(self.clauses) >= self._trained_size * RETRAIN_GROWTH:
+            self.train()
+
+    def train(self):
+        """Partition the clause vectors into about sqrt(n) k-means lists."""
+        with self._lock:
+            clusters = max(1, int(math.sqrt(len(self.vectors))))
+            self.centroids = _kmeans(self.vectors.copy(), clusters)
+            self.assignments = np.argmax(self.vectors @ self.centroids.T, axis=1).astype(np.int32)
+            self._trained_size = len(self.vectors)
+
+    def search(self, query: str, top_k: int = 5, contract_id: Optional[str] = None,
+               nprobe: int = NPROBE) -> List[Dict[str, Any]]:
+        """
+        Find the clauses most similar to a query.
+
+        Args:
+            query: Search text, e.g. "uncapped liability"
+            top_k: Maximum number of clauses to return
+            contract_id: Only search the clauses of this contract (exhaustively)
+            nprobe: Partitions searched in a partitioned index
+
+        Returns:
+            Clauses with their contract's metadata and cosine "score", best first
+        """
+        query_vector = embed_texts([query], self.embedder, self.cache)[0]
+        with self._lock:
+            if contract_id is not None:
+                rows = np.array([i for i, clause in enumerate(self.clauses) if clause["contract_id"] == contract_id],
+                                dtype=np.int64)
+            elif self.centroids is not None:
+                probes = np.argsort(-(self.centroids @ query_vector))[:nprobe]
+                rows = np.flatnonzero(np.isin(self.assignments, probes))
+            else:
+                rows = np.arange(len(self.clauses))
+            if not len(rows):
+                return []
+
+            scores = self.vectors[rows] @ query_vector
+            top = np.argpartition(-scores, min(top_k, len(rows)) - 1)[:top_k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                dict(self.clauses[rows[i]], score=round(float(scores[i]), 4),
+                     metadata=self.contracts[self.clauses[rows[i]]["contract_id"]]["metadata"])
+                for i in top
+            ]
+
+    def search_contracts(self, query: str, top_k: int = 10, clauses_per_contract: int = 1) -> List[Dict[str, Any]]:
+        """
+        Rank contracts by their clauses most similar to a query.
+
+        Args:
+            query: Search text, e.g. "uncapped liability"
+            top_k: Maximum number of contracts to return
+            clauses_per_contract: Matching clauses returned per contract
+
+        Returns:
+            {"contract_id", "metadata", "score", "clauses"} per contract, best first
+        """
+        hits = self.search(query, top_k=max(top_k * clauses_per_contract * 5, 50))
+        contracts = {}
+        for hit in hits:
+            entry = contracts.setdefault(hit["contract_id"], {
+                "contract_id": hit["contract_id"], "metadata": hit["metadata"], "score": hit["score"], "clauses": []
+            })
+            if len(entry["clauses"]) < clauses_per_contract:
+                entry["clauses"].append({key: hit[key] for key in ("key", "title", "score", "text")})
+        return sorted(contracts.values(), key=lambda entry: -entry["score"])[:top_k]
+
+    def save(self, path: str):
+        """
+        Write the index to a compressed NumPy archive atomically.
+
+        Args:
+            path: Destination file path
+        """
+        with self._lock:
+            state = json.dumps({
+                "version": INDEX_VERSION,
+                "embedder": self.embedder.name,
+                "clauses": self.clauses,
+                "contracts": self.contracts,
+                "trained_size": self._trained_size
+            }, separators=(",", ":"))
+            arrays = {"vectors": self.vectors, "assignments": self.assignments,
+                      "state": np.frombuffer(state.encode("utf-8"), dtype=np.uint8)}
+            if self.centroids is not None:
+                arrays["centroids"] = self.centroids
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer.getvalue())
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, embedder, cache: Optional[EmbeddingCache] = None) -> "ClauseIndex":
+        """
+        Read an index written by save().
+
+        Args:
+            path: Index file path
+            embedder: The embedding model the index was built with
+            cache: Optional persistent embedding cache
+
+        Returns:
+            ClauseIndex instance
+
+        Raises:
+            ValueError: If the index was built with another embedder or index version
+        """
+        with np.load(path) as arrays:
+            state = json.loads(arrays["state"].tobytes().decode("utf-8"))
+            if state["version"] != INDEX_VERSION or state["embedder"] != embedder.name:
+                raise ValueError(f"Index {path} was built with {state['embedder']} (version {state['version']})")
+            index = cls(embedder, cache)
+            index.vectors = arrays["vectors"]
+            index.assignments = arrays["assignments"]
+            index.centroids = arrays["centroids"] if "centroids" in arrays else None
+        index.clauses = state["clauses"]
+        index.contracts = state["contracts"]
+        index._trained_size = state["trained_size"]
+        return index
+
+
+def create_embedder(provider: Optional[str] = None, model: Optional[str] = None):
+    """
+    Create an embedding model.
+
+    Args:
+        provider: "hashing" (local, default), "sentence-transformers" (local model) or "openai" (API)
+        model: Model name for the sentence-transformers and OpenAI providers
+
+    Returns:
+        Embedder instance
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    provider = (provider or "hashing").lower()
+    if provider == "hashing":
+        return HashingEmbedder()
+    if provider == "sentence-transformers":
+        return SentenceTransformerEmbedder(model or "all-MiniLM-L6-v2")
+    if provider == "openai":
+        return OpenAIEmbedder(model or OPENAI_EMBEDDING_MODEL)
+    raise ValueError(f"Unknown embedding provider '{provider}'. Expected hashing, sentence-transformers or openai")
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_clause_index() -> ClauseIndex:
+    """
+    Return the process-wide clause index configured from environment variables.
+
+    The index is loaded from disk if it exists and was built with the
+    configured embedder; otherwise an empty index is created.
+
+    Environment variables:
+        CLAUSE_INDEX_PATH: Location of the index file
+        EMBEDDING_PROVIDER: hashing, sentence-transformers or openai
+        EMBEDDING_MODEL: Model of the sentence-transformers or OpenAI provider
+        EMBEDDING_CACHE_PATH: Location of the embedding cache
+
+    Returns:
+        ClauseIndex instance
+    """
+    global _default_index
+
+    with _default_index_lock:
+        if _default_index is None:
+            embedder = create_embedder(os.getenv("EMBEDDING_PROVIDER"), os.getenv("EMBEDDING_MODEL"))
+            cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_EMBEDDING_CACHE_PATH))
+            path = os.getenv("CLAUSE_INDEX_PATH", DEFAULT_INDEX_PATH)
+            try:
+                _default_index = ClauseIndex.load(path, embedder, cache)
+            except (OSError, ValueError, KeyError) as e:
+                if os.path.exists(path):
+                    print(f"Could not load clause index: {str(e)}")
+                _default_index = ClauseIndex(embedder, cache)
+        return _default_index
+
+
+def save_clause_index():
+    """Write the process-wide clause index to CLAUSE_INDEX_PATH."""
+    get_clause_index().save(os.getenv("CLAUSE_INDEX_PATH", DEFAULT_INDEX_PATH))
@@ -0,0 +1,366 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+# Bump when the tokenizer, scoring or on-disk index layout changes
+INDEX_VERSION = "1"
+
+# Regulation data files shipped with the application
+DEFAULT_REGULATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "regulations")
+
+# Default location of the cached index (relative to the working directory)
+DEFAULT_INDEX_DIR = os.path.join(".cache", "compliance")
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Title terms count more than terms in the requirement body and topics
+TITLE_WEIGHT = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    "a an and any are as at be by for from has have in is it its may must no not of on or such "
+    "that the their them they this to under where which with within".split()
+)
+
+
+def _stem(token: str) -> str:
+    """Strip common English plural and verb suffixes."""
+    if len(token) > 4:
+        if token.endswith("sses"):
+            return token[:-2]
+        if token.endswith("ies"):
+            return token[:-3] + "y"
+        if token.endswith("ing") and len(token) > 5:
+            return token[:-3]
+        if token.endswith("ed"):
+            return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into normalized index terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of lowercased, stemmed terms without stopwords
+    """
+    return [_stem(token) for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def load_regulations(directory: str = DEFAULT_REGULATIONS_DIR) -> List[Dict[str, Any]]:
+    """
+    Load the regulation data files of a directory.
+
+    Each file holds one regulation with its "regulation" code, "name",
+    "regions", "version" and a list of "requirements".
+
+    Args:
+        directory: Directory of regulation JSON files
+
+    Returns:
+        List of regulation dictionaries in file name order
+    """
+    regulations = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                regulations.append(json.load(f))
+    return regulations
+
+
+def _fingerprint(directory: str) -> str:
+    """Hash the content of every regulation file together with the index version."""
+    digest = hashlib.sha256(INDEX_VERSION.encode("utf-8"))
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            digest.update(filename.encode("utf-8"))
+            with open(os.path.join(directory, filename), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ComplianceKnowledgeBase:
+    """
+    Ranked search over regulatory requirements.
+
+    Requirements are indexed in an inverted index whose postings store
+    precomputed BM25 term weights in descending order, so a query usually
+    only reads the top of its terms' postings. The index is built once per
+    set of regulation files and cached on disk.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]], postings: Dict[str, List[List]],
+                 aliases: Dict[str, List[str]]):
+        """
+        Args:
+            documents: Indexed requirements, addressed by their position
+            postings: Mapping of term to [document, weight] pairs, highest weight first
+            aliases: Mapping of lowercased regulation codes and regions to regulation codes
+        """
+        self.documents = documents
+        self.postings = postings
+        self.aliases = aliases
+
+        self._by_regulation = {}
+        for doc_id, document in enumerate(documents):
+            self._by_regulation.setdefault(document["regulation"], []).append(doc_id)
+
+        # Position of every document in each term's postings
+        self._ranks = {
+            term: {doc_id: rank for rank, (doc_id, _) in enumerate(pairs)}
+            for term, pairs in postings.items()
+        }
+
+    @classmethod
+    def build(cls, regulations: List[Dict[str, Any]]) -> "ComplianceKnowledgeBase":
+        """
+        Build the index from regulation data.
+
+        Args:
+            regulations: Regulations as returned by load_regulations
+
+        Returns:
+            ComplianceKnowledgeBase instance
+        """
+        documents = []
+        term_frequencies = []
+        aliases = {}
+
+        for regulation in regulations:
+            code = regulation["regulation"]
+            for alias in [code] + regulation.get("regions", []):
+                aliases.setdefault(alias.lower(), [])
+                if code not in aliases[alias.lower()]:
+                    aliases[alias.lower()].append(code)
+
+            for requirement in regulation["requirements"]:
+                documents.append({
+                    "id": requirement["id"],
+                    "regulation": code,
+                    "version": regulation.get("version"),
+                    "reference": requirement.get("reference"),
+                    "title": requirement["title"],
+                    "text": requirement["text"]
+                })
+
+                frequencies = {}
+                body = " ".join([requirement["text"]] + requirement.get("topics", []))
+                for term in tokenize(body):
+                    frequencies[term] = frequencies.get(term, 0) + 1
+                for term in tokenize(requirement["title"]):
+                    frequencies[term] = frequencies.get(term, 0) + TITLE_WEIGHT
+                term_frequencies.append(frequencies)
+
+        document_count = len(documents)
+        lengths = [sum(frequencies.values()) for frequencies in term_frequencies]
+        average_length = sum(lengths) / document_count if document_count else 0.0
+
+        document_frequencies = {}
+        for frequencies in term_frequencies:
+            for term in frequencies:
+                document_frequencies[term] = document_frequencies.get(term, 0) + 1
+
+        postings = {}
+        for doc_id, frequencies in enumerate(term_frequencies):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+            for term, frequency in frequencies.items():
+                df = document_frequencies[term]
+                idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+                weight = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                postings.setdefault(term, []).append([doc_id, round(weight, 6)])
+
+        # Impact order: highest-weighted documents first
+        for pairs in postings.values():
+            pairs.sort(key=lambda pair: (-pair[1], pair[0]))
+
+        return cls(documents, postings, aliases)
+
+    def _max_weight(self, term: str) -> float:
+        postings = self.postings.get(term)
+        return postings[0][1] if postings else 0.0
+
+    def regulations_for(self, jurisdiction: str) -> Optional[List[str]]:
+        """
+        Resolve a jurisdiction to regulation codes.
+
+        Args:
+            jurisdiction: Regulation code ("GDPR") or region ("EU", "California")
+
+        Returns:
+            List of regulation codes, or None if the jurisdiction is unknown
+        """
+        return self.aliases.get(jurisdiction.strip().lower())
+
+    def search(self, query: str, jurisdiction: Optional[str] = None, top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the requirements most relevant to a query.
+
+        Args:
+            query: Free-text compliance question or term
+            jurisdiction: Optional regulation code or region to restrict results to
+            top_k: Maximum number of results
+
+        Returns:
+            List of requirements with their "score", best match first. Without
+            query terms, the requirements of the jurisdiction in document order.
+        """
+        # An unknown jurisdiction searches every regulation
+        allowed = None
+        codes = self.regulations_for(jurisdiction) if jurisdiction else None
+        if codes is not None:
+            allowed = {doc_id for code in codes for doc_id in self._by_regulation[code]}
+
+        query_terms = {}
+        for term in tokenize(query or ""):
+            query_terms[term] = query_terms.get(term, 0) + 1
+
+        if not query_terms:
+            return [dict(self.documents[doc_id], score=0.0) for doc_id in sorted(allowed or ())[:top_k]]
+
+        # Impact-ordered, term-at-a-time evaluation: terms are visited by their
+        # best weight and each postings list is cut off once a document not seen
+        # so far could no longer reach the k-th best score
+        terms = sorted(query_terms, key=lambda term: -self._max_weight(term) * query_terms[term])
+        remaining = sum(self._max_weight(term) * query_terms[term] for term in terms)
+
+        scores = {}
+        cutoffs = {}
+        threshold = 0.0
+        for term in terms:
+            count = query_terms[term]
+            remaining -= self._max_weight(term) * count
+            # The threshold is refreshed at geometrically spaced positions
+            next_refresh = top_k
+            for position, (doc_id, weight) in enumerate(self.postings.get(term, ())):
+                if doc_id in scores:
+                    scores[doc_id] += weight * count
+                    continue
+                if position >= next_refresh:
+                    if len(scores) >= top_k:
+                        threshold = heapq.nlargest(top_k, scores.values())[-1]
+                    next_refresh = 2 * position
+                if weight * count + remaining < threshold:
+                    cutoffs[term] = position
+                    break
+                if allowed is None or doc_id in allowed:
+                    scores[doc_id] = weight * count
+
+        # Add the contributions of cut-off postings to the documents that were kept
+        for term, cutoff in cutoffs.items():
+            postings, ranks, count = self.postings[term], self._ranks[term], query_terms[term]
+            for doc_id in scores:
+                rank = ranks.get(doc_id)
+                if rank is not None and rank >= cutoff:
+                    scores[doc_id] += postings[rank][1] * count
+
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+        return [dict(self.documents[doc_id], score=round(score, 4)) for doc_id, score in ranked]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the index to a JSON-serializable dictionary."""
+        return {"documents": self.documents, "postings": self.postings, "aliases": self.aliases}
+
+    def save(self, path: str):
+        """
+        Write the index to a compressed file atomically.
+
+        Args:
+            path: Destination file path
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        payload = zlib.compress(json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8"), 6)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "ComplianceKnowledgeBase":
+        """
+        Read an index written by save().
+
+        Args:
+            path: Index file path
+
+        Returns:
+            ComplianceKnowledgeBase instance
+        """
+        with open(path, "rb") as f:
+            data = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        return cls(data["documents"], data["postings"], data["aliases"])
+
+
+def load_knowledge_base(regulations_dir: str = DEFAULT_REGULATIONS_DIR,
+                        index_dir: Optional[str] = DEFAULT_INDEX_DIR) -> ComplianceKnowledgeBase:
+    """
+    Load the knowledge base from the on-disk index, building it if the regulation files changed.
+
+    Args:
+        regulations_dir: Directory of regulation JSON files
+        index_dir: Directory the index is cached in, or None to always build in memory
+
+    Returns:
+        ComplianceKnowledgeBase instance
+    """
+    if index_dir is None:
+        return ComplianceKnowledgeBase.build(load_regulations(regulations_dir))
+
+    index_path = os.path.join(index_dir, f"index-{_fingerprint(regulations_dir)[:16]}.json.z")
+    try:
+        return ComplianceKnowledgeBase.load(index_path)
+    except (OSError, ValueError, KeyError, zlib.error):
+        pass
+
+    knowledge_base = ComplianceKnowledgeBase.build(load_regulations(regulations_dir))
+    try:
+        knowledge_base.save(index_path)
+    except OSError as e:
+        print(f"Could not cache compliance index: {str(e)}")
+    return knowledge_base
+
+
+_default_knowledge_base = None
+_default_knowledge_base_lock = threading.Lock()
+
+
+def get_compliance_kb() -> ComplianceKnowledgeBase:
+    """
+    Return the process-wide compliance knowledge base configured from environment variables.
+
+    Environment variables:
+        COMPLIANCE_DATA_DIR: Directory of regulation JSON files
+        COMPLIANCE_INDEX_DIR: Directory the index is cached in
+
+    Returns:
+        ComplianceKnowledgeBase instance
+    """
+    global _default_knowledge_base
+
+    with _default_knowledge_base_lock:
+        if _default_knowledge_base is None:
+            _default_knowledge_base = load_knowledge_base(
+                os.getenv("COMPLIANCE_DATA_DIR", DEFAULT_REGULATIONS_DIR),
+                os.getenv("COMPLIANCE_INDEX_DIR", DEFAULT_INDEX_DIR)
+            )
+        return _default_knowledge_base
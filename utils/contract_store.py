@@ -0,0 +1,635 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic.v1 import ValidationError
+
+from schemas import RISK_LEVELS, Risk, RiskSummary
+from utils.analysis_cache import compute_cache_key, normalize_contract_text
+from utils.clause_diff import split_clause_units
+
+# Default location of the store (relative to the working directory)
+DEFAULT_STORE_PATH = os.path.join(".cache", "contract_store.sqlite3")
+
+# Lowest overall risk score of each risk level, for analyses that only report a score
+RISK_SCORE_LEVELS = ((7.0, "High"), (4.0, "Medium"), (0.0, "Low"))
+
+# Sort orders accepted by ContractStore.query; undated and unscored contracts sort last
+ORDER_BY = {
+    "risk_score": "v.risk_score IS NULL, v.risk_score DESC",
+    "end_date": "v.end_date IS NULL, v.end_date",
+    "effective_date": "v.effective_date IS NULL, v.effective_date DESC",
+    "analyzed_at": "v.analyzed_at DESC",
+    "contract_id": "v.contract_id, v.version"
+}
+
+# Contracts ending within this many days are reported as expiring
+EXPIRING_DAYS = 90
+
+_MONTH = r"(?:January|February|March|April|May|June|July|August|September|October|November|December)"
+_DATE_RE = re.compile(
+    rf"{_MONTH}\s+\d{{1,2}},\s*\d{{4}}|\d{{1,2}}\s+{_MONTH}\s+\d{{4}}|\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}/\d{{1,2}}/\d{{4}}",
+    re.IGNORECASE
+)
+_DATE_FORMATS = ("%B %d, %Y", "%B %d,%Y", "%d %B %Y", "%Y-%m-%d", "%m/%d/%Y")
+
+# Keys of the extracted dates that name the start and the end of a contract
+_START_DATE_KEYS = ("effective", "start", "commence")
+_END_DATE_KEYS = ("end", "expir", "terminat")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS contract_versions (
+        id INTEGER PRIMARY KEY,
+        contract_id TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        latest INTEGER NOT NULL DEFAULT 1,
+        text_hash TEXT NOT NULL,
+        text TEXT NOT NULL,
+        contract_type TEXT COLLATE NOCASE,
+        effective_date TEXT,
+        end_date TEXT,
+        governing_law TEXT,
+        risk_level TEXT,
+        risk_score REAL,
+        compliance_issues INTEGER NOT NULL DEFAULT 0,
+        results TEXT NOT NULL,
+        analyzed_at REAL NOT NULL,
+        UNIQUE (contract_id, version)
+    );
+    CREATE INDEX IF NOT EXISTS idx_versions_type ON contract_versions (latest, contract_type);
+    CREATE INDEX IF NOT EXISTS idx_versions_risk ON contract_versions (latest, risk_level, risk_score);
+    CREATE INDEX IF NOT EXISTS idx_versions_score ON contract_versions (latest, risk_score);
+    CREATE INDEX IF NOT EXISTS idx_versions_effective ON contract_versions (latest, effective_date);
+    CREATE INDEX IF NOT EXISTS idx_versions_end ON contract_versions (latest, end_date);
+    CREATE TABLE IF NOT EXISTS parties (
+        version_id INTEGER NOT NULL,
+        name TEXT NOT NULL COLLATE NOCASE,
+        role TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_parties_name ON parties (name);
+    CREATE INDEX IF NOT EXISTS idx_parties_version ON parties (version_id);
+    CREATE TABLE IF NOT EXISTS clauses (
+        id INTEGER PRIMARY KEY,
+        version_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        title TEXT,
+        start INTEGER NOT NULL,
+        end INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        risk_level TEXT,
+        risk_score REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_clauses_version ON clauses (version_id);
+    CREATE INDEX IF NOT EXISTS idx_clauses_fingerprint ON clauses (fingerprint);
+    CREATE VIRTUAL TABLE IF NOT EXISTS clause_fts USING fts5 (text, tokenize = 'porter unicode61');
+    CREATE TABLE IF NOT EXISTS compliance_findings (
+        version_id INTEGER NOT NULL,
+        area TEXT NOT NULL COLLATE NOCASE,
+        clause TEXT,
+        issue TEXT,
+        risk TEXT,
+        recommendation TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_findings_area ON compliance_findings (area);
+    CREATE INDEX IF NOT EXISTS idx_findings_version ON compliance_findings (version_id);
+    CREATE TABLE IF NOT EXISTS risks (
+        version_id INTEGER NOT NULL,
+        area TEXT NOT NULL,
+        level TEXT,
+        score REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_risks_level ON risks (level);
+    CREATE INDEX IF NOT EXISTS idx_risks_version ON risks (version_id);
+"""
+
+# Tables holding the rows derived from one analyzed version
+_VERSION_TABLES = ("parties", "clauses", "compliance_findings", "risks")
+
+
+def _text(value: Any) -> Optional[str]:
+    """Flatten a text, list or object written by an agent into one line of text."""
+    if value is None or value == "" or value == [] or value == {}:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {_text(item)}" for key, item in value.items() if _text(item)) or None
+    if isinstance(value, list):
+        return "; ".join(text for text in map(_text, value) if text) or None
+    return str(value)
+
+
+def parse_date(value: Any) -> Optional[str]:
+    """
+    Find the first date in a text written by an agent or the rule extractor.
+
+    Args:
+        value: Text such as "January 1, 2024 (the Effective Date)"
+
+    Returns:
+        The date in ISO format (YYYY-MM-DD), or None
+    """
+    if not isinstance(value, str):
+        return None
+    match = _DATE_RE.search(value)
+    if not match:
+        return None
+    text = " ".join(match.group().split()).title()
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _contract_dates(dates: Any) -> Tuple[Optional[str], Optional[str]]:
+    """The effective and end date of extracted contract dates, in ISO format."""
+    effective = end = None
+    if isinstance(dates, dict):
+        for key, value in dates.items():
+            key = key.lower()
+            if effective is None and any(name in key for name in _START_DATE_KEYS):
+                effective = parse_date(_text(value))
+            elif end is None and any(name in key for name in _END_DATE_KEYS):
+                end = parse_date(_text(value))
+    else:
+        # Free text: the first date is the start, a later one the end
+        found = [parse_date(match.group()) for match in _DATE_RE.finditer(_text(dates) or "")]
+        effective = found[0] if found else None
+        end = found[1] if len(found) > 1 else None
+    return effective, end
+
+
+def _parties(parties: Any) -> List[Tuple[str, Optional[str]]]:
+    """Names and roles of the extracted parties."""
+    if isinstance(parties, str):
+        parties = parties.split(";")
+    found = []
+    for party in parties if isinstance(parties, list) else []:
+        if isinstance(party, dict):
+            name, role = _text(party.get("name") or party.get("party")), _text(party.get("role"))
+        else:
+            name, role = _text(party), None
+        if name:
+            found.append((name, role))
+    return found
+
+
+def _risk_level(value: Any) -> Optional[str]:
+    try:
+        return Risk.parse_obj({"level": value}).level if isinstance(value, str) else None
+    except ValidationError:
+        return None
+
+
+def _risk_score(value: Any) -> Optional[float]:
+    try:
+        return RiskSummary.parse_obj({"overall_risk_score": value}).overall_risk_score
+    except ValidationError:
+        return None
+
+
+def score_to_level(score: Optional[float]) -> Optional[str]:
+    """Risk level of an overall 1-10 risk score."""
+    if score is None:
+        return None
+    return next(level for threshold, level in RISK_SCORE_LEVELS if score >= threshold)
+
+
+def _risks(risk_assessment: Any) -> List[Tuple[str, Optional[str], Optional[float]]]:
+    """Areas of a risk assessment with their level and score."""
+    if not isinstance(risk_assessment, dict):
+        return []
+    risks = []
+    for area, value in risk_assessment.items():
+        if area == "clauses" and isinstance(value, dict):
+            # Clause-by-clause analyses (analyze_revision) score every clause
+            risks.extend((key, _risk_level(risk.get("level")), _risk_score(risk.get("score")))
+                         for key, risk in value.items() if isinstance(risk, dict))
+        elif area not in ("summary", "overall_risk_score") and isinstance(value, dict):
+            risks.append((area, _risk_level(value.get("level")), _risk_score(value.get("score"))))
+    return risks
+
+
+def _overall_risk(risk_assessment: Any, risks: list) -> Tuple[Optional[str], Optional[float]]:
+    """The overall risk level and score of a risk assessment."""
+    if not isinstance(risk_assessment, dict):
+        return None, None
+    summary = risk_assessment.get("summary") if isinstance(risk_assessment.get("summary"), dict) else {}
+    score = _risk_score(summary.get("overall_risk_score", risk_assessment.get("overall_risk_score")))
+    level = next((_risk_level(value) for key, value in summary.items() if "level" in key.lower()), None)
+    if level is None and score is None:
+        # Without an overall assessment the contract is as risky as its riskiest area
+        levels = [level for _, level, _ in risks if level]
+        level = next((candidate for candidate in RISK_LEVELS if candidate in levels), None)
+    return level or score_to_level(score), score
+
+
+def _compliance_findings(compliance_analysis: Any) -> List[Dict[str, Optional[str]]]:
+    """Compliance issues of an analysis, one row per issue."""
+    if not isinstance(compliance_analysis, dict):
+        return []
+    findings = []
+    for area, value in compliance_analysis.items():
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, dict):
+                findings.append({
+                    "area": area,
+                    "clause": _text(item.get("clause")),
+                    "issue": _text(item.get("issue")) or json.dumps(item, default=str),
+                    "risk": _text(item.get("risk")),
+                    "recommendation": _text(item.get("recommendation"))
+                })
+            elif isinstance(item, str) and item.strip():
+                findings.append({"area": area, "clause": None, "issue": item.strip(), "risk": None, "recommendation": None})
+    return findings
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching clauses that contain every word."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class ContractStore:
+    """
+    Persistent SQLite store of analyzed contracts for portfolio reporting.
+
+    Every analysis is stored as a version of its contract with the parsed text,
+    the clause segments (searchable through an FTS5 index), the extracted
+    fields, the compliance findings and the risk scores. Contract type, dates,
+    parties and risk level are stored in indexed columns, so portfolio queries
+    over thousands of contracts read no analysis results. Re-analyzing the
+    same text replaces its version; a changed text adds a new version.
+
+    Safe to share between threads and processes; every operation uses its own
+    short-lived connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        """
+        Args:
+            path: Location of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _delete_rows(self, conn: sqlite3.Connection, version_ids: List[int]):
+        """Remove the derived rows of versions, including their full-text entries."""
+        marks = ",".join("?" * len(version_ids))
+        conn.execute(f"DELETE FROM clause_fts WHERE rowid IN (SELECT id FROM clauses WHERE version_id IN ({marks}))",
+                     version_ids)
+        for table in _VERSION_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE version_id IN ({marks})", version_ids)
+
+    def save(self, contract_text: str, results: Dict[str, Any], contract_id: str = None) -> Dict[str, Any]:
+        """
+        Store the analysis of a contract.
+
+        Args:
+            contract_text: The parsed text of the contract
+            results: Analysis results with the "contract_details", "compliance_analysis"
+                and "risk_assessment" sections; run metadata ("execution", "cache",
+                "store") is not stored
+            contract_id: ID of the contract, shared by its versions; derived from the
+                normalized text if omitted
+
+        Returns:
+            dict: The "contract_id" and "version" the analysis was stored as
+        """
+        contract_id = contract_id or compute_cache_key(contract_text, variant="contract")[:16]
+        text_hash = hashlib.sha256(normalize_contract_text(contract_text).encode("utf-8")).hexdigest()
+        results = {key: value for key, value in results.items() if key not in ("execution", "cache", "store")}
+
+        details = results.get("contract_details") if isinstance(results.get("contract_details"), dict) else {}
+        effective_date, end_date = _contract_dates(details.get("dates"))
+        risk_assessment = results.get("risk_assessment")
+        risks = _risks(risk_assessment)
+        risk_level, risk_score = _overall_risk(risk_assessment, risks)
+        findings = _compliance_findings(results.get("compliance_analysis"))
+        contract_type = details.get("contract_type")
+        if isinstance(contract_type, list):
+            contract_type = contract_type[0] if contract_type else None
+        governing_law = details.get("governing_law")
+        if isinstance(governing_law, dict):
+            governing_law = governing_law.get("law") or governing_law
+        clause_risks = risk_assessment.get("clauses") if isinstance(risk_assessment, dict) else None
+        clause_risks = clause_risks if isinstance(clause_risks, dict) else {}
+        # Stored as the review units of analyze_revision, so its clause risks map onto them
+        units = split_clause_units(contract_text)
+
+        row = (
+            text_hash, contract_text, _text(contract_type), effective_date, end_date,
+            _text(governing_law), risk_level, risk_score, len(findings),
+            json.dumps(results, default=str), time.time()
+        )
+        with self._lock, self._connect() as conn:
+            # Take the write lock before reading so two processes cannot add the same version
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute(
+                "SELECT id, version, text_hash FROM contract_versions WHERE contract_id = ? AND latest = 1",
+                (contract_id,)
+            ).fetchone()
+            if latest is not None and latest["text_hash"] == text_hash:
+                # A re-analysis of the same text replaces the version's findings
+                version_id, version = latest["id"], latest["version"]
+                self._delete_rows(conn, [version_id])
+                conn.execute(
+                    "UPDATE contract_versions SET text_hash = ?, text = ?, contract_type = ?, effective_date = ?, "
+                    "end_date = ?, governing_law = ?, risk_level = ?, risk_score = ?, compliance_issues = ?, "
+                    "results = ?, analyzed_at = ? WHERE id = ?",
+                    row + (version_id,)
+                )
+            else:
+                version = latest["version"] + 1 if latest is not None else 1
+                conn.execute("UPDATE contract_versions SET latest = 0 WHERE contract_id = ?", (contract_id,))
+                version_id = conn.execute(
+                    "INSERT INTO contract_versions (contract_id, version, text_hash, text, contract_type, "
+                    "effective_date, end_date, governing_law, risk_level, risk_score, compliance_issues, results, "
+                    "analyzed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (contract_id, version) + row
+                ).lastrowid
+
+            conn.executemany(
+                "INSERT INTO parties (version_id, name, role) VALUES (?, ?, ?)",
+                [(version_id, name, role) for name, role in _parties(details.get("parties"))]
+            )
+            for position, unit in enumerate(units):
+                clause_risk = clause_risks.get(unit.key) if isinstance(clause_risks.get(unit.key), dict) else {}
+                clause_id = conn.execute(
+                    "INSERT INTO clauses (version_id, position, key, title, start, end, fingerprint, risk_level, "
+                    "risk_score) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (version_id, position, unit.key, unit.title, unit.start, unit.end, unit.fingerprint,
+                     _risk_level(clause_risk.get("level")), _risk_score(clause_risk.get("score")))
+                ).lastrowid
+                conn.execute("INSERT INTO clause_fts (rowid, text) VALUES (?, ?)", (clause_id, unit.text))
+            conn.executemany(
+                "INSERT INTO compliance_findings (version_id, area, clause, issue, risk, recommendation) "
+                "VALUES (:version_id, :area, :clause, :issue, :risk, :recommendation)",
+                [{"version_id": version_id, **finding} for finding in findings]
+            )
+            conn.executemany(
+                "INSERT INTO risks (version_id, area, level, score) VALUES (?, ?, ?, ?)",
+                [(version_id, area, level, score) for area, level, score in risks]
+            )
+        return {"contract_id": contract_id, "version": version}
+
+    def query(self, party: str = None, contract_type: str = None, risk_level: str = None,
+              min_risk_score: float = None, effective_from: str = None, effective_to: str = None,
+              ends_from: str = None, ends_to: str = None, compliance_area: str = None, text: str = None,
+              all_versions: bool = False, order_by: str = "risk_score", limit: int = 100,
+              offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Find analyzed contracts; all filters are optional and combined.
+
+        Args:
+            party: Start of a party name, case-insensitive (e.g. "Microsoft")
+            contract_type: Contract type, case-insensitive
+            risk_level: One of RISK_LEVELS
+            min_risk_score: Lowest overall risk score
+            effective_from: Earliest effective date (YYYY-MM-DD)
+            effective_to: Latest effective date (YYYY-MM-DD)
+            ends_from: Earliest end date (YYYY-MM-DD)
+            ends_to: Latest end date (YYYY-MM-DD)
+            compliance_area: Only contracts with findings in this compliance area
+            text: Words that must all appear in one clause (full-text search)
+            all_versions: Include superseded versions, not only the latest version
+            order_by: One of ORDER_BY
+            limit: Maximum number of contracts
+            offset: Number of contracts to skip, for paging
+
+        Returns:
+            One summary per contract version with its ID, version, contract type,
+            dates, parties, risk level and score and number of compliance issues
+        """
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unknown sort order '{order_by}'. Expected one of: {', '.join(ORDER_BY)}")
+
+        conditions, params = ([] if all_versions else ["v.latest = 1"]), []
+        for condition, value in (
+            ("v.contract_type = ?", contract_type),
+            ("v.risk_level = ?", risk_level),
+            ("v.risk_score >= ?", min_risk_score),
+            ("v.effective_date >= ?", effective_from),
+            ("v.effective_date <= ?", effective_to),
+            ("v.end_date >= ?", ends_from),
+            ("v.end_date <= ?", ends_to),
+            ("v.id IN (SELECT version_id FROM compliance_findings WHERE area = ?)", compliance_area)
+        ):
+            if value is not None and value != "":
+                conditions.append(condition)
+                params.append(value)
+        if party:
+            # A prefix pattern on a NOCASE column can use the index
+            conditions.append("v.id IN (SELECT version_id FROM parties WHERE name LIKE ? ESCAPE '\\')")
+            params.append(re.sub(r"([%_\\])", r"\\\1", party.strip()) + "%")
+        if text and text.strip():
+            conditions.append(
+                "v.id IN (SELECT c.version_id FROM clause_fts JOIN clauses c ON c.id = clause_fts.rowid "
+                "WHERE clause_fts MATCH ?)"
+            )
+            params.append(_fts_query(text))
+
+        sql = (
+            "SELECT v.contract_id, v.version, v.latest, v.contract_type, v.effective_date, v.end_date, "
+            "v.governing_law, v.risk_level, v.risk_score, v.compliance_issues, v.analyzed_at, "
+            "(SELECT json_group_array(name) FROM parties p WHERE p.version_id = v.id) AS parties "
+            "FROM contract_versions v"
+            + (f" WHERE {' AND '.join(conditions)}" if conditions else "")
+            + f" ORDER BY {ORDER_BY[order_by]} LIMIT ? OFFSET ?"
+        )
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(sql, params + [limit, offset]).fetchall()
+        return [{**dict(row), "latest": bool(row["latest"]), "parties": json.loads(row["parties"])} for row in rows]
+
+    def search_clauses(self, text: str, contract_id: str = None, all_versions: bool = False,
+                       limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Full-text search over the clauses of the stored contracts.
+
+        Args:
+            text: Words that must all appear in a clause; matched on their stems
+            contract_id: Only search this contract
+            all_versions: Include clauses of superseded versions
+            limit: Maximum number of clauses
+
+        Returns:
+            Matching clauses, best first, with their contract, version, key, title,
+            risk level and score and a highlighted "snippet"
+        """
+        if not text or not text.strip():
+            return []
+        conditions, params = ["clause_fts MATCH ?"], [_fts_query(text)]
+        if not all_versions:
+            conditions.append("v.latest = 1")
+        if contract_id:
+            conditions.append("v.contract_id = ?")
+            params.append(contract_id)
+        sql = (
+            "SELECT v.contract_id, v.version, c.key, c.title, c.start, c.end, c.risk_level, c.risk_score, "
+            "snippet(clause_fts, 0, '**', '**', ' … ', 24) AS snippet "
+            "FROM clause_fts JOIN clauses c ON c.id = clause_fts.rowid JOIN contract_versions v ON v.id = c.version_id "
+            f"WHERE {' AND '.join(conditions)} ORDER BY bm25(clause_fts) LIMIT ?"
+        )
+        with self._lock, self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params + [limit]).fetchall()]
+
+    def get(self, contract_id: str, version: int = None, include_text: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Look up a stored analysis.
+
+        Args:
+            contract_id: ID of the contract
+            version: Version number; the latest version if omitted
+            include_text: Whether to include the contract text
+
+        Returns:
+            The version's summary with its "results", "parties", "clauses",
+            "compliance_findings" and "risks", or None if it does not exist
+        """
+        with self._lock, self._connect() as conn:
+            if version is None:
+                row = conn.execute("SELECT * FROM contract_versions WHERE contract_id = ? AND latest = 1",
+                                   (contract_id,)).fetchone()
+            else:
+                row = conn.execute("SELECT * FROM contract_versions WHERE contract_id = ? AND version = ?",
+                                   (contract_id, version)).fetchone()
+            if row is None:
+                return None
+            record = dict(row)
+            version_id = record.pop("id")
+            for table, columns in (("parties", "name, role"),
+                                   ("clauses", "key, title, start, end, fingerprint, risk_level, risk_score"),
+                                   ("compliance_findings", "area, clause, issue, risk, recommendation"),
+                                   ("risks", "area, level, score")):
+                order = " ORDER BY position" if table == "clauses" else ""
+                record[table] = [dict(item) for item in conn.execute(
+                    f"SELECT {columns} FROM {table} WHERE version_id = ?{order}", (version_id,)
+                )]
+
+        record["latest"] = bool(record["latest"])
+        record["results"] = json.loads(record["results"])
+        if not include_text:
+            record.pop("text")
+        return record
+
+    def history(self, contract_id: str) -> List[Dict[str, Any]]:
+        """
+        List the stored versions of a contract, oldest first, with their risk level and score.
+        """
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT version, latest, risk_level, risk_score, compliance_issues, analyzed_at "
+                "FROM contract_versions WHERE contract_id = ? ORDER BY version",
+                (contract_id,)
+            ).fetchall()
+        return [{**dict(row), "latest": bool(row["latest"])} for row in rows]
+
+    def delete(self, contract_id: str) -> int:
+        """
+        Remove a contract with all its versions.
+
+        Returns:
+            int: Number of removed versions
+        """
+        with self._lock, self._connect() as conn:
+            version_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM contract_versions WHERE contract_id = ?", (contract_id,)
+            )]
+            if version_ids:
+                self._delete_rows(conn, version_ids)
+                conn.execute("DELETE FROM contract_versions WHERE contract_id = ?", (contract_id,))
+        return len(version_ids)
+
+    def summary(self, expiring_days: int = EXPIRING_DAYS, today: date = None) -> Dict[str, Any]:
+        """
+        Aggregate the latest version of every stored contract for a portfolio dashboard.
+
+        Args:
+            expiring_days: Contracts ending within this many days are listed as expiring
+            today: Reference date, today if omitted
+
+        Returns:
+            dict: Contract and version counts, the average risk score, contract counts
+            by "risk_levels" and "contract_types", compliance finding counts by
+            "compliance_areas", the most frequent "high_risk_areas" and the
+            "expiring" contracts ordered by end date
+        """
+        today = today or date.today()
+        with self._lock, self._connect() as conn:
+            totals = conn.execute(
+                "SELECT COUNT(*) AS versions, COALESCE(SUM(latest), 0) AS contracts, "
+                "AVG(CASE WHEN latest = 1 THEN risk_score END) AS average_risk_score FROM contract_versions"
+            ).fetchone()
+
+            def counts(sql, *params):
+                return {row[0] if row[0] is not None else "Unknown": row[1] for row in conn.execute(sql, params)}
+
+            result = {
+                "contracts": totals["contracts"],
+                "versions": totals["versions"],
+                "average_risk_score": round(totals["average_risk_score"], 1) if totals["average_risk_score"] is not None else None,
+                "risk_levels": counts(
+                    "SELECT risk_level, COUNT(*) FROM contract_versions WHERE latest = 1 GROUP BY risk_level "
+                    "ORDER BY COUNT(*) DESC"
+                ),
+                "contract_types": counts(
+                    "SELECT contract_type, COUNT(*) FROM contract_versions WHERE latest = 1 GROUP BY contract_type "
+                    "ORDER BY COUNT(*) DESC"
+                ),
+                "compliance_areas": counts(
+                    "SELECT f.area, COUNT(*) FROM compliance_findings f JOIN contract_versions v ON v.id = f.version_id "
+                    "WHERE v.latest = 1 GROUP BY f.area ORDER BY COUNT(*) DESC"
+                ),
+                "high_risk_areas": counts(
+                    "SELECT r.area, COUNT(*) FROM risks r JOIN contract_versions v ON v.id = r.version_id "
+                    "WHERE v.latest = 1 AND r.level = 'High' GROUP BY r.area ORDER BY COUNT(*) DESC LIMIT 10"
+                )
+            }
+        result["expiring"] = self.query(
+            ends_from=today.isoformat(), ends_to=(today + timedelta(days=expiring_days)).isoformat(),
+            order_by="end_date"
+        )
+        return result
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_contract_store() -> Optional[ContractStore]:
+    """
+    Return the process-wide contract store configured from environment variables.
+
+    Environment variables:
+        CONTRACT_STORE_ENABLED: Set to "0"/"false" to stop storing analyses
+        CONTRACT_STORE_PATH: Location of the SQLite database
+
+    Returns:
+        ContractStore instance, or None if the store is disabled
+    """
+    global _default_store
+
+    if os.getenv("CONTRACT_STORE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ContractStore(os.getenv("CONTRACT_STORE_PATH", DEFAULT_STORE_PATH))
+        return _default_store
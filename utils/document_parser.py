@@ -1,16 +1,102 @@
-import PyPDF2
-import docx2txt
+import codecs
 import io
+import mmap
 import os
+import tempfile
+from contextlib import contextmanager
 from typing import Dict, Any
+from utils.parse_cache import compute_file_digest, get_parse_cache
+from utils.telemetry import current_span, traced
 
-def parse_document(uploaded_file, filename):
+# Bump whenever a change to the parsers alters their output, to invalidate cached parses
+PARSER_VERSION = "2"
+
+# Size of the slices decoded at a time by parse_txt
+TXT_DECODE_BLOCK_SIZE = 1024 * 1024
+
+class DocumentSource:
+    """
+    Uniform, copy-free access to a document's bytes.
+    
+    Wraps a path on disk, a Streamlit upload (or any BytesIO-like object),
+    another binary file object or bytes. Files on disk are memory-mapped
+    instead of read into memory, uploads are exposed through their internal
+    buffer instead of getvalue(), and bytes are used as they are.
+    """
+    
+    def __init__(self, source):
+        self.path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+        self._upload = None if self.path else source
+        self._file = None
+        self._mmap = None
+        
+        if self.path:
+            self._file = open(self.path, "rb")
+            if os.fstat(self._file.fileno()).st_size:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def buffer(self) -> memoryview:
+        """Return a read-only view of the document bytes; release it when done."""
+        if self.path:
+            return memoryview(self._mmap if self._mmap is not None else b"")
+        if isinstance(self._upload, (bytes, bytearray, memoryview)):
+            return memoryview(self._upload)
+        if hasattr(self._upload, "getbuffer"):
+            return self._upload.getbuffer()
+        if hasattr(self._upload, "getvalue"):
+            return memoryview(self._upload.getvalue())
+        # Other file objects have no buffer to share and are read in full
+        self._upload.seek(0)
+        return memoryview(self._upload.read())
+    
+    def stream(self):
+        """Return a seekable binary stream positioned at the start of the document."""
+        if self.path:
+            if self._mmap is None:
+                return io.BytesIO(b"")
+            self._mmap.seek(0)
+            return self._mmap
+        if hasattr(self._upload, "seek") and hasattr(self._upload, "read"):
+            self._upload.seek(0)
+            return self._upload
+        if isinstance(self._upload, (bytes, bytearray, memoryview)):
+            return io.BytesIO(self._upload)
+        return io.BytesIO(self._upload.getvalue())
+    
+    def close(self):
+        """Unmap and close the file, if this source opened one."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+@contextmanager
+def _open_source(source):
+    """Wrap a file object or path in a DocumentSource, unless it already is one."""
+    if isinstance(source, DocumentSource):
+        yield source
+        return
+    
+    document_source = DocumentSource(source)
+    try:
+        yield document_source
+    finally:
+        document_source.close()
+
+@traced("parse_document")
+def parse_document(uploaded_file, filename, use_cache: bool = True):
     """
     Parse document content from various file formats.
     
+    Parsed documents are cached on disk by the SHA-256 digest of the file
+    content, so parsing the same upload again is a lookup.
+    
     Args:
-        uploaded_file: The uploaded file object from Streamlit
+        uploaded_file: The uploaded file object from Streamlit, or a path to a file on disk
         filename: The name of the uploaded file
+        use_cache: Whether to read from and write to the parse cache
         
     Returns:
         Dictionary with parsed text and metadata
@@ -18,21 +104,42 @@ def parse_document(uploaded_file, filename):
     try:
         # Get file extension
         file_ext = filename.split('.')[-1].lower()
+        current_span().set_attributes(format=file_ext)
         
-        # Parse based on file type
-        if file_ext == 'pdf':
-            return parse_pdf(uploaded_file)
-        elif file_ext in ['docx', 'doc']:
-            return parse_docx(uploaded_file)
-        elif file_ext == 'txt':
-            return parse_txt(uploaded_file)
-        else:
+        if file_ext not in ['pdf', 'docx', 'doc', 'txt']:
             return {
                 "success": False,
                 "error": f"Unsupported file format: {file_ext}",
                 "text": "",
                 "metadata": {}
             }
+        
+        with _open_source(uploaded_file) as source:
+            # Look up the document in the parse cache
+            cache = get_parse_cache() if use_cache else None
+            with source.buffer() as view:
+                digest = compute_file_digest(view)
+            if cache is not None:
+                cached_result = cache.get(digest, file_ext, PARSER_VERSION)
+                if cached_result is not None:
+                    current_span().set_attributes(cached=True, chars=len(cached_result["text"]))
+                    return cached_result
+            
+            # Parse based on file type
+            if file_ext == 'pdf':
+                result = parse_pdf(source)
+            elif file_ext in ['docx', 'doc']:
+                result = parse_docx(source)
+            else:
+                result = parse_txt(source)
+        
+        current_span().set_attributes(cached=False, chars=len(result["text"]), success=result["success"])
+        if result["success"]:
+            result["metadata"]["sha256"] = digest
+            if cache is not None:
+                cache.set(digest, file_ext, PARSER_VERSION, result)
+        
+        return result
     
     except Exception as e:
         return {
@@ -42,20 +149,114 @@ def parse_document(uploaded_file, filename):
             "metadata": {}
         }
 
-def parse_pdf(pdf_file):
-    """Parse content from PDF file"""
+def parse_document_path(path: str, use_cache: bool = True):
+    """
+    Parse a document from disk without reading it into memory first.
+    
+    The file is memory-mapped and handed to the parsers directly, which keeps
+    peak memory low for large files in batch runs.
+    
+    Args:
+        path: Path to the document
+        use_cache: Whether to read from and write to the parse cache
+        
+    Returns:
+        Dictionary with parsed text and metadata
+    """
+    return parse_document(path, os.path.basename(path), use_cache=use_cache)
+
+# PDFs with at least this many pages are extracted by a process pool
+PARALLEL_PDF_MIN_PAGES = 32
+PDF_PAGES_PER_TASK = 8
+
+def _extract_pdf_page_range(path: str, start: int, end: int) -> list:
+    """Extract the text of pages [start, end) of the PDF at path in a worker process."""
+    import PyPDF2
+    
+    with _open_source(path) as source:
+        pdf_reader = PyPDF2.PdfReader(source.stream())
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def iter_pdf_pages(pdf_file, parallel: bool = None, max_workers: int = None):
+    """
+    Yield the text of each PDF page, in page order, as soon as it is extracted.
+    
+    This lets callers start chunking or sending text to the LLM before the last
+    page has been parsed. In parallel mode, page ranges are extracted by a
+    process pool and each range is yielded as soon as it and all earlier ranges
+    are done. Workers memory-map files on disk themselves; uploads are written
+    to one temporary file first, so no worker receives a copy of the document.
+    
+    Args:
+        pdf_file: The uploaded PDF file object, or a path to a PDF on disk
+        parallel: Whether to extract page ranges in a process pool; defaults to
+            True for PDFs with at least PARALLEL_PDF_MIN_PAGES pages
+        max_workers: Number of worker processes in parallel mode
+        
+    Yields:
+        str: Text of each page
+    """
+    # Imported on first use so importing the parser stays fast
+    import PyPDF2
+    
+    with _open_source(pdf_file) as source:
+        pdf_reader = PyPDF2.PdfReader(source.stream())
+        page_count = len(pdf_reader.pages)
+        
+        if parallel is None:
+            parallel = page_count >= PARALLEL_PDF_MIN_PAGES
+        
+        if not parallel or page_count < 2:
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ""
+            return
+        
+        from concurrent.futures import ProcessPoolExecutor
+        
+        spill_path = None
+        if source.path:
+            worker_path = source.path
+        else:
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spill, source.buffer() as view:
+                spill.write(view)
+            worker_path = spill_path = spill.name
+        
+        try:
+            ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_extract_pdf_page_range, worker_path, start, end) for start, end in ranges]
+                for future in futures:
+                    yield from future.result()
+        finally:
+            if spill_path is not None:
+                os.remove(spill_path)
+
+def parse_pdf(pdf_file, parallel: bool = None, max_workers: int = None):
+    """
+    Parse content from PDF file
+    
+    Args:
+        pdf_file: The uploaded PDF file object, or a path to a PDF on disk
+        parallel: Extract pages in a process pool; defaults to True for PDFs with
+            at least PARALLEL_PDF_MIN_PAGES pages
+        max_workers: Number of worker processes in parallel mode
+    """
     try:
-        # Create PDF reader object
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file.getvalue()))
+        # Extract text from all pages and join once at the end
+        pages = list(iter_pdf_pages(pdf_file, parallel=parallel, max_workers=max_workers))
+        text = "".join(page + "\n\n" for page in pages)
         
-        # Extract text from all pages
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n\n"
+        # Record where each page starts and ends in the extracted text
+        page_offsets = []
+        offset = 0
+        for page in pages:
+            page_offsets.append([offset, offset + len(page)])
+            offset += len(page) + 2
         
         # Extract metadata
         metadata = {
-            "pages": len(pdf_reader.pages),
+            "pages": len(pages),
+            "page_offsets": page_offsets,
             "format": "PDF"
         }
         
@@ -77,8 +278,11 @@ def parse_pdf(pdf_file):
 def parse_docx(docx_file):
     """Parse content from DOCX file"""
     try:
-        # Extract text from DOCX
-        text = docx2txt.process(io.BytesIO(docx_file.getvalue()))
+        import docx2txt
+        
+        # Extract text from DOCX; files on disk are opened by path, uploads read from their stream
+        with _open_source(docx_file) as source:
+            text = docx2txt.process(source.path or source.stream())
         
         # Create metadata
         metadata = {
@@ -103,8 +307,14 @@ def parse_docx(docx_file):
 def parse_txt(txt_file):
     """Parse content from TXT file"""
     try:
-        # Read text file
-        text = txt_file.getvalue().decode("utf-8")
+        # Decode the text incrementally, block by block, and join once at the end
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parts = []
+        with _open_source(txt_file) as source, source.buffer() as view:
+            for start in range(0, len(view), TXT_DECODE_BLOCK_SIZE):
+                parts.append(decoder.decode(view[start:start + TXT_DECODE_BLOCK_SIZE]))
+        parts.append(decoder.decode(b"", final=True))
+        text = "".join(parts)
         
         # Create metadata
         metadata = {
@@ -126,38 +336,88 @@ def parse_txt(txt_file):
             "metadata": {}
         }
 
-def chunk_text(text: str, chunk_size: int = 4000, overlap: int = 200) -> list:
+def iter_chunk_spans(text, chunk_size: int = 4000, overlap: int = 200):
     """
-    Split text into overlapping chunks of specified size.
+    Lazily compute the (start, end) offsets of overlapping chunks.
+    
+    Consecutive chunks overlap by exactly ``overlap`` characters and together
+    cover the whole text. A tail shorter than half a chunk is merged into the
+    previous chunk instead of becoming a tiny chunk of its own, so the last
+    chunk can be up to ``chunk_size // 2 - overlap`` characters longer than the others.
     
     Args:
-        text: The text to split into chunks
-        chunk_size: Maximum chunk size in characters
+        text: The text (or any sized sequence, e.g. bytes or mmap) to split
+        chunk_size: Chunk size in characters; only a merged last chunk is longer
         overlap: Overlap size between chunks in characters
         
-    Returns:
-        List of text chunks
+    Yields:
+        Tuples of (start, end) offsets
     """
-    if not text:
-        return []
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError("overlap must be between 0 and chunk_size - 1")
     
-    chunks = []
-    start = 0
     text_length = len(text)
+    pending = None
+    start = 0
     
+    # Hold back one span so a short tail can still be merged into it
     while start < text_length:
         end = min(start + chunk_size, text_length)
         
-        # Don't create tiny chunks at the end
-        if end == text_length and end - start < chunk_size / 2:
-            # Extend the previous chunk instead
-            if chunks:
-                chunks[-1] = text[start - chunk_size + overlap:end]
+        if end == text_length:
+            # Don't create tiny chunks at the end
+            if pending is not None and end - start < chunk_size / 2:
+                pending = (pending[0], end)
             else:
-                chunks.append(text[start:end])
+                if pending is not None:
+                    yield pending
+                pending = (start, end)
             break
         
-        chunks.append(text[start:end])
+        if pending is not None:
+            yield pending
+        pending = (start, end)
         start = end - overlap
     
-    return chunks 
\ No newline at end of file
+    if pending is not None:
+        yield pending
+
+def iter_chunks(text, chunk_size: int = 4000, overlap: int = 200):
+    """
+    Lazily yield overlapping chunks of text.
+    
+    Binary input (bytes, bytearray, mmap) is sliced through a memoryview, so
+    no chunk is copied; string chunks are sliced one at a time as they are consumed.
+    
+    Args:
+        text: The text to split, as str or a bytes-like object
+        chunk_size: Chunk size in characters; a merged last chunk can be up to
+            half a chunk longer (see iter_chunk_spans)
+        overlap: Overlap size between chunks in characters
+        
+    Yields:
+        str chunks for str input, memoryview chunks for bytes-like input
+    """
+    view = text if isinstance(text, str) else memoryview(text)
+    for start, end in iter_chunk_spans(text, chunk_size, overlap):
+        yield view[start:end]
+
+def chunk_text(text: str, chunk_size: int = 4000, overlap: int = 200) -> list:
+    """
+    Split text into overlapping chunks of specified size.
+    
+    Args:
+        text: The text to split into chunks
+        chunk_size: Chunk size in characters; a merged last chunk can be up to
+            half a chunk longer (see iter_chunk_spans)
+        overlap: Overlap size between chunks in characters
+        
+    Returns:
+        List of text chunks
+    """
+    if not text:
+        return []
+    
+    return [text[start:end] for start, end in iter_chunk_spans(text, chunk_size, overlap)]
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _is_empty(value: Any) -> bool:
+    """Check whether an extracted value carries no information."""
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return not value.strip() or value.strip().lower() in ("n/a", "none", "null", "not specified", "not found")
+    if isinstance(value, (list, dict)):
+        return not value
+    return False
+
+
+def _identity(value: Any) -> str:
+    """Canonical form of a value used to detect duplicates across chunks."""
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value).strip().lower()
+    return json.dumps(value, sort_keys=True, default=str).lower()
+
+
+def _normalize_key(key: str) -> str:
+    """Normalize a JSON key for matching against the schema."""
+    return _WHITESPACE_RE.sub("_", str(key).strip().lower()).replace("-", "_")
+
+
+def _merge_values(values: List[Any]) -> Any:
+    """
+    Merge the non-empty values found for one key in chunk order.
+
+    Dictionaries are merged key by key, lists are concatenated and
+    de-duplicated, and identical scalars collapse to a single value.
+    Conflicting scalars are kept as a list in the order they were found.
+    """
+    if not values:
+        return None
+
+    if all(isinstance(value, dict) for value in values):
+        return merge_extractions(values)
+
+    items = []
+    for value in values:
+        items.extend(value if isinstance(value, list) else [value])
+
+    merged = []
+    seen = set()
+    for item in items:
+        if _is_empty(item):
+            continue
+        identity = _identity(item)
+        if identity not in seen:
+            seen.add(identity)
+            merged.append(item)
+
+    if any(isinstance(value, list) for value in values):
+        return merged
+    return merged[0] if len(merged) == 1 else merged
+
+
+def merge_extractions(partials: Iterable[Any], fields: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Deterministically merge partial extraction results into a single object.
+
+    The output contains every key in ``fields`` (in that order, None when no
+    chunk provided a value), followed by any additional keys in order of first
+    appearance. Values are merged in chunk order, so the same partials always
+    produce the same result.
+
+    Args:
+        partials: Partial extraction dictionaries, one per chunk; anything that
+            is not a dictionary (e.g. unparseable output) is ignored
+        fields: Keys of the target schema
+
+    Returns:
+        dict: Merged extraction result
+    """
+    keys = list(fields)
+
+    # Map keys that differ from the schema only in case or spacing onto the schema key
+    schema_keys = {_normalize_key(key): key for key in keys}
+    partials = [
+        {schema_keys.get(_normalize_key(key), key): value for key, value in partial.items()}
+        for partial in partials if isinstance(partial, dict)
+    ]
+
+    for partial in partials:
+        for key in partial:
+            if key not in keys:
+                keys.append(key)
+
+    merged = {}
+    for key in keys:
+        values = [partial[key] for partial in partials if key in partial and not _is_empty(partial[key])]
+        merged[key] = _merge_values(values)
+    return merged
@@ -0,0 +1,404 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.telemetry import start_metrics_server
+
+# Default location of the job database (relative to the working directory)
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+
+# Default number of worker processes executing analyses
+DEFAULT_WORKERS = 2
+
+# Seconds an idle worker waits before checking the queue again
+DEFAULT_POLL_SECONDS = 1.0
+
+# A job whose worker died is retried this many times before it is marked failed
+MAX_ATTEMPTS = 2
+
+# Default retention of finished jobs; 0 disables the corresponding limit
+DEFAULT_MAX_FINISHED_JOBS = 1000
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+_JSON_COLUMNS = ("options", "stages", "result")
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """Check whether a process with the given ID is running on this machine."""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    Persistent SQLite queue of contract analysis jobs.
+
+    Jobs are submitted by the UI and claimed by worker processes. A job's
+    status, the events of the stages finished so far and its final result are
+    stored in the database, so any process can poll them by job ID and they
+    survive Streamlit reruns and browser refreshes. Finished jobs are pruned
+    once they are older than max_age_seconds or more than max_finished_jobs
+    have accumulated.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_finished_jobs: int = DEFAULT_MAX_FINISHED_JOBS,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_finished_jobs = max_finished_jobs
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    document_name TEXT,
+                    contract_text TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    stages TEXT NOT NULL DEFAULT '[]',
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(self, contract_text: str, document_name: str = None, **options) -> str:
+        """
+        Add an analysis job to the queue.
+
+        Args:
+            contract_text: The text content of the contract to analyze
+            document_name: Name of the uploaded document, for display
+            **options: Keyword arguments for ContractAnalysisCrew.analyze_contract
+
+        Returns:
+            str: The job ID
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, document_name, contract_text, options, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, document_name, contract_text, json.dumps(options), time.time())
+            )
+        return job_id
+
+    def get(self, job_id: str, include_text: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: ID returned by submit
+            include_text: Whether to include the contract text
+
+        Returns:
+            The job as a dictionary, or None if it does not exist
+        """
+        with self._lock, self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._row_to_job(row, include_text)
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        List the most recently submitted jobs without their text and results.
+
+        Args:
+            limit: Maximum number of jobs
+
+        Returns:
+            List of job summaries, newest first
+        """
+        with self._lock, self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT id, status, document_name, attempts, created_at, started_at, finished_at "
+                "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, worker_pid: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest queued job and mark it running.
+
+        Args:
+            worker_pid: Process ID of the claiming worker (defaults to the current process)
+
+        Returns:
+            The claimed job including its contract text, or None if the queue is empty
+        """
+        worker_pid = worker_pid or os.getpid()
+        with self._lock, self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            # Take the write lock before reading so two workers cannot claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_pid = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, worker_pid, time.time(), row["id"])
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return self._row_to_job(job, include_text=True)
+
+    def record_stage(self, job_id: str, event: Dict[str, Any]):
+        """
+        Append a finished stage's event to a running job.
+
+        Args:
+            job_id: ID of the job
+            event: Event passed to the on_stage_complete callback of analyze_contract
+        """
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row[0])
+            stages.append(event)
+            conn.execute("UPDATE jobs SET stages = ? WHERE id = ?", (json.dumps(stages, default=str), job_id))
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store a job's analysis result, mark it succeeded and apply the retention policy."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+                (SUCCEEDED, json.dumps(result, default=str), now, job_id)
+            )
+            self._prune(conn, now)
+
+    def fail(self, job_id: str, error: str):
+        """Store a job's error, mark it failed and apply the retention policy."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, now, job_id)
+            )
+            self._prune(conn, now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Remove expired finished jobs, then the oldest finished jobs over the limit."""
+        marks = ",".join("?" * len(FINISHED_STATES))
+        if self.max_age_seconds:
+            conn.execute(f"DELETE FROM jobs WHERE status IN ({marks}) AND finished_at < ?",
+                         (*FINISHED_STATES, now - self.max_age_seconds))
+        if self.max_finished_jobs:
+            conn.execute(
+                f"DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN ({marks}) "
+                "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+                (*FINISHED_STATES, self.max_finished_jobs)
+            )
+
+    def recover(self) -> int:
+        """
+        Requeue running jobs whose worker process has died.
+
+        Jobs that already used MAX_ATTEMPTS are marked failed instead.
+
+        Returns:
+            int: Number of jobs recovered
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            orphaned = [
+                (job_id, attempts) for job_id, attempts, pid in conn.execute(
+                    "SELECT id, attempts, worker_pid FROM jobs WHERE status = ?", (RUNNING,)
+                ).fetchall()
+                if not _pid_alive(pid)
+            ]
+            for job_id, attempts in orphaned:
+                if attempts >= MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                        (FAILED, "Worker process exited while running the analysis", time.time(), job_id)
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, stages = '[]', worker_pid = NULL WHERE id = ?",
+                        (QUEUED, job_id)
+                    )
+        return len(orphaned)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Count the jobs in each state.
+
+        Returns:
+            Dictionary of job counts keyed by status
+        """
+        with self._lock, self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row, include_text: bool) -> Dict[str, Any]:
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job.get(column) is not None:
+                job[column] = json.loads(job[column])
+        if not include_text:
+            job.pop("contract_text", None)
+        return job
+
+
+def run_next_job(queue: JobQueue, analyze: Callable[..., Dict[str, Any]]) -> Optional[str]:
+    """
+    Claim one queued job and execute it.
+
+    Args:
+        queue: Job queue to take the job from
+        analyze: Analysis function with the signature of ContractAnalysisCrew.analyze_contract
+
+    Returns:
+        The ID of the executed job, or None if the queue was empty
+    """
+    job = queue.claim()
+    if job is None:
+        return None
+
+    try:
+        result = analyze(
+            job["contract_text"],
+            on_stage_complete=lambda stage, event: queue.record_stage(job["id"], event),
+            **job["options"]
+        )
+        queue.complete(job["id"], result)
+    except Exception as e:
+        print(f"Job {job['id']} failed: {str(e)}")
+        queue.fail(job["id"], f"{str(e)}\n\n{traceback.format_exc()}")
+    return job["id"]
+
+
+def _worker_main(queue_path: str, poll_seconds: float, workers: int = 1):
+    """Entry point of a worker process: execute queued jobs until the parent exits."""
+    # Imported here so the UI process does not load the crew stack for the workers
+    from crew import ContractAnalysisCrew
+
+    # Each worker serves its metrics on the first free port from METRICS_PORT on
+    start_metrics_server(attempts=workers)
+    queue = JobQueue(queue_path)
+    parent_pid = os.getppid()
+    while os.getppid() == parent_pid:
+        if run_next_job(queue, ContractAnalysisCrew.analyze_contract) is None:
+            time.sleep(poll_seconds)
+
+
+class JobWorkerPool:
+    """
+    Pool of worker processes executing the jobs of a queue.
+
+    Workers run as separate processes, so analyses neither block nor die with
+    the Streamlit script thread that submitted them. Dead workers are replaced
+    and the jobs they left running requeued by ensure_running().
+    """
+
+    def __init__(self, queue_path: str = DEFAULT_QUEUE_PATH, workers: int = DEFAULT_WORKERS,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.queue_path = queue_path
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._processes = []
+        self._lock = threading.Lock()
+        # Spawn fresh interpreters rather than forking the multi-threaded server process
+        self._context = multiprocessing.get_context("spawn")
+
+    def ensure_running(self):
+        """Start missing worker processes and requeue the jobs of workers that died."""
+        with self._lock:
+            self._processes = [process for process in self._processes if process.is_alive()]
+            if len(self._processes) == self.workers:
+                return
+            # Only needed when workers (re)start: jobs are left running only by workers that exited
+            JobQueue(self.queue_path).recover()
+            while len(self._processes) < self.workers:
+                process = self._context.Process(
+                    target=_worker_main, args=(self.queue_path, self.poll_seconds, self.workers), daemon=True
+                )
+                process.start()
+                self._processes.append(process)
+
+    def shutdown(self):
+        """Terminate the worker processes; their running jobs are requeued on the next start."""
+        with self._lock:
+            for process in self._processes:
+                process.terminate()
+            for process in self._processes:
+                process.join()
+            self._processes = []
+
+
+_default_queue = None
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Return the process-wide job queue, starting its worker pool on first use.
+
+    Environment variables:
+        JOB_QUEUE_PATH: Location of the SQLite job database
+        JOB_WORKERS: Number of worker processes
+        JOB_POLL_SECONDS: Seconds an idle worker waits before checking the queue again
+        JOB_MAX_FINISHED: Number of finished jobs kept
+        JOB_MAX_AGE_DAYS: Days finished jobs are kept
+
+    Returns:
+        JobQueue instance
+    """
+    global _default_queue, _default_pool
+
+    with _default_lock:
+        if _default_queue is None:
+            path = os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+            _default_queue = JobQueue(
+                path,
+                max_finished_jobs=int(os.getenv("JOB_MAX_FINISHED", DEFAULT_MAX_FINISHED_JOBS)),
+                max_age_seconds=float(os.getenv("JOB_MAX_AGE_DAYS", DEFAULT_MAX_AGE_SECONDS / 86400)) * 86400
+            )
+            _default_pool = JobWorkerPool(
+                path,
+                workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+                poll_seconds=float(os.getenv("JOB_POLL_SECONDS", DEFAULT_POLL_SECONDS))
+            )
+        _default_pool.ensure_running()
+        return _default_queue
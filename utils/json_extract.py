@@ -0,0 +1,231 @@
+import json
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+_CODE_FENCE_RE = re.compile(r"```[a-zA-Z]*[ \t]*\n?|```")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+
+
+def _balanced_pairs(text: str) -> List[Tuple[int, int]]:
+    """All balanced {...} pairs of a text as (start, end) offsets, sorted by start."""
+    open_braces = []
+    closed = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == "{":
+            open_braces.append(index)
+        elif char == "}":
+            if open_braces:
+                closed.append((open_braces.pop(), index + 1))
+        elif char == '"' and open_braces:
+            # Quotes only delimit strings inside an object, not in the prose around it
+            in_string = True
+    # Pairs close inner-first, so sorting by start puts every outer pair before its contents
+    closed.sort()
+    return closed
+
+
+def iter_json_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    Find the outermost balanced {...} spans of a text in a single pass.
+
+    Braces inside JSON strings are skipped. A stray opening brace in the
+    surrounding prose does not hide the objects after it: every balanced pair
+    is recorded and the ones not nested in another pair are returned.
+
+    Args:
+        text: Text that may contain JSON objects among other content
+
+    Yields:
+        (start, end) offsets of each outermost balanced object, in text order
+    """
+    end_of_outer = -1
+    for start, end in _balanced_pairs(text):
+        if start >= end_of_outer:
+            end_of_outer = end
+            yield start, end
+
+
+def _normalize_strings_and_literals(text: str) -> str:
+    """
+    Turn single-quoted strings into JSON strings and Python literals outside
+    strings into JSON literals, leaving double-quoted strings alone.
+    """
+    result = []
+    outside = []
+    quote = None
+    escaped = False
+    for char in text:
+        if quote is None:
+            if char in "'\"":
+                result.append(_PYTHON_LITERAL_RE.sub(lambda match: _PYTHON_LITERALS[match.group(1)], "".join(outside)))
+                outside = []
+                quote = char
+                result.append('"')
+            else:
+                outside.append(char)
+            continue
+        if escaped:
+            escaped = False
+            # \' is not a valid JSON escape
+            result.append("'" if char == "'" else "\\" + char)
+        elif char == "\\":
+            escaped = True
+        elif char == quote:
+            quote = None
+            result.append('"')
+        elif char == '"':
+            result.append('\\"')
+        else:
+            result.append(char)
+    result.append(_PYTHON_LITERAL_RE.sub(lambda match: _PYTHON_LITERALS[match.group(1)], "".join(outside)))
+    return "".join(result)
+
+
+def repair_json(text: str) -> str:
+    """
+    Fix the most common artifacts of LLM-written JSON.
+
+    Removes Markdown code fences and trailing commas, turns single-quoted
+    strings into double-quoted ones and Python literals into JSON literals.
+
+    Args:
+        text: Almost-JSON text
+
+    Returns:
+        The repaired text (which may still be invalid)
+    """
+    text = _normalize_strings_and_literals(_CODE_FENCE_RE.sub("", text).strip())
+    return _TRAILING_COMMA_RE.sub(r"\1", text)
+
+
+def loads_lenient(text: str) -> Any:
+    """
+    Parse JSON, repairing common LLM artifacts when strict parsing fails.
+
+    Args:
+        text: JSON text
+
+    Returns:
+        Parsed value
+
+    Raises:
+        ValueError: If the text is not valid JSON even after repair
+    """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(repair_json(text))
+
+
+def find_json_objects(text: str) -> List[Any]:
+    """
+    Parse every JSON object embedded in a text.
+
+    Each balanced span is decoded from its opening brace, which fails fast on
+    prose. Outermost spans that do not decode are repaired once; spans nested
+    in text that cannot be repaired are still tried on their own, so an object
+    wrapped in unbalanced prose braces is found.
+
+    Args:
+        text: Text containing JSON objects, e.g. an agent's final answer
+
+    Returns:
+        Parsed objects in text order
+    """
+    decoder = json.JSONDecoder()
+    objects = []
+    parsed_until = 0
+    end_of_outer = -1
+    for start, end in _balanced_pairs(text):
+        if start < parsed_until:
+            continue
+        try:
+            value, parsed_until = decoder.raw_decode(text, start)
+            objects.append(value)
+            continue
+        except ValueError:
+            pass
+        if start >= end_of_outer:
+            end_of_outer = end
+            try:
+                objects.append(json.loads(repair_json(text[start:end])))
+                parsed_until = end
+            except ValueError:
+                pass
+    return objects
+
+
+def extract_json(text: str, schema=None) -> Tuple[Optional[Any], List[str]]:
+    """
+    Extract the JSON result from an agent output and validate it.
+
+    Objects that validate against the schema are preferred, then larger
+    objects over smaller ones. When the text holds no object, the whole text
+    is parsed, so bare JSON arrays are accepted too.
+
+    Args:
+        text: Agent output
+        schema: Optional pydantic model the result must validate against
+
+    Returns:
+        Tuple of (parsed data or None, list of validation or parse errors)
+    """
+    if not isinstance(text, str):
+        return text, []
+
+    candidates = find_json_objects(text)
+    if not candidates:
+        try:
+            candidates = [loads_lenient(text.strip())]
+        except ValueError:
+            return None, ["The output does not contain a JSON object"]
+
+    # The largest object is most likely the complete result rather than an example or fragment
+    candidates.sort(key=lambda candidate: len(json.dumps(candidate)), reverse=True)
+    if schema is None:
+        return candidates[0], []
+
+    errors = []
+    for candidate in candidates:
+        candidate_errors = validate_json(candidate, schema)
+        if not candidate_errors:
+            return candidate, []
+        errors = errors or candidate_errors
+    return candidates[0], errors
+
+
+def validate_json(data: Any, schema) -> List[str]:
+    """
+    Validate parsed JSON against a pydantic model.
+
+    Args:
+        data: Parsed JSON
+        schema: Pydantic model class
+
+    Returns:
+        Human-readable validation errors; empty if the data is valid
+    """
+    if not isinstance(data, dict):
+        return [f"Expected a JSON object, got {type(data).__name__}"]
+    try:
+        schema.parse_obj(data)
+    except ValueError as e:
+        errors = getattr(e, "errors", None)
+        if not callable(errors):
+            return [str(e)]
+        return [
+            f"{'.'.join(str(part) for part in error['loc'] if part != '__root__') or 'object'}: {error['msg']}"
+            for error in errors()
+        ]
+    return []
@@ -0,0 +1,162 @@
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+
+def _inflections(keyword: str) -> List[str]:
+    """Generate the common English inflections of a keyword (plural, past tense, gerund)."""
+    forms = [keyword, keyword + "s", keyword + "es", keyword + "ed", keyword + "ing"]
+    if keyword.endswith("e"):
+        forms += [keyword + "d", keyword[:-1] + "ing"]
+    if keyword.endswith("y") and len(keyword) > 1 and keyword[-2] not in "aeiou":
+        forms += [keyword[:-1] + "ies", keyword[:-1] + "ied"]
+    return forms
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class KeywordMatcher:
+    """
+    Single-pass, case-insensitive multi-keyword matcher (Aho-Corasick).
+
+    The automaton is built once from keywords grouped by category and then
+    scans any text in time linear in its length, however many keywords there
+    are. Matches respect word boundaries, so "data" does not match inside
+    "metadata". Keywords are stem-aware: plain keywords also match their
+    common inflections ("payment" matches "payments"), and keywords ending in
+    "*" match any word starting with the stem ("jurisdict*" matches
+    "jurisdiction" and "jurisdictional").
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]], stem_aware: bool = True):
+        """
+        Build the automaton.
+
+        Args:
+            categories: Mapping of category name to its keywords
+            stem_aware: Whether plain keywords also match their inflections
+        """
+        self.categories = {category: list(keywords) for category, keywords in categories.items()}
+
+        # Trie: per-node transitions, failure links and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                is_stem = keyword.endswith("*")
+                term = keyword.rstrip("*").lower()
+                forms = [term] if is_stem or not stem_aware else _inflections(term)
+                for form in forms:
+                    self._add(form, (keyword.rstrip("*"), category, is_stem))
+
+        self._build_failure_links()
+
+    def _add(self, pattern: str, entry: Tuple[str, str, bool]):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(pattern),) + entry)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> List[dict]:
+        """
+        Find every keyword occurrence in the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            List of matches in order of their end offset, each with "term"
+            (the keyword), "category", "matched" (the matched word as it
+            appears in the text), "start" and "end"
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Keep offsets aligned when lowercasing changes the length of some characters
+            lowered = "".join(char.lower()[:1] for char in text)
+
+        goto, fail, output = self._goto, self._fail, self._output
+        text_length = len(text)
+        matches = []
+        seen = set()
+        node = 0
+
+        for position, char in enumerate(lowered):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not output[node]:
+                continue
+
+            end = position + 1
+            for length, term, category, is_stem in output[node]:
+                start = end - length
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+
+                match_end = end
+                if is_stem:
+                    while match_end < text_length and _is_word_char(text[match_end]):
+                        match_end += 1
+                elif end < text_length and _is_word_char(text[end]):
+                    continue
+
+                # Different inflections of one keyword can match the same word
+                key = (start, term, category)
+                if key in seen:
+                    continue
+                seen.add(key)
+                matches.append({
+                    "term": term,
+                    "category": category,
+                    "matched": text[start:match_end],
+                    "start": start,
+                    "end": match_end
+                })
+
+        return matches
+
+    def match(self, text: str, categories: Iterable[str] = None) -> Dict[str, dict]:
+        """
+        Count keyword hits per category.
+
+        Args:
+            text: Text to scan
+            categories: Optional subset of categories to report
+
+        Returns:
+            Mapping of category to {"hits", "terms", "matches"} for every category
+            with at least one hit; "terms" maps each matched keyword to its count
+        """
+        wanted = set(categories) if categories is not None else None
+        results = {}
+        for match in self.find_all(text):
+            category = match["category"]
+            if wanted is not None and category not in wanted:
+                continue
+            entry = results.setdefault(category, {"hits": 0, "terms": {}, "matches": []})
+            entry["hits"] += 1
+            entry["terms"][match["term"]] = entry["terms"].get(match["term"], 0) + 1
+            entry["matches"].append({key: match[key] for key in ("term", "matched", "start", "end")})
+        return results
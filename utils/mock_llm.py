@@ -0,0 +1,521 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+The server answers POST /v1/chat/completions in one of three modes:
+
+- "synthetic": generates a deterministic answer shaped like the analysis task
+  that was asked, after a simulated latency (time to first token drawn from a
+  log-normal distribution, then decoding at a normally distributed token rate)
+- "record": forwards every request to a real OpenAI-compatible endpoint and
+  stores the response as a fixture file
+- "replay": answers from the recorded fixtures
+
+Select it for the crew with LLM_PROVIDER=mock, or run it standalone for load tests:
+    python -m utils.mock_llm --port 8765 --mode synthetic --latency-ms 400 --tokens-per-second 60
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+MODES = ("synthetic", "record", "replay")
+
+# Model name reported by the server and used by the crew in mock mode
+MOCK_MODEL = "mock-gpt"
+
+# Default location of recorded responses (relative to the working directory)
+DEFAULT_FIXTURES_DIR = os.path.join("data", "llm_fixtures")
+
+# Default simulated latency: median time to first token and decoding speed
+DEFAULT_LATENCY_MS = 400.0
+DEFAULT_LATENCY_SIGMA = 0.25
+DEFAULT_TOKENS_PER_SECOND = 60.0
+DEFAULT_TOKENS_PER_SECOND_STD = 10.0
+
+# Rough token estimate for synthetic usage figures
+CHARS_PER_TOKEN = 4
+
+_FIELD_RE = re.compile(r"^\s*\d+\.\s+([a-z_]+):", re.MULTILINE)
+
+# Clause IDs of a clause review prompt, e.g. "[c3] 5.2 Payment Terms ..."
+_CLAUSE_ID_RE = re.compile(r"^\s*\[(c\d+)\]", re.MULTILINE)
+
+_COMPLIANCE_AREAS = (
+    "data_privacy", "intellectual_property", "liability_and_indemnification",
+    "service_levels", "termination", "security_and_breach", "jurisdiction"
+)
+_RISK_AREAS = ("financial", "operational", "strategic", "reputational", "security", "vendor", "exit")
+_RISK_LEVELS = ("Low", "Medium", "High")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def fixture_key(request: Dict[str, Any]) -> str:
+    """
+    Compute the fixture key of a chat completion request.
+
+    The key covers the messages and the options that change the answer, but not
+    the model name, so recordings replay regardless of the deployment they came from.
+
+    Args:
+        request: Chat completion request body
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    relevant = {key: request.get(key) for key in ("messages", "tools", "response_format")}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _prompt_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content)
+    return "\n".join(parts)
+
+
+def synthetic_answer(messages: List[Dict[str, Any]], rng: random.Random, json_mode: bool = False) -> str:
+    """
+    Generate a plausible final answer for an analysis task prompt.
+
+    The answer uses the ReAct "Final Answer:" format CrewAI agents parse, with a
+    JSON object shaped like the task's expected output.
+
+    Args:
+        messages: Chat messages of the request
+        rng: Random generator seeded from the request
+        json_mode: Answer with the bare JSON object, as a model does when the
+            request sets response_format
+
+    Returns:
+        str: Assistant message content
+    """
+    task = next((message.get("content") or "" for message in reversed(messages) if message.get("role") == "user"), "")
+    task = task if isinstance(task, str) else _prompt_text([{"content": task}])
+    head = task[:600].lower()
+
+    if "review the following clauses" in head:
+        answer = {
+            clause_id: {
+                "fields": {},
+                "compliance_issues": [{"area": rng.choice(_COMPLIANCE_AREAS), "issue": f"Review clause {clause_id}"}],
+                "risk_level": rng.choice(_RISK_LEVELS),
+                "risk_score": rng.randint(2, 8),
+                "risk_areas": [rng.choice(_RISK_AREAS)],
+                "mitigation": f"Negotiate clause {clause_id}"
+            }
+            for clause_id in _CLAUSE_ID_RE.findall(task)
+        }
+    elif "risk assessment" in head:
+        areas = {
+            area: {"level": rng.choice(_RISK_LEVELS), "mitigation": f"Negotiate {area} safeguards"}
+            for area in _RISK_AREAS
+        }
+        answer = {**areas, "summary": {"overall_risk_score": rng.randint(3, 8), "critical_areas": list(_RISK_AREAS[:3])}}
+    elif "compliance" in head:
+        answer = {
+            area: {"issue": f"Review the {area.replace('_', ' ')} provisions", "risk": rng.choice(_RISK_LEVELS)}
+            for area in _COMPLIANCE_AREAS
+        }
+    else:
+        fields = _FIELD_RE.findall(task) or ["summary"]
+        answer = {field: f"Synthetic {field.replace('_', ' ')}" for field in fields}
+
+    if json_mode:
+        return json.dumps(answer)
+    return f"Thought: I now can give a great answer\nFinal Answer: {json.dumps(answer, indent=2)}"
+
+
+def _error(status: int, message: str) -> Tuple[int, Dict[str, Any]]:
+    return status, {"error": {"message": message, "type": "invalid_request_error", "code": status}}
+
+
+class MockLLM:
+    """
+    Chat completion backend of the mock server.
+
+    Latency figures are drawn from a generator seeded with the request, so the
+    same request always gets the same answer and timing.
+    """
+
+    def __init__(self, mode: str = "synthetic", fixtures_dir: str = DEFAULT_FIXTURES_DIR,
+                 latency_ms: float = DEFAULT_LATENCY_MS, latency_sigma: float = DEFAULT_LATENCY_SIGMA,
+                 tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND,
+                 tokens_per_second_std: float = DEFAULT_TOKENS_PER_SECOND_STD, seed: int = 0,
+                 upstream_url: Optional[str] = None, upstream_api_key: Optional[str] = None,
+                 replay_fallback: bool = False):
+        """
+        Args:
+            mode: One of MODES
+            fixtures_dir: Directory recorded responses are written to and replayed from
+            latency_ms: Median simulated time to first token; 0 disables the delay
+            latency_sigma: Log-normal shape of the time to first token
+            tokens_per_second: Mean simulated decoding speed; 0 disables the delay
+            tokens_per_second_std: Standard deviation of the decoding speed
+            seed: Seed of the latency and content generator
+            upstream_url: OpenAI-compatible base URL requests are forwarded to in record mode
+            upstream_api_key: API key for the upstream endpoint
+            replay_fallback: In replay mode, synthesize answers for requests without a fixture
+                instead of failing
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mock LLM mode '{mode}'. Expected one of: {', '.join(MODES)}")
+        if mode == "record" and not upstream_url:
+            raise ValueError("Record mode needs the upstream_url of a real OpenAI-compatible endpoint")
+
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_std = tokens_per_second_std
+        self.seed = seed
+        self.upstream_url = upstream_url.rstrip("/") if upstream_url else None
+        self.upstream_api_key = upstream_api_key
+        self.replay_fallback = replay_fallback
+        self._stats = {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "replayed": 0, "recorded": 0}
+        self._lock = threading.Lock()
+
+    def _fixture_path(self, key: str) -> str:
+        return os.path.join(self.fixtures_dir, f"{key}.json")
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def stats(self) -> Dict[str, int]:
+        """Report request and token counters."""
+        with self._lock:
+            return dict(self._stats)
+
+    def latency(self, request_key: str, completion_tokens: int) -> Tuple[float, float]:
+        """
+        Draw the simulated latency of a response.
+
+        Args:
+            request_key: Fixture key of the request, used to seed the draw
+            completion_tokens: Length of the response
+
+        Returns:
+            Tuple of (time to first token, decoding time) in seconds
+        """
+        rng = random.Random(f"{self.seed}:latency:{request_key}")
+        first_token = 0.0
+        if self.latency_ms > 0:
+            first_token = self.latency_ms / 1000 * math.exp(rng.gauss(0.0, self.latency_sigma))
+        decoding = 0.0
+        if self.tokens_per_second > 0:
+            rate = max(rng.gauss(self.tokens_per_second, self.tokens_per_second_std), 1.0)
+            decoding = completion_tokens / rate
+        return first_token, decoding
+
+    def complete(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any], float, float]:
+        """
+        Answer a chat completion request.
+
+        Args:
+            request: Chat completion request body
+
+        Returns:
+            Tuple of (HTTP status, response body, time to first token, decoding time);
+            the delays are not applied here so the server can stream
+        """
+        messages = request.get("messages")
+        if not isinstance(messages, list) or not messages:
+            self._count(errors=1)
+            return _error(400, "'messages' must be a non-empty list") + (0.0, 0.0)
+
+        key = fixture_key(request)
+        if self.mode == "record":
+            status, response = self._forward(request)
+            if status == 200:
+                self._save_fixture(key, request, response)
+                self._count(recorded=1)
+            # The upstream call took real time, nothing to simulate
+            return status, response, 0.0, 0.0
+
+        response = None
+        if self.mode == "replay":
+            try:
+                with open(self._fixture_path(key), encoding="utf-8") as f:
+                    response = json.load(f)["response"]
+                self._count(replayed=1)
+            except (OSError, ValueError, KeyError):
+                if not self.replay_fallback:
+                    self._count(errors=1)
+                    return _error(404, f"No recorded response for request {key[:16]}") + (0.0, 0.0)
+
+        if response is None:
+            rng = random.Random(f"{self.seed}:content:{key}")
+            json_mode = (request.get("response_format") or {}).get("type") in ("json_object", "json_schema")
+            content = synthetic_answer(messages, rng, json_mode)
+            prompt_tokens = estimate_tokens(_prompt_text(messages))
+            completion_tokens = estimate_tokens(content)
+            response = {
+                "id": f"chatcmpl-mock-{key[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model") or MOCK_MODEL,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+
+        usage = response.get("usage") or {}
+        self._count(requests=1, prompt_tokens=usage.get("prompt_tokens", 0),
+                    completion_tokens=usage.get("completion_tokens", 0))
+        return (200, response) + self.latency(key, usage.get("completion_tokens", 0))
+
+    def _forward(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Send a request to the upstream endpoint without streaming."""
+        body = json.dumps(dict(request, stream=False)).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.upstream_api_key:
+            headers["Authorization"] = f"Bearer {self.upstream_api_key}"
+            headers["api-key"] = self.upstream_api_key
+        upstream = urllib.request.Request(f"{self.upstream_url}/chat/completions", data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(upstream, timeout=600) as response:
+                return response.status, json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            self._count(errors=1)
+            try:
+                return e.code, json.loads(e.read().decode("utf-8"))
+            except ValueError:
+                return _error(e.code, str(e))
+        except (OSError, ValueError) as e:
+            self._count(errors=1)
+            return _error(502, f"Upstream request failed: {str(e)}")
+
+    def _save_fixture(self, key: str, request: Dict[str, Any], response: Dict[str, Any]):
+        """Write a recorded response atomically."""
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        path = self._fixture_path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"request": {"messages": request.get("messages")}, "response": response}, f, indent=2)
+        os.replace(temp_path, path)
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": MOCK_MODEL, "object": "model", "owned_by": "mock"}]})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.mock.stats())
+        else:
+            self._send_json(*_error(404, f"Unknown path {self.path}"))
+
+    def do_POST(self):
+        if not self.path.split("?")[0].rstrip("/").endswith("/chat/completions"):
+            self._send_json(*_error(404, f"Unknown path {self.path}"))
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            self._send_json(*_error(400, "Request body is not valid JSON"))
+            return
+
+        status, response, first_token, decoding = self.server.mock.complete(request)
+        time.sleep(first_token)
+        if status != 200 or not request.get("stream"):
+            time.sleep(decoding)
+            self._send_json(status, response)
+        else:
+            self._stream(response, decoding, include_usage=(request.get("stream_options") or {}).get("include_usage"))
+
+    def _stream(self, response: Dict[str, Any], decoding: float, include_usage: bool = False):
+        """Send a completion as server-sent events, spreading the decoding time over the chunks."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        content = response["choices"][0]["message"].get("content") or ""
+        pieces = [content[i:i + 64] for i in range(0, len(content), 64)] or [""]
+        base = {key: response.get(key) for key in ("id", "created", "model")}
+        base["object"] = "chat.completion.chunk"
+
+        for index, piece in enumerate(pieces):
+            delta = {"content": piece}
+            if index == 0:
+                delta["role"] = "assistant"
+            self._send_event(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+            time.sleep(decoding / len(pieces))
+        self._send_event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if include_usage:
+            self._send_event(dict(base, choices=[], usage=response.get("usage")))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send_event(self, chunk: Dict[str, Any]):
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class MockLLMServer:
+    """
+    HTTP server speaking the OpenAI chat completions protocol, backed by a MockLLM.
+    """
+
+    def __init__(self, mock: MockLLM, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            mock: Backend answering the requests
+            host: Interface to listen on
+            port: Port to listen on; 0 picks a free port
+        """
+        self.mock = mock
+        self._server = ThreadingHTTPServer((host, port), _MockLLMHandler)
+        self._server.daemon_threads = True
+        self._server.mock = mock
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the OpenAI-compatible API, including the /v1 prefix."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve requests in the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def mock_from_env() -> MockLLM:
+    """
+    Create a MockLLM configured from environment variables.
+
+    Environment variables:
+        MOCK_LLM_MODE: "synthetic", "record" or "replay"
+        MOCK_LLM_FIXTURES_DIR: Directory of recorded responses
+        MOCK_LLM_LATENCY_MS: Median time to first token in milliseconds
+        MOCK_LLM_LATENCY_SIGMA: Log-normal shape of the time to first token
+        MOCK_LLM_TOKENS_PER_SECOND: Mean decoding speed
+        MOCK_LLM_TOKENS_PER_SECOND_STD: Standard deviation of the decoding speed
+        MOCK_LLM_SEED: Seed of the latency and content generator
+        MOCK_LLM_UPSTREAM_URL: OpenAI-compatible base URL to record from
+        MOCK_LLM_UPSTREAM_API_KEY: API key of the upstream endpoint
+        MOCK_LLM_REPLAY_FALLBACK: Set to "1" to synthesize answers missing from the fixtures
+
+    Returns:
+        MockLLM instance
+    """
+    return MockLLM(
+        mode=os.getenv("MOCK_LLM_MODE", "synthetic"),
+        fixtures_dir=os.getenv("MOCK_LLM_FIXTURES_DIR", DEFAULT_FIXTURES_DIR),
+        latency_ms=float(os.getenv("MOCK_LLM_LATENCY_MS", DEFAULT_LATENCY_MS)),
+        latency_sigma=float(os.getenv("MOCK_LLM_LATENCY_SIGMA", DEFAULT_LATENCY_SIGMA)),
+        tokens_per_second=float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", DEFAULT_TOKENS_PER_SECOND)),
+        tokens_per_second_std=float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND_STD", DEFAULT_TOKENS_PER_SECOND_STD)),
+        seed=int(os.getenv("MOCK_LLM_SEED", "0")),
+        upstream_url=os.getenv("MOCK_LLM_UPSTREAM_URL"),
+        upstream_api_key=os.getenv("MOCK_LLM_UPSTREAM_API_KEY"),
+        replay_fallback=os.getenv("MOCK_LLM_REPLAY_FALLBACK", "0").lower() in ("1", "true", "yes")
+    )
+
+
+_default_server = None
+_default_server_lock = threading.Lock()
+
+
+def get_mock_llm_url() -> str:
+    """
+    Return the base URL of the mock LLM used by the crew.
+
+    Uses the server at MOCK_LLM_URL if set; otherwise starts an in-process server
+    configured by mock_from_env() on first use.
+
+    Returns:
+        str: OpenAI-compatible base URL
+    """
+    global _default_server
+
+    if os.getenv("MOCK_LLM_URL"):
+        return os.getenv("MOCK_LLM_URL")
+
+    with _default_server_lock:
+        if _default_server is None:
+            _default_server = MockLLMServer(mock_from_env()).start()
+        return _default_server.url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI-compatible mock LLM.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--mode", choices=MODES, default=None, help="Overrides MOCK_LLM_MODE")
+    parser.add_argument("--fixtures-dir", default=None, help="Overrides MOCK_LLM_FIXTURES_DIR")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Overrides MOCK_LLM_LATENCY_MS")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Overrides MOCK_LLM_TOKENS_PER_SECOND")
+    parser.add_argument("--upstream-url", default=None, help="Overrides MOCK_LLM_UPSTREAM_URL")
+    args = parser.parse_args()
+
+    for name, value in (("MODE", args.mode), ("FIXTURES_DIR", args.fixtures_dir), ("LATENCY_MS", args.latency_ms),
+                        ("TOKENS_PER_SECOND", args.tokens_per_second), ("UPSTREAM_URL", args.upstream_url)):
+        if value is not None:
+            os.environ[f"MOCK_LLM_{name}"] = str(value)
+
+    server = MockLLMServer(mock_from_env(), args.host, args.port)
+    print(f"Mock LLM ({server.mock.mode}) listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import threading
 from dotenv import load_dotenv
 from openai import OpenAI
 from langchain_openai import ChatOpenAI
@@ -6,9 +7,13 @@ from langchain_openai import ChatOpenAI
 # Load environment variables
 load_dotenv()
 
+# Clients are created once per process so their HTTP connection pools are reused
+_clients = {}
+_clients_lock = threading.Lock()
+
 def get_openai_client():
     """
-    Create a standard OpenAI client using environment variables.
+    Create a standard OpenAI client using environment variables, or return the one created before.
     This is a fallback if Azure OpenAI is not available.
     
     Returns:
@@ -28,16 +33,17 @@ def get_openai_client():
                 raise ValueError(f"Missing required environment variable: {var}")
     
     # Set up OpenAI client for LangChain
-    client = ChatOpenAI(
-        model=os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini"),
-        temperature=0.0,  # Use 0 temperature for more consistent/factual responses
-    )
-    
-    return client
+    with _clients_lock:
+        if "chat" not in _clients:
+            _clients["chat"] = ChatOpenAI(
+                model=os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini"),
+                temperature=0.0,  # Use 0 temperature for more consistent/factual responses
+            )
+        return _clients["chat"]
 
 def get_native_openai_client():
     """
-    Create a native OpenAI client using environment variables.
+    Create a native OpenAI client using environment variables, or return the one created before.
     This is a fallback if Azure OpenAI is not available.
     
     Returns:
@@ -57,8 +63,9 @@ def get_native_openai_client():
                 raise ValueError(f"Missing required environment variable: {var}")
     
     # Set up native OpenAI client
-    client = OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY"),
-    )
-    
-    return client 
\ No newline at end of file
+    with _clients_lock:
+        if "native" not in _clients:
+            _clients["native"] = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+            )
+        return _clients["native"] 
\ No newline at end of file
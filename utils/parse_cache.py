@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional
+
+# Default location of the parsed-document cache (relative to the working directory)
+DEFAULT_PARSE_CACHE_DIR = os.path.join(".cache", "parsed")
+
+# Default eviction limits; 0 disables the corresponding limit
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+
+def compute_file_digest(data) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        data: File content as bytes or any bytes-like object (memoryview, mmap)
+
+    Returns:
+        Hex-encoded SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_for_offset(page_offsets: List[List[int]], offset: int) -> Optional[int]:
+    """
+    Find the page a character offset of the parsed text falls on.
+
+    Args:
+        page_offsets: Per-page [start, end) character offsets from the document metadata
+        offset: Character offset into the parsed text
+
+    Returns:
+        1-based page number, or None if the offset is outside every page
+    """
+    index = bisect_right([start for start, _ in page_offsets], offset) - 1
+    if index < 0 or offset >= page_offsets[index][1]:
+        return None
+    return index + 1
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed documents keyed by file digest and parser version.
+
+    Each entry is a zlib-compressed JSON file holding the extracted text,
+    the metadata (including per-page character offsets) and the parse status.
+    Writes are atomic, so concurrent processes can share a cache directory.
+    A file's modification time is its last use: entries unused for
+    max_age_seconds expire, and the least recently used entries are evicted
+    once the cache holds more than max_bytes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_PARSE_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str, file_format: str, parser_version: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.{file_format}.v{parser_version}.json.z")
+
+    def get(self, digest: str, file_format: str, parser_version: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a parsed document.
+
+        Args:
+            digest: SHA-256 digest of the file content
+            file_format: File extension the document was parsed as
+            parser_version: Version of the parser that produced the entry
+
+        Returns:
+            The parse result dictionary, or None on a miss
+        """
+        path = self._path(digest, file_format, parser_version)
+        now = time.time()
+        try:
+            if self.max_age_seconds and now - os.path.getmtime(path) > self.max_age_seconds:
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                result = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+            # Mark the entry as recently used
+            os.utime(path, (now, now))
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def set(self, digest: str, file_format: str, parser_version: str, result: Dict[str, Any]):
+        """
+        Store a parse result.
+
+        Args:
+            digest: SHA-256 digest of the file content
+            file_format: File extension the document was parsed as
+            parser_version: Version of the parser that produced the result
+            result: Parse result dictionary as returned by parse_document
+        """
+        path = self._path(digest, file_format, parser_version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        payload = zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"), 6)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        now = time.time()
+        os.utime(path, (now, now))
+        self._evict(now)
+
+    def _entries(self) -> List[tuple]:
+        """List (last use, size, path) of the cached documents."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".json.z"):
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        # Removed by another process
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, now: float):
+        """Remove expired entries, then least-recently-used entries over the size limit."""
+        if not self.max_age_seconds and not self.max_bytes:
+            return
+
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        evicted = 0
+        for last_used, size, path in entries:
+            expired = self.max_age_seconds and now - last_used > self.max_age_seconds
+            if not expired and (not self.max_bytes or total_size <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        """Remove all cached documents."""
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".json.z"):
+                    os.remove(os.path.join(root, filename))
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cache hits, misses, evictions and on-disk size."""
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "size_bytes": sum(size for _, size, _ in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """
+    Return the process-wide parse cache configured from environment variables.
+
+    Environment variables:
+        PARSE_CACHE_ENABLED: Set to "0"/"false" to disable caching
+        PARSE_CACHE_DIR: Directory the cache files are stored in
+        PARSE_CACHE_MAX_MB: Maximum total size of the cache files
+        PARSE_CACHE_MAX_AGE_DAYS: Days an unused entry is kept
+
+    Returns:
+        ParseCache instance, or None if caching is disabled
+    """
+    global _default_cache
+
+    if os.getenv("PARSE_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ParseCache(
+                os.getenv("PARSE_CACHE_DIR", DEFAULT_PARSE_CACHE_DIR),
+                max_bytes=int(float(os.getenv("PARSE_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+                max_age_seconds=float(os.getenv("PARSE_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_SECONDS / 86400)) * 86400
+            )
+        return _default_cache
@@ -0,0 +1,346 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bump when a rule changes, so cached analyses built on the old rules are not reused
+RULES_VERSION = "1"
+
+# Fields with at least this confidence are taken from the rules and not asked of the LLM
+RULE_CONFIDENCE_THRESHOLD = 0.8
+
+# Only the opening of a contract is searched for the parties
+PARTIES_SEARCH_CHARS = 5000
+
+_MONTH = r"(?:January|February|March|April|May|June|July|August|September|October|November|December)"
+_DATE = rf"(?:{_MONTH}\s+\d{{1,2}},\s*\d{{4}}|\d{{1,2}}\s+{_MONTH}\s+\d{{4}}|\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}/\d{{1,2}}/\d{{4}})"
+
+_EFFECTIVE_DATE_RES = [
+    re.compile(rf"effective\s+date\W{{0,6}}(?:is\s+|shall\s+be\s+)?({_DATE})", re.IGNORECASE),
+    re.compile(rf"effective\s+(?:as\s+of|on|from)\s+({_DATE})", re.IGNORECASE),
+    re.compile(rf"entered\s+into\s+(?:as\s+of|on)\s+({_DATE})", re.IGNORECASE)
+]
+_PERIOD_RE = re.compile(rf"\b(?:between|from)\s+({_DATE})\s+(?:to|and|through|until)\s+({_DATE})", re.IGNORECASE)
+_END_DATE_RE = re.compile(rf"(?:terminat\w*|expir\w*|end)\s+on\s+({_DATE})", re.IGNORECASE)
+_TERM_RE = re.compile(r"\b(?:initial\s+)?term\s+of\s+((?:[a-z]+\s+)?\(?\d+\)?\s+(?:year|month)s?)", re.IGNORECASE)
+_DEFINED_DATE_RE = re.compile(rf"({_DATE})\s*\((?:the\s+)?[*_]*[\"“]([A-Z][A-Za-z ]*Date)[\"”][*_]*\)")
+
+_BETWEEN_RE = re.compile(r"\bbetween\s+", re.IGNORECASE)
+_ROLE_RE = re.compile(r"\((?:the\s+)?[*_]*[\"“]([^\"”()]{2,40})[\"”][*_]*\)")
+_NAME_CUT_RE = re.compile(r",?\s+(?:having|with\s+its|with\s+offices|located|whose|a\s+company|a\s+corporation|an?\s+[A-Z][a-z]+\s+(?:corporation|company|limited))\b")
+_ACRONYM_RE = re.compile(r"\s*\([A-Z][A-Za-z0-9&]{1,10}\)\s*$")
+_ROLE_LABEL_RE = re.compile(
+    r"^\*\*(LICENSOR|LICENSEE|CLIENT|CUSTOMER|VENDOR|SUPPLIER|PROVIDER|SERVICE PROVIDER|CONTRACTOR|"
+    r"DEVELOPER|CONSULTANT|BUYER|SELLER|COMPANY):?\*\*:?[ \t]*$",
+    re.MULTILINE
+)
+
+_PAYMENT_DEADLINE_RE = re.compile(
+    r"\bwithin\s+(?:([a-z-]+)\s+)?\(?(\d+)?\)?\s*(?:business\s+|calendar\s+)?days\b",
+    re.IGNORECASE
+)
+_PAYMENT_WORD_RE = re.compile(r"\b(?:due|payable|paid|pay|invoiced?)\b", re.IGNORECASE)
+_MONEY_RE = re.compile(
+    r"(?:US\$|\$|USD\s?|€|EUR\s?|£|GBP\s?)\d[\d,]*(?:\.\d+)?(?:\s?(?:million|billion|thousand))?"
+    r"(?:\s+(?:per|a|an)\s+(?:hour|day|month|year|annum|user|seat|license))?",
+    re.IGNORECASE
+)
+_LATE_INTEREST_RE = re.compile(r"(?:late|overdue)[^.\n]{0,120}?(\d+(?:\.\d+)?%\s+per\s+(?:month|annum|year))", re.IGNORECASE)
+
+_UPTIME_RES = [
+    re.compile(r"(\d{2}(?:\.\d+)?)\s?%\s*(?:uptime|availability|service\s+availability)", re.IGNORECASE),
+    re.compile(r"(?:uptime|availability)\s+(?:of|at\s+least|target\s+of|:)\s*(\d{2}(?:\.\d+)?)\s?%", re.IGNORECASE)
+]
+
+_GOVERNING_LAW_RE = re.compile(
+    r"governed\s+by[^.]{0,80}?\blaws?\s+of\s+(?:the\s+)?([A-Z][A-Za-z.' ]+?)(?=\s*[,.;(]|\s+(?:and|without|excluding|except)\b)"
+)
+_VENUE_RE = re.compile(r"(?:exclusive\s+)?jurisdiction\s+of\s+the\s+([^.;]*?courts[^.;,]*(?:,\s*[A-Z][A-Za-z ]+)?)")
+_ARBITRATION_RE = re.compile(r"arbitration\s+(?:conducted|held|seated)\s+in\s+([A-Z][A-Za-z ]+(?:,\s*[A-Z][A-Za-z ]+)?)")
+
+_NUMBER_WORDS = {
+    "five": 5, "seven": 7, "ten": 10, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40,
+    "forty-five": 45, "sixty": 60, "ninety": 90
+}
+
+
+def _clean(text: str) -> str:
+    """Collapse whitespace and strip markdown emphasis."""
+    return " ".join(text.replace("**", "").replace("__", "").split())
+
+
+def _party_name(fragment: str) -> str:
+    """Turn the text in front of a role definition into a party name."""
+    fragment = _clean(fragment).lstrip("),;: ")
+    if fragment.lower().startswith("and "):
+        fragment = fragment[4:]
+    fragment = _NAME_CUT_RE.split(fragment, maxsplit=1)[0]
+    fragment = _ACRONYM_RE.sub("", fragment)
+    return fragment.strip(" ,;:")
+
+
+def extract_parties(text: str) -> Optional[Tuple[List[Dict[str, str]], float, List[Tuple[int, int]]]]:
+    """
+    Find the contract parties and their defined roles.
+
+    Recognizes "between X ("Role") and Y ("Role")" recitals and bold role
+    labels ("**LICENSOR:**") followed by the party's name.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Tuple of (parties, confidence, spans), or None if no parties were found
+    """
+    head = text[:PARTIES_SEARCH_CHARS]
+
+    for between in _BETWEEN_RE.finditer(head):
+        line_end = head.find("\n", between.end())
+        segment_end = len(head) if line_end == -1 else line_end
+        roles = list(_ROLE_RE.finditer(head, between.end(), segment_end))[:2]
+        if len(roles) < 2:
+            continue
+
+        parties = []
+        cursor = between.end()
+        for role in roles:
+            name = _party_name(head[cursor:role.start()])
+            if name:
+                parties.append({"name": name, "role": role.group(1).strip()})
+            cursor = role.end()
+        if len(parties) == 2:
+            return parties, 0.9, [(between.start(), roles[-1].end())]
+
+    parties = []
+    spans = []
+    for label in _ROLE_LABEL_RE.finditer(head):
+        for line in head[label.end():label.end() + 300].splitlines():
+            line = line.strip()
+            if line:
+                if not line.startswith(("**", "#")):
+                    parties.append({"name": _clean(line), "role": label.group(1).title()})
+                    spans.append((label.start(), label.end() + len(line)))
+                break
+    if parties:
+        return parties, 0.9 if len(parties) >= 2 else 0.5, spans
+    return None
+
+
+def extract_dates(text: str) -> Optional[Tuple[Dict[str, Any], float, List[Tuple[int, int]]]]:
+    """
+    Find the effective date, end date, term and other defined dates.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Tuple of (dates, confidence, spans), or None if no dates were found
+    """
+    dates = {}
+    spans = []
+
+    for pattern in _EFFECTIVE_DATE_RES:
+        match = pattern.search(text)
+        if match:
+            dates["effective_date"] = match.group(1)
+            spans.append(match.span())
+            break
+
+    period = _PERIOD_RE.search(text)
+    if period:
+        dates.setdefault("effective_date", period.group(1))
+        dates["end_date"] = period.group(2)
+        spans.append(period.span())
+    else:
+        match = _END_DATE_RE.search(text)
+        if match:
+            dates["end_date"] = match.group(1)
+            spans.append(match.span())
+
+    match = _TERM_RE.search(text)
+    if match:
+        dates["term"] = _clean(match.group(1))
+        spans.append(match.span())
+
+    defined = {}
+    for match in _DEFINED_DATE_RE.finditer(text):
+        defined.setdefault(match.group(2), match.group(1))
+        spans.append(match.span())
+    if defined:
+        dates["other_dates"] = defined
+
+    if not dates:
+        return None
+    if "effective_date" in dates and ("end_date" in dates or "term" in dates):
+        confidence = 0.9
+    elif "effective_date" in dates:
+        confidence = 0.7
+    else:
+        confidence = 0.5
+    return dates, confidence, spans
+
+
+def _sentence_around(text: str, start: int, end: int, limit: int = 240) -> str:
+    """Return the line containing a match, trimmed to a readable length."""
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line = _clean(text[line_start:len(text) if line_end == -1 else line_end]).lstrip("-*| ")
+    return line if len(line) <= limit else line[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def extract_payment_terms(text: str) -> Optional[Tuple[Dict[str, Any], float, List[Tuple[int, int]]]]:
+    """
+    Find payment deadlines ("within thirty (30) days"), fees and late payment interest.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Tuple of (payment terms, confidence, spans), or None if nothing was found
+    """
+    terms = {}
+    spans = []
+
+    payment_terms = []
+    payment_days = []
+    for match in _PAYMENT_DEADLINE_RE.finditer(text):
+        days = int(match.group(2)) if match.group(2) else _NUMBER_WORDS.get((match.group(1) or "").lower())
+        if days is None:
+            continue
+        # The sentence around the deadline must be about payment
+        sentence_start = max(text.rfind(".", 0, match.start()), text.rfind("\n", 0, match.start())) + 1
+        if not _PAYMENT_WORD_RE.search(text, max(sentence_start, match.start() - 120), match.start()):
+            continue
+        sentence_end = min(index for index in (text.find(".", match.end()), text.find("\n", match.end()), len(text))
+                           if index != -1)
+        sentence = _clean(text[sentence_start:sentence_end]).lstrip("-*0123456789. ")
+        if sentence not in payment_terms:
+            payment_terms.append(sentence)
+            spans.append((sentence_start, sentence_end))
+        if days not in payment_days:
+            payment_days.append(days)
+    if payment_terms:
+        terms["payment_terms"] = payment_terms
+        terms["payment_days"] = payment_days
+
+    fees = []
+    seen = set()
+    for match in _MONEY_RE.finditer(text):
+        amount = _clean(match.group(0))
+        context = _sentence_around(text, match.start(), match.end())
+        if (amount, context) in seen:
+            continue
+        seen.add((amount, context))
+        fees.append({"amount": amount, "context": context})
+        spans.append(match.span())
+    if fees:
+        terms["fees"] = fees
+
+    match = _LATE_INTEREST_RE.search(text)
+    if match:
+        terms["late_payment_interest"] = match.group(1)
+        spans.append(match.span(1))
+
+    if not terms:
+        return None
+    confidence = 0.85 if "payment_terms" in terms and "fees" in terms else 0.6
+    return terms, confidence, spans
+
+
+def extract_uptime(text: str) -> Optional[Tuple[Dict[str, Any], float, List[Tuple[int, int]]]]:
+    """
+    Find committed uptime or availability percentages.
+
+    Percentages in service credit tables are ignored. Other SLA metrics
+    (response and resolution times) are left to the LLM, so the result is
+    a hint rather than the complete performance_metrics field.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Tuple of (metrics, confidence, spans), or None if nothing was found
+    """
+    uptime = []
+    spans = []
+    for pattern in _UPTIME_RES:
+        for match in pattern.finditer(text):
+            context = _sentence_around(text, match.start(), match.end())
+            if "credit" in context.lower():
+                continue
+            value = f"{match.group(1)}%"
+            if all(entry["value"] != value for entry in uptime):
+                uptime.append({"value": value, "context": context})
+                spans.append(match.span())
+    if not uptime:
+        return None
+    return {"uptime": uptime}, 0.6, spans
+
+
+def extract_governing_law(text: str) -> Optional[Tuple[Dict[str, Any], float, List[Tuple[int, int]]]]:
+    """
+    Find the governing law and the courts or arbitration seat for disputes.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Tuple of (governing law, confidence, spans), or None if nothing was found
+    """
+    match = _GOVERNING_LAW_RE.search(text)
+    if not match:
+        return None
+
+    governing_law = {"law": match.group(1).strip()}
+    spans = [match.span()]
+    venue = _VENUE_RE.search(text) or _ARBITRATION_RE.search(text)
+    if venue:
+        governing_law["venue"] = _clean(venue.group(1))
+        spans.append(venue.span())
+    return governing_law, 0.9, spans
+
+
+# Rule-based extractors per extraction field
+FIELD_RULES = {
+    "parties": extract_parties,
+    "dates": extract_dates,
+    "value_and_payment_terms": extract_payment_terms,
+    "performance_metrics": extract_uptime,
+    "governing_law": extract_governing_law
+}
+
+
+def extract_rule_fields(text: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every field rule on a contract.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Mapping of field name to {"value", "confidence", "spans"} for every
+        field a rule found; spans are (start, end) character offsets of the
+        evidence in the text
+    """
+    fields = {}
+    for field, rule in FIELD_RULES.items():
+        found = rule(text)
+        if found is not None:
+            value, confidence, spans = found
+            fields[field] = {"value": value, "confidence": confidence, "spans": [list(span) for span in spans]}
+    return fields
+
+
+def split_by_confidence(rule_fields: Dict[str, Dict[str, Any]],
+                        threshold: float = RULE_CONFIDENCE_THRESHOLD) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Separate rule results the LLM can skip from those it should only use as hints.
+
+    Args:
+        rule_fields: Result of extract_rule_fields
+        threshold: Minimum confidence for a field to skip the LLM
+
+    Returns:
+        Tuple of (known fields, hint fields), both mapping field name to value
+    """
+    known = {field: result["value"] for field, result in rule_fields.items() if result["confidence"] >= threshold}
+    hints = {field: result["value"] for field, result in rule_fields.items() if result["confidence"] < threshold}
+    return known, hints
@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter for per-minute request and token budgets.
+
+    Callers reserve capacity with acquire() before sending work to the LLM;
+    the call blocks until both budgets have room within the last 60 seconds.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, window_seconds: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self._events = deque()  # (timestamp, requests, tokens)
+        self._requests = 0
+        self._tokens = 0
+        self._condition = threading.Condition()
+
+    def _expire(self, now: float):
+        while self._events and now - self._events[0][0] >= self.window_seconds:
+            _, requests, tokens = self._events.popleft()
+            self._requests -= requests
+            self._tokens -= tokens
+
+    def _wait_time(self, now: float, requests: int, tokens: int) -> float:
+        """Seconds until the reservation fits, or 0 if it fits now."""
+        fits_requests = not self.requests_per_minute or self._requests + requests <= self.requests_per_minute
+        fits_tokens = not self.tokens_per_minute or self._tokens + tokens <= self.tokens_per_minute
+        if fits_requests and fits_tokens:
+            return 0.0
+
+        # A reservation larger than the whole budget is admitted once the window is empty
+        if not self._events:
+            return 0.0
+        return max(self._events[0][0] + self.window_seconds - now, 0.01)
+
+    def acquire(self, requests: int = 1, tokens: int = 0):
+        """
+        Block until the given number of requests and tokens fits the budgets.
+
+        Args:
+            requests: Number of LLM requests to reserve
+            tokens: Number of tokens to reserve
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                wait = self._wait_time(now, requests, tokens)
+                if not wait:
+                    break
+                self._condition.wait(wait)
+
+            self._events.append((now, requests, tokens))
+            self._requests += requests
+            self._tokens += tokens
+
+    def usage(self) -> dict:
+        """Return the requests and tokens reserved in the current window."""
+        with self._condition:
+            self._expire(time.monotonic())
+            return {"requests": self._requests, "tokens": self._tokens}
+
+
+def retry_with_backoff(func: Callable[[], Any], max_retries: int = 3, base_delay: float = 2.0,
+                       max_delay: float = 60.0, on_retry: Optional[Callable[[int, Exception, float], None]] = None):
+    """
+    Call a function, retrying with exponential backoff and jitter when it raises.
+
+    Args:
+        func: Function to call without arguments
+        max_retries: Number of retries after the first attempt
+        base_delay: Delay before the first retry in seconds
+        max_delay: Upper bound for a single delay in seconds
+        on_retry: Optional callback invoked with (attempt, exception, delay) before sleeping
+
+    Returns:
+        The function's return value
+
+    Raises:
+        Exception: The last exception once all retries are exhausted
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            attempt += 1
+            delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            time.sleep(delay)
+
+
+class BatchScheduler:
+    """
+    Bounded-concurrency scheduler for LLM work under request and token budgets.
+
+    At most ``max_concurrency`` jobs run at once. Every attempt of a job
+    reserves its estimated requests and tokens with the rate limiter first,
+    and failed attempts are retried with exponential backoff.
+    """
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 60.0):
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def submit(self, func: Callable[[], Any], requests: int = 1, tokens: int = 0,
+               on_retry: Optional[Callable[[int, Exception, float], None]] = None) -> Future:
+        """
+        Schedule a job.
+
+        Args:
+            func: Function to call without arguments
+            requests: Estimated number of LLM requests per attempt
+            tokens: Estimated number of tokens per attempt
+            on_retry: Optional callback invoked with (attempt, exception, delay) before a retry
+
+        Returns:
+            Future resolving to the function's return value
+        """
+        def attempt():
+            self.limiter.acquire(requests, tokens)
+            return func()
+
+        return self._executor.submit(
+            retry_with_backoff, attempt,
+            max_retries=self.max_retries, base_delay=self.base_delay,
+            max_delay=self.max_delay, on_retry=on_retry
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running jobs to finish."""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=exc_type is None)
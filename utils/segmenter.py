@@ -0,0 +1,321 @@
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Markdown heading, e.g. "## 1.0 AGREEMENT OVERVIEW" or "### A.1 Pricing Models"
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+
+# Plain-text section heading, e.g. "ARTICLE 5 PAYMENT" or "5. PAYMENT TERMS"
+_PLAIN_SECTION_RE = re.compile(
+    r"^(?:(?:ARTICLE|Article|SECTION|Section)[ \t]+(\d+|[IVXLC]+)\b[.:]?[ \t]*(.*)"
+    r"|(\d+)\.[ \t]+([A-Z][A-Z0-9 ,&'()/\-]{2,}))$"
+)
+
+# Numbered clause paragraph, e.g. "1.1 **Definitions**" or "5.2 Payment Terms. All fees ..."
+_CLAUSE_RE = re.compile(r"^(\d+(?:\.\d+)+)\.?[ \t]+(.*)$")
+
+# Leading clause number in a heading title, e.g. "1.0", "2.6.1", "A.1" or "10."
+_NUMBER_PREFIX_RE = re.compile(r"^((?:\d+|[A-Z])(?:\.\d+)+|\d+)\.?[ \t]+(.*)$")
+
+# Whole-line bold label, e.g. "**Customer responsibilities:**"
+_LABEL_RE = re.compile(r"^\*\*([^*]+?)\*\*:?[ \t]*$")
+
+# Bold title at the start of a clause paragraph
+_BOLD_TITLE_RE = re.compile(r"^\*\*(.+?)\*\*")
+
+# Nesting levels: markdown headings use 1-6, numbered clauses sit below every
+# heading and nest by the depth of their number, bold labels sit below clauses
+_CLAUSE_BASE_LEVEL = 6
+_LABEL_LEVEL = 16
+
+
+@dataclass
+class Clause:
+    """
+    A node of the clause tree.
+
+    ``start`` and ``end`` are character offsets into the segmented text; a
+    node's span covers its heading line, its body and all of its children.
+    """
+    kind: str
+    title: str
+    level: int
+    start: int
+    end: int = -1
+    number: Optional[str] = None
+    children: List["Clause"] = field(default_factory=list)
+
+    def text(self, source: str) -> str:
+        """Return the text of this clause from the segmented source text."""
+        return source[self.start:self.end]
+
+    def walk(self) -> Iterator["Clause"]:
+        """Iterate over this node and all of its descendants in document order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self, include_children: bool = True) -> dict:
+        """Convert the clause (and optionally its subtree) to a JSON-serializable dictionary."""
+        result = {
+            "kind": self.kind,
+            "number": self.number,
+            "title": self.title,
+            "start": self.start,
+            "end": self.end
+        }
+        if include_children:
+            result["children"] = [child.to_dict() for child in self.children]
+        return result
+
+
+def _clean_title(title: str) -> str:
+    """Strip markdown emphasis and trailing punctuation from a title."""
+    return title.replace("**", "").replace("__", "").strip().strip("\"").rstrip(".:").strip()
+
+
+def _split_number(title: str) -> Tuple[Optional[str], str]:
+    """Split a leading clause number off a heading title."""
+    match = _NUMBER_PREFIX_RE.match(title)
+    if match:
+        return match.group(1), match.group(2)
+    return None, title
+
+
+def _classify_line(line: str):
+    """
+    Classify a single line of contract text.
+
+    Returns:
+        Tuple of (kind, level, number, title), or None for body text
+    """
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    if stripped.startswith("|"):
+        return ("table", None, None, "")
+
+    match = _HEADING_RE.match(stripped)
+    if match:
+        number, title = _split_number(_clean_title(match.group(2)))
+        return ("heading", len(match.group(1)), number, _clean_title(title))
+
+    match = _CLAUSE_RE.match(stripped)
+    if match:
+        number, body = match.group(1), match.group(2)
+        bold = _BOLD_TITLE_RE.match(body)
+        if bold:
+            title = bold.group(1)
+        else:
+            # Use the first sentence (or the first few words) as the title
+            title = re.split(r"(?<=[a-z])\.\s", body, maxsplit=1)[0]
+            title = " ".join(title.split()[:8])
+        return ("clause", _CLAUSE_BASE_LEVEL + number.count(".") + 1, number, _clean_title(title))
+
+    match = _PLAIN_SECTION_RE.match(stripped)
+    if match:
+        if match.group(1):
+            return ("heading", 2, match.group(1), _clean_title(match.group(2)))
+        return ("heading", 2, match.group(3), _clean_title(match.group(4)))
+
+    match = _LABEL_RE.match(stripped)
+    if match:
+        return ("label", _LABEL_LEVEL, None, _clean_title(match.group(1)))
+
+    return None
+
+
+def segment_contract(text: str) -> Clause:
+    """
+    Segment contract text into a clause tree in a single pass over its lines.
+
+    Recognizes markdown headings ("## 1.0 AGREEMENT OVERVIEW"), numbered
+    clauses ("1.1 **Definitions**", "5.2 Payment Terms"), plain-text section
+    headings ("ARTICLE 5", "5. PAYMENT TERMS"), bold labels and markdown
+    tables. Every node records the character offsets of its span.
+
+    Args:
+        text: The contract text
+
+    Returns:
+        Clause: Root node of kind "document" spanning the whole text
+    """
+    root = Clause(kind="document", title="", level=0, start=0, end=len(text))
+    stack = [root]
+    table = None
+
+    pos = 0
+    text_length = len(text)
+    while pos < text_length:
+        newline = text.find("\n", pos)
+        line_end = text_length if newline == -1 else newline
+        next_pos = line_end + 1
+        classified = _classify_line(text[pos:line_end])
+
+        if classified is not None and classified[0] == "table":
+            # Consecutive table rows form a single leaf node of the open section
+            if table is None:
+                table = Clause(kind="table", title="", level=stack[-1].level + 1, start=pos)
+                stack[-1].children.append(table)
+            table.end = min(next_pos, text_length)
+        else:
+            if text[pos:line_end].strip():
+                table = None
+
+            if classified is not None:
+                kind, level, number, title = classified
+                # Close every open node at the same or a deeper level
+                while stack[-1].level >= level:
+                    stack.pop().end = pos
+                node = Clause(kind=kind, title=title, level=level, start=pos, number=number)
+                stack[-1].children.append(node)
+                stack.append(node)
+
+        pos = next_pos
+
+    while len(stack) > 1:
+        stack.pop().end = text_length
+    return root
+
+
+def iter_clauses(root: Clause, kinds: Iterable[str] = ("heading", "clause")) -> Iterator[Clause]:
+    """
+    Iterate over the structural clauses of a tree in document order.
+
+    Args:
+        root: Root of the clause tree
+        kinds: Node kinds to include
+
+    Returns:
+        Iterator of clauses
+    """
+    kinds = set(kinds)
+    return (node for node in root.walk() if node.kind in kinds)
+
+
+def outline(root: Clause) -> List[dict]:
+    """
+    Flatten a clause tree into a list of headings and clauses with offsets.
+
+    Args:
+        root: Root of the clause tree
+
+    Returns:
+        List of {"number", "title", "kind", "start", "end"} dictionaries
+    """
+    return [node.to_dict(include_children=False) for node in iter_clauses(root)]
+
+
+def find_clauses(text: str, keywords: Iterable[str], root: Optional[Clause] = None) -> List[Clause]:
+    """
+    Find the clauses whose title mentions any of the keywords.
+
+    Nested matches are collapsed into their outermost matching clause, so
+    the returned spans never overlap.
+
+    Args:
+        text: The contract text
+        keywords: Case-insensitive keywords to look for in clause titles
+        root: Clause tree of the text, segmented on demand if omitted
+
+    Returns:
+        List of matching clauses in document order
+    """
+    root = root or segment_contract(text)
+    keywords = [keyword.lower() for keyword in keywords]
+
+    matches = []
+    covered_until = -1
+    for node in iter_clauses(root):
+        if node.start < covered_until:
+            continue
+        title = node.title.lower()
+        if any(keyword in title for keyword in keywords):
+            matches.append(node)
+            covered_until = node.end
+    return matches
+
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> Iterator[Tuple[int, int]]:
+    """Split an oversized span at paragraph, line or sentence boundaries."""
+    while end - start > max_chars:
+        limit = start + max_chars
+        cut = text.rfind("\n\n", start + max_chars // 2, limit)
+        if cut == -1:
+            cut = text.rfind("\n", start + max_chars // 2, limit)
+        if cut == -1:
+            cut = text.rfind(". ", start + max_chars // 2, limit)
+            cut = cut + 1 if cut != -1 else limit
+        yield start, cut
+        start = cut
+    if end > start:
+        yield start, end
+
+
+def _atoms(text: str, node: Clause, max_chars: int) -> Iterator[Tuple[int, int, bool]]:
+    """
+    Cover a node's span with the largest clause-aligned pieces that fit max_chars.
+
+    Yields (start, end, sticky) tuples; sticky pieces are section preambles
+    (heading lines and introductory text) that belong with the piece after them.
+    """
+    if node.end - node.start <= max_chars or not node.children:
+        for start, end in _split_span(text, node.start, node.end, max_chars):
+            yield start, end, False
+        return
+
+    cursor = node.start
+    for i, child in enumerate(node.children):
+        if child.start > cursor:
+            for start, end in _split_span(text, cursor, child.start, max_chars):
+                yield start, end, i == 0
+        yield from _atoms(text, child, max_chars)
+        cursor = child.end
+    if node.end > cursor:
+        for start, end in _split_span(text, cursor, node.end, max_chars):
+            yield start, end, False
+
+
+def chunk_by_clauses(text: str, max_chars: int = 8000, root: Optional[Clause] = None) -> List[Tuple[int, int]]:
+    """
+    Split text into chunks that follow clause boundaries.
+
+    Consecutive clauses are packed into chunks of at most ``max_chars``
+    characters, keeping section headings together with the clauses that
+    follow them. A clause is only split if it is longer than ``max_chars`` on
+    its own, and then at paragraph or sentence boundaries. Chunks do not
+    overlap and together cover the whole text.
+
+    Args:
+        text: The contract text
+        max_chars: Maximum chunk size in characters
+        root: Clause tree of the text, segmented on demand if omitted
+
+    Returns:
+        List of (start, end) character offsets
+    """
+    if not text:
+        return []
+
+    root = root or segment_contract(text)
+
+    chunks = []
+    chunk_start = chunk_end = 0
+    sticky_start = None
+    for start, end, sticky in _atoms(text, root, max_chars):
+        if end - chunk_start > max_chars and chunk_end > chunk_start:
+            # Cut before any trailing headings so they move on with their first clause
+            cut = sticky_start if sticky_start is not None and sticky_start > chunk_start else chunk_end
+            if end - cut > max_chars:
+                cut = chunk_end
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+        chunk_end = end
+        if sticky:
+            sticky_start = start if sticky_start is None else sticky_start
+        else:
+            sticky_start = None
+    if chunk_end > chunk_start:
+        chunks.append((chunk_start, chunk_end))
+    return chunks
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def topological_order(dependencies: Dict[str, Iterable[str]]) -> List[str]:
+    """
+    Order the stages of a dependency graph so every stage follows its dependencies.
+
+    Stages without ordering constraints keep their insertion order, so the
+    result is deterministic.
+
+    Args:
+        dependencies: Mapping of stage name to the names of the stages it depends on
+
+    Returns:
+        List of stage names in execution order
+
+    Raises:
+        ValueError: If a dependency is unknown or the graph contains a cycle
+    """
+    for name, deps in dependencies.items():
+        for dep in deps:
+            if dep not in dependencies:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+
+    order = []
+    done = set()
+    remaining = list(dependencies)
+    while remaining:
+        ready = [name for name in remaining if all(dep in done for dep in dependencies[name])]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {', '.join(remaining)}")
+        for name in ready:
+            order.append(name)
+            done.add(name)
+        remaining = [name for name in remaining if name not in done]
+    return order
+
+
+def run_task_graph(stages: Dict[str, Callable[[Dict[str, Any]], Any]],
+                   dependencies: Dict[str, Iterable[str]],
+                   max_workers: Optional[int] = None,
+                   on_stage_complete: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None):
+    """
+    Execute a graph of stages, running independent stages concurrently.
+
+    Each stage callable receives a dictionary with the results of its
+    dependencies and starts as soon as all of them have finished.
+
+    Args:
+        stages: Mapping of stage name to a callable taking the dependency results
+        dependencies: Mapping of stage name to the names of the stages it depends on
+        max_workers: Maximum number of stages running at the same time
+        on_stage_complete: Optional callback invoked with (name, result, timing) after each stage
+
+    Returns:
+        Tuple of (results, timings) dictionaries keyed by stage name. Timings hold
+        "started_at", "finished_at" (seconds since the graph started) and "duration".
+
+    Raises:
+        Exception: The first exception raised by a stage; pending stages are cancelled
+    """
+    dependencies = {name: list(dependencies.get(name, [])) for name in stages}
+    order = topological_order(dependencies)
+
+    results = {}
+    timings = {}
+    graph_start = time.perf_counter()
+
+    def run_stage(name):
+        started = time.perf_counter()
+        result = stages[name]({dep: results[dep] for dep in dependencies[name]})
+        finished = time.perf_counter()
+        return result, {
+            "started_at": started - graph_start,
+            "finished_at": finished - graph_start,
+            "duration": finished - started
+        }
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages) or 1) as executor:
+        running = {}
+        pending = list(order)
+
+        while pending or running:
+            # Submit every stage whose dependencies have all completed
+            for name in list(pending):
+                if all(dep in results for dep in dependencies[name]):
+                    running[executor.submit(run_stage, name)] = name
+                    pending.remove(name)
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    result, timing = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+                results[name] = result
+                timings[name] = timing
+                if on_stage_complete is not None:
+                    on_stage_complete(name, result, timing)
+
+    return results, timings
+
+
+def summarize_latency(timings: Dict[str, Dict[str, float]], dependencies: Dict[str, Iterable[str]],
+                      sequential_stages: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Compare a concurrent run against executing the same stages one after another.
+
+    For each stage the sequential finish time is the sum of the durations of
+    all stages up to and including it in topological order; the latency saved
+    is how much earlier the stage actually finished. Stages that only exist in
+    the graph run are left out of the sequential estimate and get no savings.
+
+    Args:
+        timings: Stage timings as returned by run_task_graph
+        dependencies: Mapping of stage name to the names of the stages it depends on
+        sequential_stages: Names of the stages the sequential pipeline runs;
+            defaults to every timed stage
+
+    Returns:
+        Dictionary with wall-clock time, sequential estimate and per-stage savings
+    """
+    order = topological_order({name: list(dependencies.get(name, [])) for name in dependencies if name in timings})
+
+    sequential_stages = set(timings if sequential_stages is None else sequential_stages)
+
+    stages = {}
+    sequential_elapsed = 0.0
+    for name in order:
+        timing = timings[name]
+        stages[name] = {
+            "depends_on": list(dependencies.get(name, [])),
+            "started_at": round(timing["started_at"], 3),
+            "finished_at": round(timing["finished_at"], 3),
+            "duration_seconds": round(timing["duration"], 3)
+        }
+        if name in sequential_stages:
+            sequential_elapsed += timing["duration"]
+            stages[name]["latency_saved_seconds"] = round(max(sequential_elapsed - timing["finished_at"], 0.0), 3)
+
+    wall_clock = max((timing["finished_at"] for timing in timings.values()), default=0.0)
+    return {
+        "wall_clock_seconds": round(wall_clock, 3),
+        "sequential_estimate_seconds": round(sequential_elapsed, 3),
+        "latency_saved_seconds": round(max(sequential_elapsed - wall_clock, 0.0), 3),
+        "stages": stages
+    }
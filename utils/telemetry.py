@@ -0,0 +1,506 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Instrumentation scope reported in the OpenTelemetry export
+SCOPE_NAME = "it-contract-analysis"
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "it-contract-analysis")
+
+# Finished traces kept in memory for timings lookups
+MAX_TRACES = 100
+
+# Upper bounds of the Prometheus duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# USD per million prompt and completion tokens; model names are matched by prefix
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-35-turbo": (0.50, 1.50),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "mock-gpt": (0.0, 0.0)
+}
+
+_METRIC_NAME_RE = re.compile(r"[^a-zA-Z0-9_:]")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed operation within a trace, such as parsing a document, a task or a tool call.
+    """
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = {}
+        self.set_attributes(**(attributes or {}))
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = None
+        self.error = None
+        self._started = time.perf_counter()
+        self.duration_seconds = 0.0
+
+    def set_attributes(self, **attributes):
+        """Add or replace attributes of the span; None values are ignored."""
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def end(self, error: BaseException = None):
+        self.duration_seconds = time.perf_counter() - self._started
+        self.end_time_ns = self.start_time_ns + int(self.duration_seconds * 1e9)
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_ns": self.start_time_ns,
+            "duration_seconds": round(self.duration_seconds, 4),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """
+    Estimate the price of LLM calls in USD.
+
+    Prices come from MODEL_PRICES unless LLM_PROMPT_COST_PER_1M and
+    LLM_COMPLETION_COST_PER_1M are set.
+
+    Args:
+        model: Model or deployment name, with or without a provider prefix ("azure/gpt-4o")
+        prompt_tokens: Number of prompt tokens
+        completion_tokens: Number of completion tokens
+
+    Returns:
+        Estimated cost, or None if the model's price is unknown
+    """
+    prices = None
+    if os.getenv("LLM_PROMPT_COST_PER_1M") and os.getenv("LLM_COMPLETION_COST_PER_1M"):
+        prices = (float(os.getenv("LLM_PROMPT_COST_PER_1M")), float(os.getenv("LLM_COMPLETION_COST_PER_1M")))
+    elif model:
+        name = model.split("/")[-1].lower()
+        matches = [prefix for prefix in MODEL_PRICES if name.startswith(prefix)]
+        if matches:
+            prices = MODEL_PRICES[max(matches, key=len)]
+    if prices is None:
+        return None
+    return round((prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000, 6)
+
+
+def record_usage(span: Span, usage: Dict[str, int], model: Optional[str] = None):
+    """
+    Attach LLM token usage and its estimated cost to a span.
+
+    Args:
+        span: Span of the operation that called the LLM
+        usage: Token counters with prompt_tokens, completion_tokens and successful_requests
+        model: Model name used for the cost estimate
+    """
+    prompt_tokens = int(usage.get("prompt_tokens") or 0)
+    completion_tokens = int(usage.get("completion_tokens") or 0)
+    span.set_attributes(**{
+        "llm.model": model,
+        "llm.prompt_tokens": prompt_tokens,
+        "llm.completion_tokens": completion_tokens,
+        "llm.requests": int(usage.get("successful_requests") or 0),
+        "llm.cost_usd": estimate_cost(model, prompt_tokens, completion_tokens)
+    })
+
+
+class MetricsRegistry:
+    """
+    Prometheus counters and histograms aggregated from finished spans.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self._duration_sums = defaultdict(float)
+        self._counters = defaultdict(float)
+
+    def observe(self, span: Span):
+        """Add a finished span to the metrics."""
+        attributes = span.attributes
+        with self._lock:
+            buckets = self._durations[span.name]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if span.duration_seconds <= bound:
+                    buckets[index] += 1
+            buckets[-1] += 1
+            self._duration_sums[span.name] += span.duration_seconds
+            if span.error:
+                self._counters[("span_errors_total", span.name, None)] += 1
+            for kind in ("prompt", "completion"):
+                self._counters[("llm_tokens_total", span.name, kind)] += attributes.get(f"llm.{kind}_tokens", 0)
+            self._counters[("llm_requests_total", span.name, None)] += attributes.get("llm.requests", 0)
+            self._counters[("llm_cost_usd_total", span.name, None)] += attributes.get("llm.cost_usd", 0)
+            self._counters[("retries_total", span.name, None)] += attributes.get("retries", 0)
+
+    def increment(self, metric: str, span_name: str, value: float = 1):
+        """
+        Add to a counter outside of a span, e.g. retries of a whole analysis.
+
+        Args:
+            metric: Counter name without the prefix, such as "retries_total"
+            span_name: Operation the counter belongs to
+            value: Amount to add
+        """
+        with self._lock:
+            self._counters[(metric, span_name, None)] += value
+
+    def render(self, prefix: str = "contract_analysis") -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix: Prefix of the metric names
+
+        Returns:
+            Metrics text
+        """
+        prefix = _METRIC_NAME_RE.sub("_", prefix)
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of instrumented operations",
+            f"# TYPE {prefix}_span_duration_seconds histogram"
+        ]
+        with self._lock:
+            for name in sorted(self._durations):
+                buckets = self._durations[name]
+                label = _label("span", name)
+                for bound, count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{{label},le="+Inf"}} {buckets[-1]}')
+                lines.append(f"{prefix}_span_duration_seconds_sum{{{label}}} {self._duration_sums[name]:.6f}")
+                lines.append(f"{prefix}_span_duration_seconds_count{{{label}}} {buckets[-1]}")
+
+            counters = defaultdict(list)
+            for (metric, name, kind), value in self._counters.items():
+                if not value:
+                    continue
+                labels = _label("span", name) + (f",{_label('type', kind)}" if kind else "")
+                counters[metric].append(f"{prefix}_{metric}{{{labels}}} {value:g}")
+        for metric in sorted(counters):
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            lines.extend(sorted(counters[metric]))
+        return "\n".join(lines) + "\n"
+
+
+def _label(key: str, value: str) -> str:
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'{key}="{escaped}"'
+
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value)}
+
+
+def to_otlp(spans: Iterable[Span]) -> Dict[str, Any]:
+    """
+    Convert spans to the OpenTelemetry protocol JSON encoding (OTLP/JSON).
+
+    The result can be posted to an OpenTelemetry collector's /v1/traces endpoint.
+
+    Args:
+        spans: Finished spans
+
+    Returns:
+        dict: ExportTraceServiceRequest payload
+    """
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns or span.start_time_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SCOPE_NAME}, "spans": otlp_spans}]
+        }]
+    }
+
+
+def summarize_spans(spans: Iterable[Span]) -> List[Dict[str, Any]]:
+    """
+    Describe the spans of a trace as a flat timings table, in start order.
+
+    Args:
+        spans: Finished spans of one trace
+
+    Returns:
+        List of dicts with the span name, its parent's name, start offset and
+        duration in seconds, tokens, estimated cost, retries and error
+    """
+    spans = sorted(spans, key=lambda span: span.start_time_ns)
+    if not spans:
+        return []
+    names = {span.span_id: span.name for span in spans}
+    trace_start = spans[0].start_time_ns
+    timings = []
+    for span in spans:
+        attributes = span.attributes
+        entry = {
+            "name": span.name,
+            "parent": names.get(span.parent_id),
+            "start_offset_seconds": round((span.start_time_ns - trace_start) / 1e9, 3),
+            "duration_seconds": round(span.duration_seconds, 3)
+        }
+        if "llm.prompt_tokens" in attributes:
+            entry["prompt_tokens"] = attributes["llm.prompt_tokens"]
+            entry["completion_tokens"] = attributes["llm.completion_tokens"]
+            entry["cost_usd"] = attributes.get("llm.cost_usd")
+        if "retries" in attributes:
+            entry["retries"] = attributes["retries"]
+        if span.error:
+            entry["error"] = span.error
+        timings.append(entry)
+    return timings
+
+
+class Tracer:
+    """
+    Collects finished spans per trace, aggregates them into metrics and exports
+    finished traces.
+    """
+
+    def __init__(self, traces_file: Optional[str] = None, otlp_endpoint: Optional[str] = None):
+        """
+        Args:
+            traces_file: JSONL file every finished trace is appended to as OTLP/JSON
+            otlp_endpoint: OpenTelemetry collector base URL finished traces are posted to
+        """
+        self.traces_file = traces_file
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.metrics = MetricsRegistry()
+        self._lock = threading.Lock()
+        self._open = defaultdict(list)
+        self._finished = OrderedDict()
+
+    def finish(self, span: Span):
+        """Record a finished span; when it is the root of its trace, export the trace."""
+        self.metrics.observe(span)
+        with self._lock:
+            self._open[span.trace_id].append(span)
+            if span.parent_id is not None:
+                return
+            spans = self._open.pop(span.trace_id)
+            self._finished[span.trace_id] = spans
+            while len(self._finished) > MAX_TRACES:
+                self._finished.popitem(last=False)
+        self._export(spans)
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Finished spans of a trace, including those of a trace whose root is still running."""
+        with self._lock:
+            return list(self._finished.get(trace_id) or self._open.get(trace_id, []))
+
+    def _export(self, spans: List[Span]):
+        if not (self.traces_file or self.otlp_endpoint):
+            return
+        payload = json.dumps(to_otlp(spans))
+        if self.traces_file:
+            try:
+                directory = os.path.dirname(self.traces_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with self._lock, open(self.traces_file, "a", encoding="utf-8") as f:
+                    f.write(payload + "\n")
+            except OSError as e:
+                print(f"Error writing trace to {self.traces_file}: {str(e)}")
+        if self.otlp_endpoint:
+            # Post in the background so a slow collector does not delay the analysis
+            threading.Thread(target=self._post, args=(payload,), name="otlp-export", daemon=True).start()
+
+    def _post(self, payload: str):
+        request = urllib.request.Request(f"{self.otlp_endpoint}/v1/traces", data=payload.encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=10):
+                pass
+        except OSError as e:
+            print(f"Error exporting trace to {self.otlp_endpoint}: {str(e)}")
+
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Return the process-wide tracer configured from environment variables.
+
+    Environment variables:
+        OTEL_TRACES_FILE: JSONL file finished traces are appended to as OTLP/JSON
+        OTEL_EXPORTER_OTLP_ENDPOINT: OpenTelemetry collector URL finished traces are posted to
+
+    Returns:
+        Tracer instance
+    """
+    global _default_tracer
+
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer(
+                traces_file=os.getenv("OTEL_TRACES_FILE") or None,
+                otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or None
+            )
+        return _default_tracer
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time the enclosed block as a span, nested under the current span if there is one.
+
+    Exceptions are recorded on the span and re-raised.
+
+    Args:
+        name: Operation name
+        **attributes: Initial span attributes
+
+    Yields:
+        The Span, to add attributes while it runs
+    """
+    parent = _current_span.get()
+    current = Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                   parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current_span.reset(token)
+        get_tracer().finish(current)
+
+
+def traced(name: str):
+    """
+    Decorator running every call of the function in a span.
+
+    Args:
+        name: Span name
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span of the calling thread, if any."""
+    return _current_span.get()
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind a function to the current span, so spans it opens on a worker thread
+    are nested under it instead of starting new traces.
+
+    Args:
+        func: Function that will be called on another thread
+
+    Returns:
+        Wrapped function
+    """
+    parent = _current_span.get()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        payload = get_tracer().metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_metrics_server(port: int = None, host: str = None, attempts: int = 1) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve the Prometheus metrics of this process at /metrics in a background thread.
+
+    Args:
+        port: Port to listen on; defaults to METRICS_PORT. Nothing is served if neither is set.
+        host: Interface to listen on; defaults to METRICS_HOST or 127.0.0.1
+        attempts: Number of consecutive ports to try, so several worker processes
+            can each expose their metrics
+
+    Returns:
+        The running server, or None if metrics are disabled or no port was free
+    """
+    if port is None:
+        if not os.getenv("METRICS_PORT"):
+            return None
+        port = int(os.getenv("METRICS_PORT"))
+    host = host or os.getenv("METRICS_HOST", "127.0.0.1")
+
+    for candidate in range(port, port + max(attempts, 1)):
+        try:
+            server = ThreadingHTTPServer((host, candidate), _MetricsHandler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"Serving Prometheus metrics at http://{host}:{server.server_address[1]}/metrics")
+        return server
+    print(f"Error starting the metrics server: ports {port}-{port + max(attempts, 1) - 1} are in use")
+    return None
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+# Context window of the model and tokens kept free for its answer
+DEFAULT_CONTEXT_TOKENS = 128000
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+# Tokens taken by what CrewAI adds around a task description: the agent's role,
+# goal and backstory, tool descriptions and the ReAct format instructions
+AGENT_OVERHEAD_TOKENS = 3000
+
+# Maximum tokens of each task's description, including the contract text or
+# upstream context; override with TOKEN_BUDGET_<TASK NAME> (e.g. TOKEN_BUDGET_RISK_ASSESSMENT)
+TASK_TOKEN_BUDGETS = {
+    "contract_details": 32000,
+    "contract_details_chunk": 8000,
+    "compliance_analysis": 12000,
+    "risk_assessment": 16000,
+    "clause_review": 12000
+}
+
+# Keys that describe how a value was produced rather than the contract itself
+METADATA_KEYS = frozenset({"thought", "thoughts", "reasoning", "raw", "raw_output", "confidence", "source", "sources"})
+
+# Rough characters per token of English legal text, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+# Strings longer than this are shortened first when compacted context exceeds its budget
+MIN_STRING_CHARS = 80
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("o200k_base" if model and "4o" in model else "cl100k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens of a prompt with the model's local tokenizer.
+
+    Uses tiktoken when it is installed and falls back to an estimate of
+    CHARS_PER_TOKEN characters per token otherwise.
+
+    Args:
+        text: Prompt text
+        model: Model or deployment name selecting the encoding
+
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Shorten text to at most max_tokens tokens, marking the cut.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token limit
+        model: Model or deployment name selecting the encoding
+
+    Returns:
+        The text unchanged if it fits, otherwise its beginning followed by "[...]"
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    max_tokens = max(max_tokens - 2, 0)
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN] + " [...]"
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + " [...]"
+
+
+def compact(data: Any, drop_keys: Iterable[str] = METADATA_KEYS) -> Any:
+    """
+    Reduce structured context to the facts a downstream prompt needs.
+
+    Whitespace in strings is collapsed, empty values and the given keys are
+    removed and repeated list items are kept once.
+
+    Args:
+        data: Parsed task output (dicts, lists and scalars)
+        drop_keys: Keys to remove at every level
+
+    Returns:
+        The compacted data, or None if nothing is left
+    """
+    drop_keys = frozenset(drop_keys)
+    if isinstance(data, str):
+        return _WHITESPACE_RE.sub(" ", data).strip() or None
+    if isinstance(data, dict):
+        compacted = {}
+        for key, value in data.items():
+            if key in drop_keys:
+                continue
+            value = compact(value, drop_keys)
+            if value is not None:
+                compacted[key] = value
+        return compacted or None
+    if isinstance(data, (list, tuple)):
+        items, seen = [], set()
+        for item in data:
+            item = compact(item, drop_keys)
+            fingerprint = json.dumps(item, sort_keys=True, ensure_ascii=False)
+            if item is not None and fingerprint not in seen:
+                seen.add(fingerprint)
+                items.append(item)
+        return items or None
+    return data
+
+
+def _shorten(data: Any, max_chars: int, max_items: int) -> Any:
+    if isinstance(data, str):
+        return data if len(data) <= max_chars else data[:max_chars].rstrip() + "..."
+    if isinstance(data, dict):
+        return {key: _shorten(value, max_chars, max_items) for key, value in data.items()}
+    if isinstance(data, list):
+        items = [_shorten(item, max_chars, max_items) for item in data[:max_items]]
+        if len(data) > max_items:
+            items.append(f"... {len(data) - max_items} more")
+        return items
+    return data
+
+
+def compact_json(data: Any, max_tokens: Optional[int] = None, drop_keys: Iterable[str] = METADATA_KEYS,
+                 model: Optional[str] = None) -> str:
+    """
+    Render context for a prompt as minimal JSON within a token budget.
+
+    JSON text is parsed first; other text (an unparsed task output) is
+    whitespace-collapsed. When the compacted JSON is still over budget, long
+    strings and lists are shortened step by step, and as a last resort the
+    JSON text is truncated.
+
+    Args:
+        data: Parsed task output, JSON text or raw text
+        max_tokens: Token budget; None for no limit
+        drop_keys: Keys to remove at every level
+        model: Model or deployment name selecting the encoding
+
+    Returns:
+        Compact JSON (or text) of at most max_tokens tokens
+    """
+    if isinstance(data, str) and data.lstrip().startswith(("{", "[")):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            pass
+    data = compact(data, drop_keys)
+    if data is None:
+        return ""
+    render = (lambda value: value) if isinstance(data, str) else \
+        (lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+    text = render(data)
+    if max_tokens is None or count_tokens(text, model) <= max_tokens:
+        return text
+
+    max_chars, max_items = max(len(text), MIN_STRING_CHARS), max(len(text), 1)
+    while max_chars > MIN_STRING_CHARS or max_items > 1:
+        max_chars, max_items = max(max_chars // 2, MIN_STRING_CHARS), max(max_items // 2, 1)
+        text = render(_shorten(data, max_chars, max_items))
+        if count_tokens(text, model) <= max_tokens:
+            return text
+    return truncate_to_tokens(text, max_tokens, model)
+
+
+def get_task_budget(task_name: str) -> int:
+    """
+    Maximum number of tokens of a task's description.
+
+    Environment variables:
+        TOKEN_BUDGET_<TASK NAME>: Budget of one task, e.g. TOKEN_BUDGET_COMPLIANCE_ANALYSIS
+        LLM_CONTEXT_TOKENS: Context window of the model
+        LLM_MAX_OUTPUT_TOKENS: Tokens kept free for the model's answer
+
+    Args:
+        task_name: Stage name of the task
+
+    Returns:
+        The task's budget, capped by what fits in the context window
+    """
+    budget = int(os.getenv(f"TOKEN_BUDGET_{task_name.upper()}", TASK_TOKEN_BUDGETS.get(task_name, DEFAULT_CONTEXT_TOKENS)))
+    available = int(os.getenv("LLM_CONTEXT_TOKENS", DEFAULT_CONTEXT_TOKENS)) - \
+        int(os.getenv("LLM_MAX_OUTPUT_TOKENS", DEFAULT_MAX_OUTPUT_TOKENS)) - AGENT_OVERHEAD_TOKENS
+    return max(min(budget, available), 0)